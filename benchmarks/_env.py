@@ -0,0 +1,21 @@
+"""
+Shared setup for the benchmark scripts.
+
+Must be imported before anything from ``src`` so the bot configuration picks up
+a dummy token and a throw-away database instead of the real ``bot.db``.
+"""
+import os
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="bot-bench-")
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:bench-token")
+os.environ["DATABASE_PATH"] = os.path.join(BENCH_DIR, "bench.db")
+
+def percentile(values, fraction: float) -> float:
+    """Returns the value at the given fraction (0..1) of the sorted sample."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
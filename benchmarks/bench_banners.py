@@ -0,0 +1,135 @@
+"""
+Banner ingest: event loop stalls, time and disk, before and after.
+
+Serves photos from a local fake Bot API and saves each of them as the banner
+of ``--types`` post types, two ways:
+  * before: ``File.download_to_drive`` to ``<post type>.jpg`` (the whole file
+    is buffered, then written on the event loop), one copy per post type,
+  * after: ``banner_store.ingest`` (streamed to disk with aiofiles, hashed on
+    the way, re-encoded only when over Telegram's photo limits), one file per
+    distinct image.
+While a save runs, a ticker task measures how late the event loop wakes it,
+i.e. how long other updates would have waited.
+
+Photos: a Telegram-sized JPEG (stored as is) and, with Pillow installed, an
+oversized PNG (re-encoded to a JPEG within 2560 px).
+
+Usage:
+    python -m benchmarks.bench_banners [--types 5] [--megabytes 8]
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from benchmarks.fake_bot_api import FakeBotAPI
+from telegram import Bot, File
+
+from src.utils.banner_store import BannerStore
+from src.utils.bot_request import shared_ssl_context
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+def make_photos(megabytes: int) -> Dict[str, bytes]:
+    rng = random.Random(7)
+    if Image is None:
+        # Incompressible bytes of the size of a large photo; the store keeps them as they are
+        return {"photos/large.jpg": rng.randbytes(megabytes * 1024 * 1024)}
+    photos = {}
+    telegram = Image.effect_noise((1280, 720), 60).convert("RGB")
+    buffer = io.BytesIO()
+    telegram.save(buffer, "JPEG", quality=87)
+    photos["photos/telegram.jpg"] = buffer.getvalue()
+    side = int((megabytes * 1024 * 1024 / 3) ** 0.5)
+    oversized = Image.merge("RGB", [Image.effect_noise((side, side), 40 + 20 * band) for band in range(3)])
+    buffer = io.BytesIO()
+    oversized.save(buffer, "PNG", compress_level=1)
+    photos["documents/oversized.png"] = buffer.getvalue()
+    return photos
+
+class LoopLag:
+    """Measures how late a 1 ms sleep wakes up while the event loop is busy elsewhere."""
+
+    def __init__(self) -> None:
+        self.worst = 0.0
+        self._task = None
+
+    async def _tick(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            self.worst = max(self.worst, time.perf_counter() - start - 0.001)
+
+    def __enter__(self) -> "LoopLag":
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._task.cancel()
+
+def disk_usage(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+async def save_legacy(files: List[File], types: int, directory: str) -> Tuple[float, float]:
+    start = time.perf_counter()
+    with LoopLag() as lag:
+        for file in files:
+            for index in range(types):
+                await file.download_to_drive(os.path.join(directory, f"{file.file_unique_id}-{index}.jpg"))
+    return time.perf_counter() - start, lag.worst
+
+async def save_ingest(files: List[File], types: int, store: BannerStore) -> Tuple[float, float]:
+    start = time.perf_counter()
+    with LoopLag() as lag:
+        for file in files:
+            for _ in range(types):
+                await store.ingest(file)
+    return time.perf_counter() - start, lag.worst
+
+async def run(args: argparse.Namespace) -> None:
+    api = FakeBotAPI()
+    api.files.update(make_photos(args.megabytes))
+    api.start()
+    bot = Bot("123456:bench-token", base_url=api.base_url, base_file_url=api.base_file_url)
+    await bot.initialize()
+    files = []
+    for path in api.files:
+        file = File(file_id=path, file_unique_id=os.path.basename(path), file_path=f"{api.base_file_url}123456:bench-token/{path}")
+        file.set_bot(bot)
+        files.append(file)
+    sizes = ", ".join(f"{os.path.basename(path)} {len(data) / 1024:.0f} KiB" for path, data in api.files.items())
+    print(f"{len(files)} photos ({sizes}), each saved for {args.types} post types")
+    # Built when the bot starts, not on its first banner
+    shared_ssl_context()
+
+    with tempfile.TemporaryDirectory() as legacy_dir, tempfile.TemporaryDirectory() as store_dir:
+        store = BannerStore(store_dir)
+        for file in files:
+            print(f"{file.file_unique_id}:")
+            elapsed, lag = await save_legacy([file], args.types, legacy_dir)
+            print(f"  before: {elapsed * 1000:6.0f} ms, worst loop stall {lag * 1000:5.1f} ms")
+            elapsed, lag = await save_ingest([file], args.types, store)
+            print(f"  after:  {elapsed * 1000:6.0f} ms, worst loop stall {lag * 1000:5.1f} ms")
+        print(f"on disk: before {len(os.listdir(legacy_dir))} files, {disk_usage(legacy_dir) / 1024:.0f} KiB; "
+              f"after {len(os.listdir(store_dir))} files, {disk_usage(store_dir) / 1024:.0f} KiB ({store.stats()})")
+
+    await bot.shutdown()
+    await api.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--types", type=int, default=5)
+    parser.add_argument("--megabytes", type=int, default=8, help="size of the large photo")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Movie caption parser: parity check and throughput.
+
+Compares extract_movie_info (one compiled pattern, single pass) against the
+previous implementation (a dozen separate re.search calls), kept below
+verbatim as the reference. Every caption of the corpus in
+benchmarks/data/movie_captions.json must parse to exactly the same dict
+before any timing is reported.
+
+Usage:
+    python -m benchmarks.bench_caption_parser [--seconds 2] [--corpus path]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from src.handlers.movie_design_handler import extract_movie_info
+
+logger = logging.getLogger("legacy_caption_parser")
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "movie_captions.json")
+
+# --- Reference implementation (before the compiled parser) ---
+def legacy_extract_movie_info(caption: str) -> dict:
+    """استخراج اطلاعات فیلم از کپشن"""
+    info = {
+        'name': '',
+        'genre': '',
+        'language': '',
+        'score': '',
+        'awards': '',
+        'actors': [],
+        'duration': '',
+        'summary': '',
+        'year': '',
+        'country': '',
+        'quality': '720p'  # مقدار پیش‌فرض
+    }
+    
+    # استخراج نام فیلم و سال
+    name_line_match = re.search(r'🎥فیلم\s*(.+?)(?:\n|$)', caption)
+    if name_line_match:
+        full_name = name_line_match.group(1).strip()
+        
+        # استخراج سال (اولین عدد 4 رقمی)
+        year_match = re.search(r'\((\d{4})', full_name)
+        if year_match:
+            info['year'] = year_match.group(1)
+        
+        # استخراج نام انگلیسی
+        # فرمت: (April..s Daug..hter Las hij..as de Ab..ril (2017 (دختر ماه آوریل)
+        name_clean = full_name.lstrip('(').strip()
+        
+        # حذف قسمت (سال) و بعد از آن
+        if year_match:
+            year_pos = name_clean.find(f"({info['year']}")
+            if year_pos > 0:
+                name_clean = name_clean[:year_pos].strip()
+        
+        # حذف نقطه‌های اضافی
+        name_clean = re.sub(r'\.\.', '', name_clean)
+        info['name'] = name_clean.strip()
+    
+    # استخراج ژانر
+    genre_match = re.search(r'📽ژانر:\s*(.+?)(?:\n|$)', caption)
+    if genre_match:
+        info['genre'] = genre_match.group(1).strip()
+    
+    # استخراج زبان (پشتیبانی از 📄 و 📃)
+    lang_match = re.search(r'[📄📃]زبان:\s*(.+?)(?:\n|$)', caption)
+    if lang_match:
+        info['language'] = lang_match.group(1).strip()
+    
+    # استخراج امتیاز (با پشتیبانی از اعداد فارسی و ایموجی‌های مختلف)
+    score_match = re.search(r'[⭐️⭐]امتیاز\s*([۰-۹0-9\.]+)\s*از\s*([۰-۹0-9]+)', caption)
+    if score_match:
+        score = score_match.group(1).strip()
+        total = score_match.group(2).strip()
+        logger.info(f"Score extracted: {score} از {total}")
+        # تبدیل اعداد فارسی به انگلیسی
+        persian_to_english = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
+        score = score.translate(persian_to_english)
+        total = total.translate(persian_to_english)
+        info['score'] = f"{score}/{total}"
+        logger.info(f"Score converted: {info['score']}")
+    else:
+        logger.warning("Score not found in caption")
+    
+    # استخراج جوایز
+    awards_match = re.search(r'🎁جوایز:\s*(.+?)(?:\n|$)', caption)
+    if awards_match:
+        info['awards'] = awards_match.group(1).strip()
+    
+    # استخراج بازیگران
+    actors = re.findall(r'/([A-Za-z_]+)', caption)
+    info['actors'] = actors
+    
+    # استخراج مدت زمان (با پشتیبانی از اعداد فارسی و ایموجی ⌛️)
+    duration_match = re.search(r'[⏳⌛️]مدت زمان:\s*(.+?)(?:\n|$)', caption)
+    if duration_match:
+        duration = duration_match.group(1).strip()
+        # تبدیل اعداد فارسی به انگلیسی
+        persian_to_english = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
+        info['duration'] = duration.translate(persian_to_english)
+    
+    # استخراج کیفیت (Quality)
+    quality_match = re.search(r'[🎬📹🎥]کیفیت:\s*(.+?)(?:\n|$)', caption)
+    if not quality_match:
+        quality_match = re.search(r'Quality:\s*(.+?)(?:\n|$)', caption)
+    if not quality_match:
+        # جستجو برای الگوهای رایج کیفیت
+        quality_patterns = [
+            r'\b(4K|2160p|1080p|720p|480p|360p)\b',
+            r'\b(BluRay|BRRip|WEB-DL|WEBRip|HDRip)\b'
+        ]
+        for pattern in quality_patterns:
+            quality_match = re.search(pattern, caption, re.IGNORECASE)
+            if quality_match:
+                info['quality'] = quality_match.group(1)
+                break
+    else:
+        info['quality'] = quality_match.group(1).strip()
+    
+    # استخراج خلاصه داستان
+    summary_match = re.search(r'خلاصه داستان:\s*(.+?)$', caption, re.DOTALL)
+    if summary_match:
+        info['summary'] = summary_match.group(1).strip()
+    
+    return info
+
+def check_parity(captions: list) -> int:
+    mismatches = 0
+    for index, caption in enumerate(captions):
+        expected = legacy_extract_movie_info(caption)
+        actual = extract_movie_info(caption)
+        if actual != expected:
+            mismatches += 1
+            print(f"Mismatch in caption #{index}:")
+            for key in expected:
+                if expected[key] != actual.get(key):
+                    print(f"  {key}: expected {expected[key]!r}, got {actual.get(key)!r}")
+    return mismatches
+
+def captions_per_second(parser, captions: list, seconds: float) -> float:
+    parsed = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for caption in captions:
+            parser(caption)
+        parsed += len(captions)
+    return parsed / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        captions = json.load(f)
+
+    # The legacy parser logs on every caption; keep the comparison about parsing
+    logging.disable(logging.WARNING)
+    mismatches = check_parity(captions)
+    print(f"Parity: {len(captions) - mismatches}/{len(captions)} captions identical")
+    if mismatches:
+        raise SystemExit(1)
+
+    legacy = captions_per_second(legacy_extract_movie_info, captions, args.seconds)
+    compiled = captions_per_second(extract_movie_info, captions, args.seconds)
+    print(f"legacy (separate searches): {legacy:10.0f} captions/s")
+    print(f"compiled single pass:       {compiled:10.0f} captions/s  ({compiled / legacy:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Caption templates: the cost of a caption, hard-coded vs. templated.
+
+Builds the film caption of every caption in the corpus three ways:
+  * hard-coded: the f-string layout create_formatted_caption used to be,
+  * compiled each time: the post type's template parsed for every caption,
+  * cached: caption_templates.render, i.e. a registry lookup and the renderer
+    compiled on first use, as the bot does.
+
+Usage:
+    python -m benchmarks.bench_caption_templates [--rounds 2000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from src.database.init_db import init_db
+from src.handlers.movie_design_handler import extract_movie_info
+from src.utils.caption_templates import CAPTION, DEFAULT_MOVIE_CAPTION, caption_templates, compile_template
+
+CAPTIONS = os.path.join(os.path.dirname(__file__), "data", "movie_captions.json")
+POST_TYPE = "فیلم"
+
+def hard_coded(info: dict) -> str:
+    return f"""Download 🔞#Film_Nights🔞
+
+⬛️ Name: {info['name']}
+🟨 Data Release: {info['year']}
+🟥 Score IMDB: 《{info['score']}》
+🟩 Country: {info['country'] if info['country'] else '🇺🇸 USA'}
+🟪 Time: {info['duration']}
+🟫 Genre: 《{info['genre']}》
+
+{info['summary']}
+
+🔗 https://t.me/Film_Maamnooe"""
+
+async def run(rounds: int) -> None:
+    with open(CAPTIONS, encoding="utf-8") as source:
+        infos = [extract_movie_info(caption) for caption in json.load(source) if caption]
+    captions = rounds * len(infos)
+    print(f"{len(infos)} films x {rounds} rounds")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for info in infos:
+            hard_coded(info)
+    print(f"hard-coded:         {(time.perf_counter() - start) / captions * 1e6:6.2f} µs per caption")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for info in infos:
+            compile_template(DEFAULT_MOVIE_CAPTION)(info)
+    print(f"compiled each time: {(time.perf_counter() - start) / captions * 1e6:6.2f} µs per caption")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for info in infos:
+            await caption_templates.render(POST_TYPE, CAPTION, info, DEFAULT_MOVIE_CAPTION)
+    print(f"cached:             {(time.perf_counter() - start) / captions * 1e6:6.2f} µs per caption ({caption_templates.stats()})")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    init_db()
+    asyncio.run(run(args.rounds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Concurrent update processing: aggregate throughput from 1 to 100 admins.
+
+Runs the end-to-end load test of bench_load (the bot as a separate process
+against a local fake Bot API) for each number of ``--admins``, twice: with
+updates processed one at a time (``UPDATE_WORKERS=1``, PTB's default) and
+with the sharded per-user processor (``UPDATE_WORKERS``/``UPDATE_SHARDS``
+as configured). Reports updates handled per second, the p99 latency of an
+admin's step and how long updates waited before a worker picked them up
+(``bot_update_wait_seconds`` from the bot's /metrics).
+
+The channel's send budget is raised (``SEND_CHANNEL_PER_MINUTE``): at
+Telegram's 20 posts/min per channel it, not update processing, would set
+the throughput of every run. Per-chat and global send limits stay as they are.
+
+Usage:
+    python -m benchmarks.bench_concurrency [--admins 1,10,25,50,100] [--posts 2]
+        [--workers 32] [--shards 256] [bench_load options]
+"""
+import argparse
+import asyncio
+import os
+from typing import List
+
+from benchmarks._env import BENCH_DIR, percentile
+from benchmarks.bench_load import add_arguments, histogram_quantiles, measure
+
+CHANNEL_BUDGET = "SEND_CHANNEL_PER_MINUTE=100000"
+
+async def run(args: argparse.Namespace) -> None:
+    modes = [("sequential", ["UPDATE_WORKERS=1"]),
+             ("sharded", [f"UPDATE_WORKERS={args.workers}", f"UPDATE_SHARDS={args.shards}"])]
+    print(f"{args.posts} posts per admin, movie share {args.movie_share:.0%}, "
+          f"API latency {args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms, 429 rate {args.flood_rate:.1%}")
+    print(f"{'admins':>6}  {'mode':<10} {'updates/s':>9} {'step p99':>10} {'wait p99':>10} {'stalled':>7}")
+    for admins in args.admins:
+        for mode, settings in modes:
+            # A fresh database per run, so no conversation carries over from the previous one
+            database = os.path.join(BENCH_DIR, f"concurrency-{admins}-{mode}.db")
+            run_args = argparse.Namespace(**vars(args))
+            run_args.admins = admins
+            run_args.env = [CHANNEL_BUDGET, f"DATABASE_PATH={database}", *settings, *args.env]
+            result = await measure(run_args)
+            steps = [value for values in result.state.latencies.values() for value in values]
+            # Only the sharded processor records the wait; one at a time, updates wait in PTB's queue unmeasured
+            (wait_p99,) = histogram_quantiles(result.exposition, "bot_update_wait_seconds", (0.99,))
+            wait = f"{wait_p99 * 1000:>8.0f} ms" if mode == "sharded" else f"{'-':>11}"
+            print(f"{admins:>6}  {mode:<10} {result.updates_per_second:>9.1f} {percentile(steps, 0.99) * 1000:>8.0f} ms "
+                  f"{wait} {result.state.stalled:>7}")
+
+def admin_counts(value: str) -> List[int]:
+    return [int(count) for count in value.split(",")]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--admins", type=admin_counts, default=[1, 10, 25, 50, 100], help="comma-separated admin counts")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=256)
+    add_arguments(parser)
+    parser.set_defaults(posts=2)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
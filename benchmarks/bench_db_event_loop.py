@@ -0,0 +1,78 @@
+"""
+Event-loop lag under concurrent database writes: blocking DBManager vs async_db.
+
+Simulates several admins confirming posts at the same time. Each writer adds
+post logs back to back while a probe task measures how late the event loop
+wakes it up. With the blocking DBManager every commit stalls the loop; with
+async_db the commits run on the database executor.
+
+Usage:
+    python -m benchmarks.bench_db_event_loop [--writers 20] [--writes 50]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks._env import percentile
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database.async_db import async_db
+
+PROBE_INTERVAL = 0.005
+
+async def probe_lag(samples: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+async def blocking_writer(writes: int, admin_id: int) -> None:
+    for i in range(writes):
+        db = DBManager()
+        try:
+            db.add_post_log("bench", f"post {i} by {admin_id}", admin_id)
+        finally:
+            db.close()
+        await asyncio.sleep(0)
+
+async def async_writer(writes: int, admin_id: int) -> None:
+    for i in range(writes):
+        await async_db.add_post_log("bench", f"post {i} by {admin_id}", admin_id)
+
+async def run(writer, writers: int, writes: int) -> dict:
+    samples: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(samples, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(writes, admin_id) for admin_id in range(writers)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {
+        "elapsed": elapsed,
+        "writes_per_sec": writers * writes / elapsed,
+        "lag_p50_ms": percentile(samples, 0.50) * 1000,
+        "lag_p99_ms": percentile(samples, 0.99) * 1000,
+        "lag_max_ms": max(samples, default=0.0) * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    DBManager().add_post_type("bench")
+
+    print(f"{args.writers} concurrent writers x {args.writes} post logs")
+    for label, writer in (("blocking DBManager", blocking_writer), ("async_db executor", async_writer)):
+        result = asyncio.run(run(writer, args.writers, args.writes))
+        print(
+            f"{label:<20} {result['writes_per_sec']:8.0f} writes/s  "
+            f"loop lag p50 {result['lag_p50_ms']:7.2f} ms  "
+            f"p99 {result['lag_p99_ms']:7.2f} ms  max {result['lag_max_ms']:7.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Near-duplicate detection: SimHash fingerprint cost, lookup latency and recall.
+
+Fills ``post_logs`` with synthetic Persian posts that all end with the same
+channel footer (the usual case, and the hard one for similarity), then:
+  * times simhash() by text length,
+  * loads the index from the database, first computing and storing the
+    fingerprints (the first start after an upgrade), then from stored ones,
+  * times lookups of edited copies of logged posts against the loaded index,
+  * compares the index with a brute-force scan of every fingerprint (recall),
+  * reports how often each kind of edit is detected, and how often an
+    unrelated post with the same footer is wrongly flagged.
+
+Usage:
+    python -m benchmarks.bench_duplicates [--rows 300000]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks._env import percentile
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database.models import PostLog, engine
+from src.utils.near_duplicates import NearDuplicateIndex, simhash
+
+LETTERS = "ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی"
+FOOTER = "\n\n🆔 @bench_channel\n📥 دانلود با لینک مستقیم"
+CHUNK = 50000
+
+def make_post(rng: random.Random, vocabulary: list, words: int) -> str:
+    return " ".join(rng.choices(vocabulary, k=words)) + f" {rng.randint(1990, 2024)}" + FOOTER
+
+def fill_logs(rows: int, type_id: int, vocabulary: list) -> list:
+    rng = random.Random(5)
+    texts = []
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            chunk = [make_post(rng, vocabulary, rng.randint(15, 60)) for _ in range(min(CHUNK, rows - offset))]
+            conn.execute(PostLog.__table__.insert(), [
+                {"post_type_id": type_id, "text": text, "channel_id": "@bench", "sent_by": 1001} for text in chunk
+            ])
+            texts += chunk
+    return texts
+
+# --- Edits an admin might make to a post that was already published ---
+def typo(rng: random.Random, text: str, vocabulary: list) -> str:
+    position = rng.randrange(len(text) - len(FOOTER))
+    return text[:position] + rng.choice(LETTERS) + text[position + 1:]
+
+def replace_words(count: int):
+    def edit(rng: random.Random, text: str, vocabulary: list) -> str:
+        body, footer = text[:-len(FOOTER)].split(), text[-len(FOOTER):]
+        for position in rng.sample(range(len(body)), count):
+            body[position] = rng.choice(vocabulary)
+        return " ".join(body) + footer
+    return edit
+
+def added_line(rng: random.Random, text: str, vocabulary: list) -> str:
+    return text[:-len(FOOTER)] + "\n🔥 " + " ".join(rng.choices(vocabulary, k=4)) + text[-len(FOOTER):]
+
+EDITS = {
+    "typo": typo,
+    "1 word": replace_words(1),
+    "2 words": replace_words(2),
+    "added line": added_line,
+}
+
+def fingerprint_times(rng: random.Random, vocabulary: list) -> None:
+    for words in (15, 40, 80, 160):
+        texts = [make_post(rng, vocabulary, words) for _ in range(300)]
+        start = time.perf_counter()
+        for text in texts:
+            simhash(text)
+        elapsed = (time.perf_counter() - start) / len(texts)
+        print(f"simhash: {words:3d} words (~{sum(map(len, texts)) // len(texts)} chars) {elapsed * 1e6:.0f} µs")
+
+def brute_force(fingerprints: list, query: int, max_distance: int) -> bool:
+    return any((fingerprint ^ query).bit_count() <= max_distance for fingerprint in fingerprints)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--max-distance", type=int, default=8)
+    args = parser.parse_args()
+
+    init_db()
+    db = DBManager()
+    db.add_post_type("movie")
+    type_id = db.get_post_type("movie").id
+    db.close()
+
+    rng = random.Random(9)
+    vocabulary = ["".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 8))) for _ in range(20000)]
+    fingerprint_times(rng, vocabulary)
+
+    texts = fill_logs(args.rows, type_id, vocabulary)
+    print(f"filled {args.rows} posts")
+
+    index = NearDuplicateIndex(max_distance=args.max_distance)
+    start = time.perf_counter()
+    asyncio.run(index.load())
+    print(f"load: {time.perf_counter() - start:.1f}s computing and storing fingerprints")
+    index = NearDuplicateIndex(max_distance=args.max_distance)
+    start = time.perf_counter()
+    asyncio.run(index.load())
+    print(f"load: {time.perf_counter() - start:.1f}s from stored ones ({len(index)} posts)")
+    fingerprints = list(index._posts)
+
+    # Edited copies of logged posts, and unrelated posts sharing the footer
+    now = time.time()
+    detected = {}
+    lookups = []
+    found = missed = 0
+    for name, edit in EDITS.items():
+        hits = 0
+        for _ in range(args.queries):
+            query = simhash(edit(rng, rng.choice(texts), vocabulary))
+            start = time.perf_counter()
+            match = index.find(query, now)
+            lookups.append(time.perf_counter() - start)
+            hits += match is not None
+            if brute_force(fingerprints, query, args.max_distance):
+                found += match is not None
+                missed += match is None
+        detected[name] = hits / args.queries
+    unrelated = 0
+    for _ in range(args.queries):
+        query = simhash(make_post(rng, vocabulary, rng.randint(15, 60)))
+        start = time.perf_counter()
+        unrelated += index.find(query, now) is not None
+        lookups.append(time.perf_counter() - start)
+
+    print(f"lookup: p50 {percentile(lookups, 0.5) * 1e6:.0f} µs, p95 {percentile(lookups, 0.95) * 1e6:.0f} µs")
+    print(f"recall vs brute force (distance <= {args.max_distance}): {found / max(1, found + missed):.2%} ({missed} missed)")
+    print("detected: " + ", ".join(f"{name} {rate:.0%}" for name, rate in detected.items()))
+    print(f"false positives on unrelated posts: {unrelated / args.queries:.2%}")
+
+if __name__ == "__main__":
+    main()
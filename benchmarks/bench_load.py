@@ -0,0 +1,298 @@
+"""
+End-to-end load test: many admins driving the bot's conversations at once.
+
+Starts ``python -m src.bot`` as a separate process against a local fake Bot API
+(optionally slow and answering a share of calls with 429 flood control) and
+runs ``--admins`` simulated admins concurrently. Each completes ``--posts``
+posts one after another, a ``--movie-share`` of them through movie design
+(menu button, poster with caption, confirm, file, confirm) and the rest through
+post creation (menu button, post type, text, confirm). An admin sends the next
+step only once the bot answered the previous one, like a person would.
+
+Reports:
+  * updates handled per second over the whole run,
+  * latency from an update being available to getUpdates to the bot's answer,
+    p50/p99 per conversation step,
+  * time spent in handler callbacks as measured by the bot itself
+    (``bot_handler_seconds`` from its /metrics), p50/p99,
+  * Bot API calls per completed post, by method, and the 429s injected.
+
+Send-queue limits and other settings can be passed to the bot with ``--env``,
+e.g. ``--env SEND_CHANNEL_PER_MINUTE=600`` to size for a bigger channel budget.
+
+Usage:
+    python -m benchmarks.bench_load [--admins 20] [--posts 5] [--movie-share 0.5]
+        [--latency 0.05] [--jitter 0.05] [--flood-rate 0.01] [--env NAME=VALUE ...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks._env import BENCH_DIR, percentile
+from benchmarks.fake_bot_api import SETUP_METHODS, FakeBotAPI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAPTIONS = os.path.join(os.path.dirname(__file__), "data", "movie_captions.json")
+FIRST_ADMIN_ID = 5000
+POST_TYPE = "news"
+CHANNEL = "@bench"
+# Seconds an admin waits for the bot's answer to one step before giving up
+STEP_TIMEOUT = 120
+
+NEW_POST_BUTTON = "➕ ساخت پست جدید"
+MOVIE_DESIGN_BUTTON = "🎬 دیزاین پست فیلم"
+
+Expect = Callable[[str, Dict[str, Any]], bool]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def has_button(data: str) -> Expect:
+    return lambda method, params: data in json.dumps(params.get("reply_markup") or {})
+
+def is_report(method: str, params: Dict[str, Any]) -> bool:
+    """The message a conversation ends with: a success, partial or failure report."""
+    return method == "sendMessage" and str(params.get("text", "")).startswith(("✅", "⚠️", "❌"))
+
+def button_data(params: Dict[str, Any], prefix: str) -> str:
+    for row in (params.get("reply_markup") or {}).get("inline_keyboard", []):
+        for button in row:
+            if str(button.get("callback_data", "")).startswith(prefix):
+                return button["callback_data"]
+    raise RuntimeError(f"no '{prefix}' button in {params.get('reply_markup')}")
+
+class Run:
+    """State shared by the simulated admins: the fake API, update ids and the measurements."""
+
+    def __init__(self, api: FakeBotAPI, captions: List[str]) -> None:
+        self.api = api
+        self.captions = captions
+        self.update_id = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.completed = 0
+        self.failed = 0
+        self.stalled = 0
+
+    def push(self, body: Dict[str, Any]) -> None:
+        self.update_id += 1
+        self.api.push_update(dict(body, update_id=self.update_id))
+
+class Admin:
+    def __init__(self, run: Run, user_id: int, seed: int) -> None:
+        self.run = run
+        self.user = {"id": user_id, "is_bot": False, "first_name": f"Admin {user_id}"}
+        self.chat = {"id": user_id, "type": "private"}
+        self.rng = random.Random(seed)
+        self.queue = run.api.watch(user_id)
+        self.message_id = 0
+
+    # --- Updates the admin sends ---
+    def message(self, **content: Any) -> Dict[str, Any]:
+        self.message_id += 1
+        return {"message": dict(content, message_id=self.message_id, date=int(time.time()), chat=self.chat, **{"from": self.user})}
+
+    def callback(self, data: str, message_id: int) -> Dict[str, Any]:
+        self.message_id += 1
+        message = {"message_id": message_id, "date": int(time.time()), "chat": self.chat, "text": "preview"}
+        return {"callback_query": {"id": f"{self.user['id']}-{self.message_id}", "from": self.user,
+                                   "chat_instance": str(self.user["id"]), "data": data, "message": message}}
+
+    async def step(self, name: str, body: Dict[str, Any], expect: Expect) -> Tuple[Dict[str, Any], Any]:
+        """Sends one update and waits for the bot's call that answers it; returns that call's params and result."""
+        start = time.perf_counter()
+        self.run.push(body)
+        while True:
+            method, params, result = await asyncio.wait_for(self.queue.get(), STEP_TIMEOUT)
+            if expect(method, params):
+                self.run.latencies[name].append(time.perf_counter() - start)
+                return params, result
+
+    # --- Conversations ---
+    async def create_post(self) -> bool:
+        params, result = await self.step("post: menu", self.message(text=NEW_POST_BUTTON), has_button("post_type_"))
+        await self.step("post: type", self.callback(button_data(params, "post_type_"), result["message_id"]),
+                        lambda method, params: method == "editMessageText")
+        words = [f"{self.rng.getrandbits(32):x}" for _ in range(30)]
+        _, result = await self.step("post: text", self.message(text=" ".join(words)), has_button("confirm_send"))
+        params, _ = await self.step("post: confirm", self.callback("confirm_send", result["message_id"]), is_report)
+        return params["text"].startswith("✅")
+
+    async def design_movie(self) -> bool:
+        await self.step("movie: menu", self.message(text=MOVIE_DESIGN_BUTTON), lambda method, params: method == "sendMessage")
+        photo = [{"file_id": f"poster-{self.message_id}", "file_unique_id": f"poster-{self.message_id}", "width": 1280, "height": 720}]
+        _, result = await self.step("movie: poster", self.message(photo=photo, caption=self.rng.choice(self.run.captions)),
+                                    has_button("confirm_send"))
+        await self.step("movie: confirm poster", self.callback("confirm_send", result["message_id"]),
+                        lambda method, params: method == "sendMessage" and "📁" in str(params.get("text", "")))
+        document = {"file_id": f"film-{self.message_id}", "file_unique_id": f"film-{self.message_id}", "file_name": "Film.2017.720p.mkv"}
+        _, result = await self.step("movie: file", self.message(document=document), has_button("confirm_send"))
+        params, _ = await self.step("movie: confirm", self.callback("confirm_send", result["message_id"]), is_report)
+        return params["text"].startswith("✅")
+
+    async def work(self, posts: int, movie_share: float) -> None:
+        for _ in range(posts):
+            flow = self.design_movie if self.rng.random() < movie_share else self.create_post
+            try:
+                done = await flow()
+            except asyncio.TimeoutError:
+                # The conversation is in an unknown state; this admin stops
+                self.run.stalled += 1
+                return
+            if done:
+                self.run.completed += 1
+            else:
+                self.run.failed += 1
+
+# --- The bot process ---
+def bot_env(api_url: str, admins: int, metrics_port: int, extra: List[str]) -> dict:
+    env = dict(os.environ, TELEGRAM_API_URL=api_url, TARGET_CHANNEL_ID=CHANNEL, LOG_LEVEL="WARNING",
+               ADMIN_USER_ID=",".join(str(FIRST_ADMIN_ID + i) for i in range(admins)),
+               METRICS_PORT=str(metrics_port), METRICS_LISTEN="127.0.0.1")
+    env.update(item.split("=", 1) for item in extra)
+    env["PYTHONPATH"] = ROOT
+    return env
+
+def seed_database(env: dict) -> None:
+    """Runs in a child process, so this process never imports the bot."""
+    code = (
+        "from src.database.init_db import init_db\n"
+        "from src.database.database import DBManager\n"
+        "init_db()\n"
+        f"db = DBManager(); db.add_post_type({POST_TYPE!r}); db.close()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], env=env, cwd=ROOT, check=True, capture_output=True)
+
+async def scrape(port: int) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.partition(b"\r\n\r\n")[2].decode()
+
+def histogram_quantiles(exposition: str, name: str, fractions: Tuple[float, ...]) -> List[float]:
+    """Quantiles of a histogram summed over its labels, interpolated within buckets like Prometheus does."""
+    buckets: Counter = Counter()
+    for match in re.finditer(rf'^{name}_bucket{{.*le="([^"]+)"}} (\S+)$', exposition, re.MULTILINE):
+        buckets[float(match.group(1))] += float(match.group(2))
+    bounds = sorted(buckets)
+    if not bounds or not buckets[float("inf")]:
+        return [0.0 for _ in fractions]
+    quantiles = []
+    for fraction in fractions:
+        rank = fraction * buckets[float("inf")]
+        lower, below = 0.0, 0.0
+        for bound in bounds:
+            if buckets[bound] >= rank:
+                upper = bound if bound != float("inf") else lower
+                quantiles.append(lower + (upper - lower) * (rank - below) / max(buckets[bound] - below, 1))
+                break
+            lower, below = bound, buckets[bound]
+    return quantiles
+
+class Measurement:
+    """What one load test run measured."""
+
+    def __init__(self, state: Run, elapsed: float, calls: Counter, floods: int, exposition: str, log_path: str) -> None:
+        self.state = state
+        self.elapsed = elapsed
+        self.calls = calls
+        self.floods = floods
+        self.exposition = exposition
+        self.log_path = log_path
+
+    @property
+    def updates_per_second(self) -> float:
+        return self.state.update_id / self.elapsed
+
+async def measure(args: argparse.Namespace) -> Measurement:
+    """Starts the bot against a fake Bot API, lets ``args.admins`` admins complete their posts and stops it."""
+    with open(CAPTIONS, encoding="utf-8") as corpus:
+        # The parser's corpus includes an empty caption, which the bot rightly refuses
+        captions = [caption for caption in json.load(corpus) if caption.strip()]
+    api = FakeBotAPI(latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate, seed=1)
+    api.start()
+    metrics_port = free_port()
+    env = bot_env(api.base_url, args.admins, metrics_port, args.env)
+    seed_database(env)
+
+    # The bot's log goes to a file: a pipe nobody reads would block it once full
+    log_path = os.path.join(BENCH_DIR, "bot.log")
+    log = open(log_path, "wb")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "src.bot", env=env, cwd=ROOT, stdout=asyncio.subprocess.DEVNULL, stderr=log,
+    )
+    try:
+        while "getUpdates" not in api.first_call:
+            if process.returncode is not None:
+                raise RuntimeError(f"the bot exited with {process.returncode}, see {log_path}")
+            await asyncio.sleep(0.01)
+
+        state = Run(api, captions)
+        admins = [Admin(state, FIRST_ADMIN_ID + i, seed=i) for i in range(args.admins)]
+        calls_before = Counter(api.calls)
+        floods_before = sum(api.floods.values())
+        start = time.perf_counter()
+        await asyncio.gather(*(admin.work(args.posts, args.movie_share) for admin in admins))
+        elapsed = time.perf_counter() - start
+        exposition = await scrape(metrics_port)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            process.kill()
+        log.close()
+        await api.stop()
+
+    calls = Counter({method: count - calls_before[method] for method, count in api.calls.items()
+                     if method.lower() not in SETUP_METHODS and count > calls_before[method]})
+    return Measurement(state, elapsed, calls, sum(api.floods.values()) - floods_before, exposition, log_path)
+
+async def run(args: argparse.Namespace) -> None:
+    result = await measure(args)
+    state, calls = result.state, result.calls
+    if state.stalled:
+        print(f"{state.stalled} admins got no answer within {STEP_TIMEOUT} s and stopped; the bot's log is {result.log_path}")
+    print(f"{args.admins} admins, {state.completed} posts completed, {state.failed} failed in {result.elapsed:.1f} s "
+          f"(API latency {args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms, 429 rate {args.flood_rate:.1%})")
+    print(f"throughput: {result.updates_per_second:.1f} updates/s, {state.completed / result.elapsed * 60:.1f} posts/min")
+    for name, values in state.latencies.items():
+        print(f"  {name:<22} p50 {percentile(values, 0.5) * 1000:7.1f} ms   p99 {percentile(values, 0.99) * 1000:7.1f} ms")
+    p50, p99 = histogram_quantiles(result.exposition, "bot_handler_seconds", (0.5, 0.99))
+    print(f"handler callbacks (bot's /metrics): p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    completed = max(state.completed, 1)
+    print(f"Bot API calls per completed post: {sum(calls.values()) / completed:.2f} ({result.floods} answered with 429)")
+    for method, count in calls.most_common():
+        print(f"  {method:<22} {count / completed:6.2f}")
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared with bench_concurrency."""
+    parser.add_argument("--posts", type=int, default=5, help="posts per admin")
+    parser.add_argument("--movie-share", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every Bot API answer")
+    parser.add_argument("--jitter", type=float, default=0.05, help="up to this many seconds more, uniformly")
+    parser.add_argument("--flood-rate", type=float, default=0.01, help="share of calls answered with 429")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="setting passed to the bot")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--admins", type=int, default=20)
+    add_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Metrics: cost of the instrumentation on the update path, and of a scrape.
+
+  * times a trivial handler callback with and without the latency wrapper
+    that instrument_application() puts around every callback,
+  * fills the registry like a busy bot (every handler and Bot API method
+    observed), then times rendering the exposition and a full HTTP scrape of
+    ``/metrics`` through MetricsServer, plus the readiness probe.
+
+Usage:
+    python -m benchmarks.bench_metrics [--calls 200000]
+"""
+import argparse
+import asyncio
+import random
+import socket
+import time
+
+from benchmarks._env import percentile
+from src.utils.metrics import API_SECONDS, HANDLER_SECONDS, QUEUE_WAIT_SECONDS, UPDATES, MetricsServer, _timed_callback, registry
+
+HANDLERS = 40
+API_METHODS = ["sendMessage", "sendPhoto", "editMessageText", "answerCallbackQuery", "getFile", "deleteMessage",
+               "sendDocument", "sendVideo", "getChat", "getChatMember", "copyMessage", "forwardMessage"]
+
+async def callback(update, context):
+    return None
+
+async def time_calls(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await func(None, None)
+    return (time.perf_counter() - start) / calls
+
+def fill(observations: int) -> None:
+    rng = random.Random(3)
+    for _ in range(observations):
+        HANDLER_SECONDS.observe(rng.expovariate(20), handler=f"handlers.callback_{rng.randrange(HANDLERS)}")
+        API_SECONDS.observe(rng.expovariate(10), method=rng.choice(API_METHODS))
+        QUEUE_WAIT_SECONDS.observe(rng.expovariate(100), lane=rng.choice(["interactive", "bulk"]))
+        UPDATES.inc(type=rng.choice(["message", "callback_query"]))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def scrape(port: int, path: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+async def run(calls: int) -> None:
+    plain = await time_calls(callback, calls)
+    wrapped = await time_calls(_timed_callback(callback, "bench.callback"), calls)
+    print(f"handler call: plain {plain * 1e6:.2f} µs, instrumented {wrapped * 1e6:.2f} µs "
+          f"(+{(wrapped - plain) * 1e6:.2f} µs per update)")
+
+    fill(100000)
+    series = sum(1 for line in registry.render().splitlines() if not line.startswith('#'))
+    renders = []
+    for _ in range(50):
+        start = time.perf_counter()
+        body = registry.render()
+        renders.append(time.perf_counter() - start)
+    print(f"render: {series} samples, {len(body) / 1024:.0f} KiB, p50 {percentile(renders, 0.5) * 1000:.2f} ms")
+
+    server = MetricsServer("127.0.0.1", free_port())
+
+    async def database_ready() -> bool:
+        await asyncio.sleep(0.001)
+        return True
+    server.add_readiness_check("database", database_ready)
+    await server.start()
+    for path in ("/metrics", "/readyz"):
+        latencies = []
+        for _ in range(50):
+            start = time.perf_counter()
+            response = await scrape(server.port, path)
+            latencies.append(time.perf_counter() - start)
+        print(f"GET {path}: {response.split(b' ', 2)[1].decode()}, p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+              f"max {max(latencies) * 1000:.2f} ms")
+    await server.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Online migration of the legacy ``posts_log`` table into ``post_logs``.
+
+Fills both layouts (legacy posts_log rows plus current post_logs rows), then:
+  * runs the batched migration in the background while a simulated admin
+    publishes a post every 50 ms, reporting publish latency (against the same
+    traffic without a migration), the worst event loop stall, and how long
+    each batch holds the write lock compared with a one-shot migration,
+  * interrupts the migration halfway and resumes it with a new runner,
+  * checks that every legacy row arrived exactly once, that the statistics
+    count it and that search finds it.
+
+Usage:
+    python -m benchmarks.bench_migrations [--rows 200000]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._env import percentile
+from sqlalchemy import text
+from data.database.models import PostLog as LegacyPostLog
+from src.database.async_db import async_db
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database import migrations
+from src.database.migrations import SchemaMigrator
+from src.database.models import PostLog, engine
+from src.utils.stats import PostStatsRollup
+
+POST_TYPES = ["text", "photo", "video"]
+CHUNK = 50000
+
+def fill(legacy_rows: int, current_rows: int, type_ids: list) -> None:
+    rng = random.Random(4)
+    start = datetime.utcnow() - timedelta(days=365)
+    LegacyPostLog.__table__.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        for offset in range(0, legacy_rows, CHUNK):
+            conn.execute(LegacyPostLog.__table__.insert(), [
+                {
+                    "sender_id": rng.randint(1001, 1010),
+                    "post_type_id": rng.choice(type_ids),
+                    "content": f"legacy post {offset + i} " + "متن قدیمی " * 10,
+                    "file_id": rng.choice([None, "AgACAgQAAxkBAAI"]),
+                    "sent_at": start + timedelta(seconds=offset + i),
+                }
+                for i in range(min(CHUNK, legacy_rows - offset))
+            ])
+        for offset in range(0, current_rows, CHUNK):
+            conn.execute(PostLog.__table__.insert(), [
+                {"post_type_id": rng.choice(type_ids), "text": "current post " * 10, "channel_id": "@bench", "sent_by": 1001}
+                for _ in range(min(CHUNK, current_rows - offset))
+            ])
+
+def timed_batches(batch_times: list) -> None:
+    """Records how long each migration batch (one write transaction) takes."""
+    run_batch = migrations.run_migration_batch
+
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            return run_batch(*args)
+        finally:
+            batch_times.append(time.perf_counter() - start)
+    migrations.run_migration_batch = timed
+
+async def live_traffic(latencies: list, stop: asyncio.Event) -> int:
+    sent = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await async_db.add_post_logs("text", f"live post {sent}", 2001, None, ["@bench"])
+        latencies.append(time.perf_counter() - start)
+        sent += 1
+        await asyncio.sleep(0.05)
+    return sent
+
+async def run_migration(migrator: SchemaMigrator, stop_at: float = None) -> tuple:
+    """Runs the migrator with live traffic; cancels it once ``stop_at`` of the rows are done."""
+    latencies: list = []
+    worst = 0.0
+    stop = asyncio.Event()
+
+    async def ticker() -> None:
+        nonlocal worst
+        while not stop.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - before - 0.01)
+
+    traffic = asyncio.create_task(live_traffic(latencies, stop))
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    migrator.start()
+    while migrator.running:
+        await asyncio.sleep(0.1)
+        if stop_at is not None:
+            progress = (await migrator.status())[-1]
+            if progress.rows_total and progress.rows_done >= progress.rows_total * stop_at:
+                await migrator.stop()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    sent = await traffic
+    await tick
+    return elapsed, sent, latencies, worst
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--current", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+    db = DBManager()
+    for name in POST_TYPES:
+        db.add_post_type(name)
+    type_ids = [db.get_post_type(name).id for name in POST_TYPES]
+    db.close()
+    fill(args.rows, args.current, type_ids)
+    print(f"filled {args.rows} legacy posts_log rows and {args.current} post_logs rows")
+    batch_times: list = []
+    timed_batches(batch_times)
+
+    async def run() -> None:
+        await PostStatsRollup().rebuild()
+        baseline: list = []
+        stop = asyncio.Event()
+        traffic = asyncio.create_task(live_traffic(baseline, stop))
+        await asyncio.sleep(3)
+        stop.set()
+        await traffic
+        print(f"publishing without a migration: p50 {percentile(baseline, 0.5) * 1000:.1f} ms, p95 {percentile(baseline, 0.95) * 1000:.1f} ms")
+
+        elapsed, sent, latencies, worst = await run_migration(SchemaMigrator(batch_size=args.batch), stop_at=0.5)
+        progress = (await SchemaMigrator().status())[-1]
+        print(f"interrupted after {elapsed:.1f}s at {progress.rows_done}/{progress.rows_total} rows ({progress.status})")
+
+        resumed, sent_after, more, worst_after = await run_migration(SchemaMigrator(batch_size=args.batch))
+        latencies += more
+        elapsed += resumed
+        progress = (await SchemaMigrator().status())[-1]
+        print(f"resumed: {progress.rows_done} rows {progress.status} in {elapsed:.1f}s total ({args.rows / elapsed:.0f} rows/s)")
+        print(f"live publishing during the migration: {sent + sent_after} posts, p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, max {max(latencies) * 1000:.0f} ms; "
+              f"worst event loop stall {max(worst, worst_after) * 1000:.1f} ms")
+        print(f"write lock per batch: p50 {percentile(batch_times, 0.5) * 1000:.0f} ms, max {max(batch_times) * 1000:.0f} ms "
+              f"({len(batch_times)} batches); a one-shot migration would hold it for ~{sum(batch_times):.1f}s")
+
+        with engine.connect() as conn:
+            copied = conn.execute(text("SELECT COUNT(*), COUNT(DISTINCT text) FROM post_logs WHERE text LIKE 'legacy post %'")).one()
+            logs = conn.execute(text("SELECT COUNT(*) FROM post_logs")).scalar()
+            total = conn.execute(text("SELECT count FROM post_stats WHERE dimension = 'total'")).scalar()
+        print(f"legacy rows copied: {copied[0]} ({copied[1]} distinct) == {args.rows}: {copied[0] == copied[1] == args.rows}")
+        print(f"stats total {total} == post_logs {logs}: {total == logs}")
+        found, _ = await async_db.search_posts(["legacy", "post", str(args.rows - 1)], 5)
+        print(f"search finds the last legacy post: {found >= 1}")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Post log retention: indexed report queries, background archiving and restore.
+
+Fills ``post_logs`` with synthetic rows spread over two years, then:
+  * times typical report queries (by time, by admin, by type and time) without
+    and with the post_logs indexes,
+  * archives everything older than a year (time, worst event loop stall, live
+    rows and archive size),
+  * restores one archived month,
+  * checks that a statistics rebuild still counts every log, archived or not.
+
+Usage:
+    python -m benchmarks.bench_retention [--rows 500000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._env import BENCH_DIR
+from sqlalchemy import text
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database.models import PostLog, engine
+from src.utils.log_archive import PostLogArchiver
+from src.utils.stats import PostStatsRollup
+
+POST_TYPES = ["news", "movie", "series", "music", "ads"]
+ADMINS = list(range(1001, 1021))
+CHUNK = 50000
+INDEXES = ["ix_post_logs_sent_at", "ix_post_logs_sent_by", "ix_post_logs_post_type_id_sent_at"]
+
+def fill_logs(rows: int, type_ids: list, now: datetime) -> None:
+    rng = random.Random(7)
+    start = now - timedelta(days=730)
+    # Logs are appended as posts are sent, so ids grow with sent_at
+    seconds = sorted(rng.randrange(730 * 86400) for _ in range(rows))
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(PostLog.__table__.insert(), [
+                {
+                    "post_type_id": rng.choice(type_ids),
+                    "text": "synthetic post " * 10,
+                    "channel_id": "@bench",
+                    "sent_by": rng.choice(ADMINS),
+                    "sent_at": start + timedelta(seconds=second),
+                }
+                for second in seconds[offset:offset + CHUNK]
+            ])
+
+def report_queries(now: datetime, type_id: int, runs: int = 20) -> float:
+    """Average time of a set of report-style queries over the last week."""
+    since = now - timedelta(days=7)
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for _ in range(runs):
+            conn.execute(text("SELECT COUNT(*) FROM post_logs WHERE sent_at >= :since"), {"since": since}).all()
+            conn.execute(text("SELECT COUNT(*), MAX(sent_at) FROM post_logs WHERE sent_by = :admin"), {"admin": ADMINS[0]}).all()
+            conn.execute(text("SELECT COUNT(*) FROM post_logs WHERE post_type_id = :type AND sent_at >= :since"), {"type": type_id, "since": since}).all()
+    return (time.perf_counter() - start) / runs
+
+async def with_lag(coro) -> tuple:
+    worst = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal worst
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - before - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return result, elapsed, worst
+
+def live_logs() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM post_logs")).scalar()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    db = DBManager()
+    for name in POST_TYPES:
+        db.add_post_type(name)
+    type_ids = [db.get_post_type(name).id for name in POST_TYPES]
+    db.close()
+
+    now = datetime.utcnow()
+    fill_logs(args.rows, type_ids, now)
+    print(f"filled {args.rows} logs over two years")
+
+    with engine.begin() as conn:
+        for index in INDEXES:
+            conn.execute(text(f"DROP INDEX {index}"))
+    plain = report_queries(now, type_ids[0]) * 1000
+    init_db()  # recreates the indexes, as on an upgraded database
+    indexed = report_queries(now, type_ids[0]) * 1000
+    print(f"report queries: {plain:.1f} ms without indexes, {indexed:.2f} ms with ({plain / indexed:.0f}x)")
+
+    archiver = PostLogArchiver(retention_days=365, archive_dir=os.path.join(BENCH_DIR, "archive"), batch_size=args.batch, batch_pause=0)
+    rollup = PostStatsRollup()
+
+    async def run() -> None:
+        await rollup.rebuild()
+        moved, elapsed, worst = await with_lag(archiver.archive_pass(now))
+        size = sum(os.path.getsize(os.path.join(archiver.archive_dir, name)) for name in os.listdir(archiver.archive_dir))
+        print(f"archive: {moved} logs in {elapsed:.1f}s ({moved / elapsed:.0f}/s), worst event loop stall {worst * 1000:.1f} ms, "
+              f"{live_logs()} live logs left, archives {size / 1e6:.1f} MB")
+
+        month_start = now - timedelta(days=500)
+        restored, elapsed, _ = await with_lag(archiver.restore(month_start, month_start + timedelta(days=30)))
+        print(f"restore: {restored} logs of one month in {elapsed * 1000:.0f} ms")
+
+        counted = await rollup.rebuild()
+        print(f"stats after archiving and restoring: {counted} logs counted == {args.rows}: {counted == args.rows}")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
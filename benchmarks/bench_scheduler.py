@@ -0,0 +1,98 @@
+"""
+Scheduler cost with tens of thousands of pending posts.
+
+For a growing number of pending jobs this measures:
+  * startup reload time of the timer heap from ``scheduled_posts``,
+  * the cost of scheduling one more post (heap push, and with the DB insert),
+  * how often the timer task wakes up while nothing is due (it should not poll).
+
+Usage:
+    python -m benchmarks.bench_scheduler [--sizes 1000 10000 50000]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database.models import ScheduledPost, engine
+from src.utils.scheduler import PostScheduler
+
+class IdleBot:
+    """Nothing becomes due during the benchmark, so the bot is never used."""
+
+def insert_pending(count: int, post_type_id: int) -> None:
+    base = datetime.utcnow() + timedelta(days=1)
+    rows = [
+        {
+            "post_type_id": post_type_id,
+            "text": f"scheduled post {i}",
+            "run_at": base + timedelta(seconds=i),
+            "status": "pending",
+            "created_by": 1,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(ScheduledPost.__table__.insert(), rows)
+
+async def measure(pending: int, pushes: int, idle_seconds: float) -> dict:
+    scheduler = PostScheduler()
+    start = time.perf_counter()
+    await scheduler.start(IdleBot())
+    reload_time = time.perf_counter() - start
+    assert scheduler.pending == pending
+
+    far = time.time() + 86400 * 30
+    start = time.perf_counter()
+    for i in range(pushes):
+        scheduler.add_job(10**9 + i, far + i)
+    push_time = (time.perf_counter() - start) / pushes
+
+    run_at = datetime.now(timezone.utc) + timedelta(days=30)
+    start = time.perf_counter()
+    for _ in range(50):
+        await scheduler.schedule("bench", "one more", None, run_at, 1)
+    schedule_time = (time.perf_counter() - start) / 50
+
+    wakeups_before = scheduler.wakeups
+    await asyncio.sleep(idle_seconds)
+    idle_wakeups = scheduler.wakeups - wakeups_before
+    await scheduler.stop()
+    return {
+        "reload_ms": reload_time * 1000,
+        "reload_us_per_job": reload_time / pending * 1e6,
+        "push_us": push_time * 1e6,
+        "schedule_ms": schedule_time * 1000,
+        "idle_wakeups": idle_wakeups,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--idle", type=float, default=1.0, help="seconds to watch for idle wakeups")
+    args = parser.parse_args()
+
+    init_db()
+    db = DBManager()
+    db.add_post_type("bench")
+    post_type_id = db.get_post_type("bench").id
+    db.close()
+
+    print(f"{'pending':>8} {'reload ms':>10} {'us/job':>8} {'push us':>8} {'schedule ms':>12} {'idle wakeups':>13}")
+    pending = 0
+    for size in sorted(args.sizes):
+        insert_pending(size - pending, post_type_id)
+        pending = size
+        result = asyncio.run(measure(pending, pushes=10000, idle_seconds=args.idle))
+        print(
+            f"{pending:>8} {result['reload_ms']:>10.1f} {result['reload_us_per_job']:>8.2f} "
+            f"{result['push_us']:>8.2f} {result['schedule_ms']:>12.2f} {result['idle_wakeups']:>13}"
+        )
+        # Jobs added by schedule() count as pending for the next round
+        pending += 50
+
+if __name__ == "__main__":
+    main()
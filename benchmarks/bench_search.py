@@ -0,0 +1,136 @@
+"""
+Full-text search over the post history: FTS5 index vs. a LIKE scan.
+
+Fills ``post_logs`` with synthetic Persian posts, backfills the search index
+(the search_backfill migration, as on the first start after an upgrade), then:
+  * times /search queries (one to three words, common and rare) against the
+    same lookups done with ``LIKE '%word%'`` over ``post_logs``,
+  * times add_post_logs with and without indexing the new post,
+  * checks that spelling variants (Arabic yeh/kaf, ZWNJ, Persian digits) match.
+
+Usage:
+    python -m benchmarks.bench_search [--rows 300000]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks._env import percentile
+from sqlalchemy import text
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database.migrations import run_pending
+from src.database.models import PostLog, engine
+from src.text_normalize import search_terms
+from src.utils.search import PAGE_SIZE, PostSearchIndex
+
+POST_TYPES = ["news", "movie", "series", "music", "ads"]
+LETTERS = "ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی"
+COMMON = ["فیلم", "سریال", "دانلود", "کیفیت", "زیرنویس", "دوبله", "اکشن", "درام", "کمدی", "جدید"]
+CHUNK = 50000
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    return COMMON + ["".join(rng.choice(LETTERS) for _ in range(rng.randint(3, 8))) for _ in range(size)]
+
+def fill_logs(rows: int, type_ids: list, vocabulary: list) -> None:
+    rng = random.Random(11)
+    # Zipf-like word frequencies, like real text
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(PostLog.__table__.insert(), [
+                {
+                    "post_type_id": rng.choice(type_ids),
+                    "text": " ".join(rng.choices(vocabulary, weights, k=rng.randint(20, 60))) + f" {rng.randint(1990, 2024)}",
+                    "channel_id": "@bench",
+                    "sent_by": 1001,
+                }
+                for _ in range(min(CHUNK, rows - offset))
+            ])
+
+def like_search(words: list) -> None:
+    """What /search would cost without the index: scan, filter, count and page."""
+    where = " AND ".join(f"text LIKE :w{i}" for i in range(len(words)))
+    params = {f"w{i}": f"%{word}%" for i, word in enumerate(words)}
+    with engine.connect() as conn:
+        conn.execute(text(f"SELECT count(*) FROM post_logs WHERE {where}"), params).scalar()
+        conn.execute(text(f"SELECT id, text FROM post_logs WHERE {where} ORDER BY id DESC LIMIT {PAGE_SIZE}"), params).all()
+
+def insert_time(count: int, with_index: bool) -> float:
+    db = DBManager()
+    original = DBManager._index_posts
+    if not with_index:
+        DBManager._index_posts = lambda self, posts: None
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            db.add_post_logs(POST_TYPES[i % len(POST_TYPES)], f"پست آزمایشی شماره {i} برای فیلم جدید", 1001, None, ["@bench"])
+        return (time.perf_counter() - start) / count
+    finally:
+        DBManager._index_posts = original
+        db.close()
+
+async def search_times(index: PostSearchIndex, queries: list, runs: int) -> list:
+    times = []
+    for _ in range(runs):
+        for query in queries:
+            start = time.perf_counter()
+            await index.search(query, page=1)
+            times.append(time.perf_counter() - start)
+    return times
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--inserts", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    db = DBManager()
+    for name in POST_TYPES:
+        db.add_post_type(name)
+    type_ids = [db.get_post_type(name).id for name in POST_TYPES]
+    db.close()
+
+    rng = random.Random(3)
+    vocabulary = make_vocabulary(rng, 20000)
+    fill_logs(args.rows, type_ids, vocabulary)
+    print(f"filled {args.rows} posts")
+
+    start = time.perf_counter()
+    run_pending()
+    with engine.connect() as conn:
+        added = conn.execute(text("SELECT count(*) FROM post_search")).scalar()
+    print(f"backfill: {added} posts indexed in {time.perf_counter() - start:.1f}s")
+
+    index = PostSearchIndex()
+
+    queries = ["فیلم", "دانلود زیرنویس", "اکشن دوبله 2020", vocabulary[500], vocabulary[5000] + " " + vocabulary[20]]
+    fts = asyncio.run(search_times(index, queries, 20))
+    start = time.perf_counter()
+    for query in queries:
+        like_search(query.split())
+    like_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"search: FTS p50 {percentile(fts, 0.5) * 1000:.2f} ms, p95 {percentile(fts, 0.95) * 1000:.2f} ms; "
+          f"LIKE scan {like_ms:.0f} ms per query")
+
+    plain = insert_time(args.inserts, with_index=False) * 1000
+    indexed = insert_time(args.inserts, with_index=True) * 1000
+    print(f"add_post_logs: {plain:.3f} ms without indexing, {indexed:.3f} ms with (+{indexed - plain:.3f} ms)")
+
+    db = DBManager()
+    db.add_post_logs("movie", "دانلود فيلم كمدي ۲۰۲۳ می‌خواهم", 1001, None, ["@bench"])
+    checks = {
+        "yeh/kaf": "فیلم کمدی",
+        "digits": "کمدی 2023",
+        "zwnj": "می خواهم",
+        "prefix": "فیلم کمد",
+    }
+    found = {name: any("2023" in snippet for _, snippet, *_ in db.search_posts(search_terms(query), 50)[1])
+             for name, query in checks.items()}
+    db.close()
+    print(f"normalization: {found}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold start: time from process start to the first update handled.
+
+Starts ``python -m src.bot`` as a fresh process against a local fake Bot API,
+with an admin's /start already waiting in getUpdates, and times each run from
+the process start to:
+  * the first Bot API request (imports, configuration, database setup),
+  * the first getUpdates (post_init: rosters, registries, background services),
+  * the reply to /start (the first update handled).
+The first run starts on a fresh database (tables created, upgraded and seeded);
+the others on the database it left, like a restarted container. ``--rows``
+fills post_logs first, so the background work started at boot (e.g. loading
+the near-duplicate index) would compete with the first update. The import
+time of ``src.bot`` is measured in a separate process.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--rows 100000]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from benchmarks._env import percentile
+from benchmarks.fake_bot_api import FakeBotAPI
+
+ADMIN_ID = 1001
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_update(update_id: int) -> dict:
+    user = {"id": ADMIN_ID, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": ADMIN_ID, "type": "private"},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+def bot_env(api_url: str) -> dict:
+    env = dict(os.environ, TELEGRAM_API_URL=api_url, ADMIN_USER_ID=str(ADMIN_ID), TARGET_CHANNEL_ID="@bench", LOG_LEVEL="WARNING")
+    env["PYTHONPATH"] = ROOT
+    return env
+
+def fill_logs(rows: int) -> None:
+    """Runs in a child process, so this process never imports the bot."""
+    code = (
+        "import random\n"
+        "from src.database.init_db import init_db\n"
+        "from src.database.database import DBManager\n"
+        "from src.database.models import PostLog, engine\n"
+        "init_db()\n"
+        "db = DBManager(); db.add_post_type('news'); type_id = db.get_post_type('news').id; db.close()\n"
+        "rng = random.Random(1)\n"
+        "with engine.begin() as conn:\n"
+        f"    conn.execute(PostLog.__table__.insert(), [{{'post_type_id': type_id, 'text': ' '.join(str(rng.random()) for _ in range(20)), 'channel_id': '@bench', 'sent_by': {ADMIN_ID}}} for _ in range({rows})])\n"
+        "engine.dispose()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], env=bot_env(""), cwd=ROOT, check=True, capture_output=True)
+
+def import_time() -> float:
+    code = "import time; start = time.perf_counter(); import src.bot; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], env=bot_env(""), cwd=ROOT, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+async def boot_once(update_id: int) -> dict:
+    api = FakeBotAPI()
+    api.start()
+    api.push_update(start_update(update_id))
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "src.bot", env=bot_env(api.base_url), cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        while "sendMessage" not in api.first_call:
+            if process.returncode is not None:
+                raise RuntimeError((await process.stderr.read()).decode()[-2000:])
+            await asyncio.sleep(0.002)
+        first = min(api.first_call.values())
+        return {
+            "first request": first - start,
+            "first getUpdates": api.first_call["getUpdates"] - start,
+            "first reply": api.first_call["sendMessage"] - start,
+        }
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            process.kill()
+        await api.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.rows:
+        fill_logs(args.rows)
+        print(f"filled {args.rows} post logs")
+    imports = sorted(import_time() for _ in range(args.runs))
+    print(f"import src.bot: p50 {percentile(imports, 0.5) * 1000:.0f} ms")
+
+    runs = [asyncio.run(boot_once(run + 1)) for run in range(args.runs)]
+    print(f"first start: " + ", ".join(f"{name} {value * 1000:.0f} ms" for name, value in runs[0].items()))
+    if len(runs) > 1:
+        print(f"restart (p50 of {len(runs) - 1}): " + ", ".join(
+            f"{name} {percentile([run[name] for run in runs[1:]], 0.5) * 1000:.0f} ms" for name in runs[0]
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Statistics report from the rollup tables vs. aggregating post_logs on every tap.
+
+Fills ``post_logs`` with millions of synthetic rows spread over a year, then:
+  * rebuilds the rollups from history (time, and the worst event loop stall meanwhile),
+  * times the report rendered from the rollups against the same numbers computed
+    with GROUP BY queries over ``post_logs``,
+  * times add_post_logs with and without the rollup update,
+  * checks that the rollup total matches ``COUNT(*)``.
+
+Usage:
+    python -m benchmarks.bench_stats [--rows 2000000]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from sqlalchemy import text
+from src.database.init_db import init_db
+from src.database.database import DBManager
+from src.database.models import PostLog, engine
+from src.utils.stats import PostStatsRollup
+
+POST_TYPES = ["news", "movie", "series", "music", "ads"]
+ADMINS = list(range(1001, 1021))
+CHUNK = 50000
+
+def fill_logs(rows: int, type_ids: list) -> None:
+    rng = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=365)
+    # Logs are appended as posts are sent, so ids grow with sent_at
+    seconds = sorted(rng.randrange(365 * 86400) for _ in range(rows))
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(PostLog.__table__.insert(), [
+                {
+                    "post_type_id": rng.choice(type_ids),
+                    "text": "synthetic post",
+                    "channel_id": "@bench",
+                    "sent_by": rng.choice(ADMINS),
+                    "sent_at": start + timedelta(seconds=second),
+                }
+                for second in seconds[offset:offset + CHUNK]
+            ])
+
+def full_scan_report() -> None:
+    """What a report without rollups has to run on every tap."""
+    since = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT COUNT(*) FROM post_logs")).all()
+        conn.execute(text("SELECT post_type_id, COUNT(*) FROM post_logs GROUP BY post_type_id")).all()
+        conn.execute(text("SELECT sent_by, COUNT(*) FROM post_logs GROUP BY sent_by")).all()
+        conn.execute(text("SELECT date(sent_at), COUNT(*) FROM post_logs WHERE sent_at >= :since GROUP BY 1"), {"since": since}).all()
+        conn.execute(text("SELECT strftime('%H', sent_at), COUNT(*) FROM post_logs GROUP BY 1")).all()
+
+async def rebuild_with_lag(rollup: PostStatsRollup) -> tuple:
+    worst = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal worst
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - before - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    counted = await rollup.rebuild()
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return counted, elapsed, worst
+
+async def report_time(rollup: PostStatsRollup, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        await rollup.report()
+    return (time.perf_counter() - start) / runs
+
+def insert_time(count: int, with_rollups: bool) -> float:
+    db = DBManager()
+    original = DBManager._increment_stats
+    if not with_rollups:
+        DBManager._increment_stats = lambda self, counts: None
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            db.add_post_logs(POST_TYPES[i % len(POST_TYPES)], "bench", ADMINS[i % len(ADMINS)], None, ["@bench"])
+        return (time.perf_counter() - start) / count
+    finally:
+        DBManager._increment_stats = original
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--inserts", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    db = DBManager()
+    for name in POST_TYPES:
+        db.add_post_type(name)
+    type_ids = [db.get_post_type(name).id for name in POST_TYPES]
+    db.close()
+
+    start = time.perf_counter()
+    fill_logs(args.rows, type_ids)
+    print(f"filled {args.rows} logs in {time.perf_counter() - start:.1f}s")
+
+    rollup = PostStatsRollup()
+    counted, elapsed, worst_lag = asyncio.run(rebuild_with_lag(rollup))
+    print(f"rebuild: {counted} logs in {elapsed:.2f}s, worst event loop stall {worst_lag * 1000:.1f} ms")
+
+    rollup_ms = asyncio.run(report_time(rollup, 200)) * 1000
+    start = time.perf_counter()
+    full_scan_report()
+    scan_ms = (time.perf_counter() - start) * 1000
+    print(f"report: rollups {rollup_ms:.2f} ms, full scan {scan_ms:.0f} ms ({scan_ms / rollup_ms:.0f}x)")
+
+    plain = insert_time(args.inserts, with_rollups=False) * 1000
+    rolled = insert_time(args.inserts, with_rollups=True) * 1000
+    print(f"add_post_logs: {plain:.3f} ms without rollups, {rolled:.3f} ms with (+{rolled - plain:.3f} ms)")
+
+    # The rollups only counted the inserts made with rollups enabled
+    db = DBManager()
+    logs = db.db.query(PostLog).count()
+    total = db.get_post_stats([]).get("total", {}).get("all", 0)
+    db.close()
+    print(f"rollup total {total} + {args.inserts} uncounted inserts == COUNT(*) {logs}: {total + args.inserts == logs}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Tracing: what a traced update costs, by sampling rate.
+
+Runs the span structure of a typical admin update (the update, its handler,
+the admin_only check, two database calls through run_db and a Bot API call
+through the send queue's span) with tracing off, at 1% and at 100%
+sampling. It reports the time per update, and the time and size of
+exporting the recorded traces as OTLP/JSON.
+
+Usage:
+    python -m benchmarks.bench_tracing [--updates 20000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from src.database.async_db import run_db
+from src.database.init_db import init_db
+from src import tracing
+from src.tracing import KIND_CLIENT, Tracer, span
+
+def noop_query(db) -> None:
+    return None
+
+async def one_update(tracer: Tracer, update_id: int) -> None:
+    with tracer.trace("update", **{"update.id": update_id, "user.id": 1001}):
+        with span("handler post_handler.text_received"):
+            with span("admin_only") as check:
+                check.set_attribute("allowed", True)
+            await run_db(noop_query)
+            await run_db(noop_query)
+            with span("telegram sendMessage", kind=KIND_CLIENT, lane="interactive", chat="1001"):
+                with span("send_queue wait"):
+                    pass
+                await asyncio.sleep(0)
+
+async def run(updates: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for rate in (0.0, 0.01, 1.0):
+            tracer = Tracer(sample_rate=rate, path=os.path.join(directory, f"traces-{rate}.jsonl"), otlp_endpoint=None)
+            for update_id in range(200):  # warm-up: threads, sessions
+                await one_update(tracer, update_id)
+            tracer._take_pending()
+            start = time.perf_counter()
+            for update_id in range(updates):
+                await one_update(tracer, update_id)
+            elapsed = (time.perf_counter() - start) / updates
+            spans = len(tracer._pending)
+            start = time.perf_counter()
+            await tracer.flush()
+            export = time.perf_counter() - start
+            size = os.path.getsize(tracer.path) if os.path.exists(tracer.path) else 0
+            print(f"sample rate {rate:>4.0%}: {elapsed * 1e6:7.1f} µs per update, {spans} spans recorded, {tracer.dropped} traces dropped; "
+                  f"export {export * 1000:.0f} ms, {size / 1024:.0f} KiB")
+
+    # The cost of a span call site when nothing is sampled
+    calls = 1000000
+    start = time.perf_counter()
+    for _ in range(calls):
+        with span("db DBManager.get_post_types"):
+            pass
+    print(f"unsampled span: {(time.perf_counter() - start) / calls * 1e9:.0f} ns per call site ({tracing.NOOP_SPAN.__class__.__name__})")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+    init_db()
+    asyncio.run(run(args.updates))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Webhook vs. long polling: update-to-handler latency, throughput and idle requests.
+
+The bot is built with ``build_application()`` (the real handler stack) and talks
+to a local fake Bot API. A probe handler in a late group records when each
+synthetic update has gone through the whole stack. For every mode this measures:
+  * latency of single updates sent one after another (p50/p95),
+  * throughput of a burst of updates,
+  * requests the bot makes to the Bot API while idle.
+In webhook mode the harness plays Telegram: it POSTs the updates to the bot's
+endpoint with the secret token, using at most ``WEBHOOK_MAX_CONNECTIONS`` parallel
+connections, and checks that a wrong secret is rejected.
+
+Usage:
+    python -m benchmarks.bench_webhook [--updates 200] [--burst 2000] [--idle 10]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+from typing import Dict
+
+import benchmarks._env  # noqa: F401  (dummy token and throw-away database)
+from benchmarks._env import percentile
+from benchmarks.fake_bot_api import FakeBotAPI, WebhookPusher
+
+# Long-poll timeout of getUpdates, as in run_polling()
+POLL_TIMEOUT = 10
+WEBHOOK_PATH = "telegram"
+SECRET = "bench-secret"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_update(update_id: int) -> dict:
+    # Plain text that no handler of the stack matches, so nothing is sent back
+    user = {"id": 1000 + update_id % 50, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": f"bench {update_id}",
+        },
+    }
+
+async def run_mode(mode: str, api: FakeBotAPI, args: argparse.Namespace, first_id: int) -> dict:
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    from src.bot import build_application
+    from src.config import WEBHOOK_MAX_CONNECTIONS
+
+    arrived: Dict[int, asyncio.Future] = {}
+
+    async def probe(update: Update, context) -> None:
+        future = arrived.get(update.update_id)
+        if future and not future.done():
+            future.set_result(time.perf_counter())
+
+    application = build_application()
+    application.add_handler(TypeHandler(Update, probe), group=100)
+
+    webhook_port = free_port()
+    pusher = WebhookPusher(f"http://127.0.0.1:{webhook_port}/{WEBHOOK_PATH}", SECRET, WEBHOOK_MAX_CONNECTIONS)
+    async with application:
+        await application.start()
+        if mode == "polling":
+            await application.updater.start_polling(timeout=POLL_TIMEOUT, poll_interval=0)
+        else:
+            await application.updater.start_webhook(
+                listen="127.0.0.1",
+                port=webhook_port,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"http://127.0.0.1:{webhook_port}/{WEBHOOK_PATH}",
+                secret_token=SECRET,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+
+        async def deliver(update_id: int) -> float:
+            arrived[update_id] = asyncio.get_running_loop().create_future()
+            sent_at = time.perf_counter()
+            if mode == "polling":
+                api.push_update(make_update(update_id))
+            elif await pusher.post(make_update(update_id)) != 200:
+                raise RuntimeError(f"Webhook rejected update {update_id}")
+            return sent_at
+
+        update_id = first_id
+        latencies = []
+        for _ in range(args.updates):
+            update_id += 1
+            sent_at = await deliver(update_id)
+            latencies.append(await arrived[update_id] - sent_at)
+
+        start = time.perf_counter()
+        ids = range(update_id + 1, update_id + 1 + args.burst)
+        await asyncio.gather(*(deliver(i) for i in ids))
+        await asyncio.gather(*(arrived[i] for i in ids))
+        throughput = args.burst / (time.perf_counter() - start)
+
+        rejected = None
+        if mode == "webhook":
+            rejected = await pusher.post(make_update(0), secret_token="wrong")
+
+        api.calls.clear()
+        await asyncio.sleep(args.idle)
+        idle_requests = sum(api.calls.values())
+
+        await application.updater.stop()
+        await application.stop()
+    await pusher.close()
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "throughput": throughput,
+        "idle_requests": idle_requests,
+        "wrong_secret_status": rejected,
+        "last_id": ids[-1],
+    }
+
+async def run(args: argparse.Namespace, api: FakeBotAPI) -> None:
+    api.start()
+    from src.database.init_db import init_db
+    init_db()
+
+    print(f"{'mode':>8} {'p50 ms':>8} {'p95 ms':>8} {'updates/s':>10} {f'idle req/{args.idle:g}s':>12} {'bad secret':>11}")
+    last_id = 0
+    for mode in ("polling", "webhook"):
+        result = await run_mode(mode, api, args, last_id)
+        last_id = result["last_id"]
+        print(
+            f"{mode:>8} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['throughput']:>10.0f} "
+            f"{result['idle_requests']:>12} {str(result['wrong_secret_status'] or '-'):>11}"
+        )
+    await api.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=200, help="updates sent one by one for latency")
+    parser.add_argument("--burst", type=int, default=2000, help="updates sent at once for throughput")
+    parser.add_argument("--idle", type=float, default=10.0, help="seconds to count idle Bot API requests")
+    args = parser.parse_args()
+
+    # The bot reads the Bot API address from its config at import time
+    api = FakeBotAPI()
+    os.environ["TELEGRAM_API_URL"] = api.base_url
+    asyncio.run(run(args, api))
+
+if __name__ == "__main__":
+    main()
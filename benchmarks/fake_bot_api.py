@@ -0,0 +1,250 @@
+"""
+Minimal in-process stand-in for the Telegram Bot API, for benchmarks.
+
+Serves ``/bot<token>/<method>`` like api.telegram.org: ``getUpdates`` long-polls
+a local queue of synthetic updates, ``sendMessage`` and friends answer with a
+plausible Message, everything else returns ``True``; files added to ``files``
+are served under ``/file/bot<token>/<path>``. Every call is counted, so a
+benchmark can tell how many requests the bot made (e.g. while idle), and the time
+of the first call of each method is kept (e.g. to time a bot's startup).
+
+Every answer can be delayed by ``latency`` seconds plus a uniform ``jitter``, and
+a ``flood_rate`` share of the bot's calls is refused with a 429 and ``retry_after``
+like Telegram's flood control. ``watch(chat_id)`` returns a queue that receives
+every call made for that chat with its result, so a load generator can play a
+user who waits for the bot's answer before the next step.
+
+Point the bot at it with ``TELEGRAM_API_URL=<base_url>``. ``WebhookPusher`` plays
+the other direction: it delivers updates to a bot's webhook the way Telegram does.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+from tornado.web import Application, RequestHandler
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+# Calls made while starting and polling, never delayed by flood control
+SETUP_METHODS = {"getme", "getupdates", "deletewebhook", "setwebhook", "getwebhookinfo", "setmycommands", "close", "logout"}
+
+class FloodWait(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Too Many Requests: retry after {retry_after}")
+        self.retry_after = retry_after
+
+class _MethodHandler(RequestHandler):
+    def initialize(self, api: "FakeBotAPI") -> None:
+        self.api = api
+
+    async def post(self, token: str, method: str) -> None:
+        params: Dict[str, Any] = {}
+        for name in self.request.body_arguments:
+            value = self.get_body_argument(name)
+            try:
+                params[name] = json.loads(value)
+            except ValueError:
+                params[name] = value
+        self.set_header("Content-Type", "application/json")
+        try:
+            result = await self.api.handle(method, params)
+        except FloodWait as e:
+            self.set_status(429)
+            self.finish(json.dumps({"ok": False, "error_code": 429, "description": str(e),
+                                    "parameters": {"retry_after": e.retry_after}}))
+            return
+        self.finish(json.dumps({"ok": True, "result": result}))
+
+    get = post
+
+class _FileHandler(RequestHandler):
+    def initialize(self, api: "FakeBotAPI") -> None:
+        self.api = api
+
+    def get(self, token: str, path: str) -> None:
+        if path not in self.api.files:
+            self.send_error(404)
+            return
+        self.set_header("Content-Type", "application/octet-stream")
+        self.finish(self.api.files[path])
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, flood_rate: float = 0.0, retry_after: int = 1,
+                 seed: Optional[int] = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.floods: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._watched: Dict[Any, asyncio.Queue] = {}
+        # File path -> content, served like https://api.telegram.org/file/bot<token>/<file_path>
+        self.files: Dict[str, bytes] = {}
+        self.calls: Counter = Counter()
+        # Method -> time.perf_counter() of its first call
+        self.first_call: Dict[str, float] = {}
+        self.empty_polls = 0
+        self._updates: Deque[Dict[str, Any]] = deque()
+        self._new_updates = asyncio.Event()
+        self._message_id = 0
+        self._server: Optional[HTTPServer] = None
+        self._sockets = bind_sockets(0, "127.0.0.1")
+        self.port = self._sockets[0].getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    @property
+    def base_file_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/file/bot"
+
+    def start(self) -> None:
+        """Starts serving on the running event loop (the port is bound in __init__)."""
+        self._new_updates = asyncio.Event()
+        # No access log: injected 429s would print a warning each
+        app = Application([
+            (r"/bot([^/]+)/(\w+)", _MethodHandler, {"api": self}),
+            (r"/file/bot([^/]+)/(.+)", _FileHandler, {"api": self}),
+        ], log_function=lambda handler: None)
+        self._server = HTTPServer(app)
+        self._server.add_sockets(self._sockets)
+
+    async def stop(self) -> None:
+        # Answer pending long polls, so no request is cut off when the loop closes
+        self._new_updates.set()
+        await asyncio.sleep(0.01)
+        if self._server:
+            self._server.stop()
+            await self._server.close_all_connections()
+
+    def push_update(self, update: Dict[str, Any]) -> None:
+        """Queues an update for the next getUpdates call."""
+        self._updates.append(update)
+        self._new_updates.set()
+
+    def watch(self, chat_id: Any) -> asyncio.Queue:
+        """A queue of ``(method, params, result)`` for every call the bot makes for ``chat_id`` from now on."""
+        return self._watched.setdefault(chat_id, asyncio.Queue())
+
+    def unwatch(self, chat_id: Any) -> None:
+        self._watched.pop(chat_id, None)
+
+    async def handle(self, method: str, params: Dict[str, Any]) -> Any:
+        self.calls[method] += 1
+        self.first_call.setdefault(method, time.perf_counter())
+        name = method.lower()
+        if name == "getupdates":
+            return await self._get_updates(params)
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        if name == "getme":
+            return BOT_USER
+        if self.flood_rate and name not in SETUP_METHODS and self._rng.random() < self.flood_rate:
+            self.floods[method] += 1
+            raise FloodWait(self.retry_after)
+        if name == "getfile":
+            file_id = str(params.get("file_id"))
+            path = file_id if file_id in self.files else f"photos/{file_id}.jpg"
+            return {"file_id": file_id, "file_unique_id": f"unique-{file_id}", "file_path": path,
+                    "file_size": len(self.files.get(path, b""))}
+        if name.startswith(("send", "edit", "copy", "forward")):
+            result: Any = self._message(name, params)
+        else:
+            result = True
+        queue = self._watched.get(params.get("chat_id"))
+        if queue is not None:
+            queue.put_nowait((method, params, result))
+        return result
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        batch = [self._updates[i] for i in range(min(limit, len(self._updates)))]
+        if not batch:
+            self.empty_polls += 1
+        return batch
+
+    def _message(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = params.get("chat_id", 0)
+        chat = {"id": chat_id, "type": "private"} if isinstance(chat_id, int) and chat_id > 0 else {"id": -100, "type": "channel", "title": str(chat_id)}
+        message = {"message_id": self._message_id, "date": int(time.time()), "chat": chat}
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        file = {"file_id": f"file-{self._message_id}", "file_unique_id": f"unique-{self._message_id}"}
+        if method == "sendphoto":
+            message["photo"] = [dict(file, width=1280, height=720)]
+        elif method == "senddocument":
+            message["document"] = file
+        elif method == "sendvideo":
+            message["video"] = dict(file, width=1280, height=720, duration=60)
+        return message
+
+class WebhookPusher:
+    """
+    Delivers updates to a webhook over at most ``max_connections`` keep-alive
+    connections, like Telegram does. A bare HTTP/1.1 client: general purpose
+    clients cost more per request than the bot under test at high concurrency.
+    """
+
+    def __init__(self, url: str, secret_token: Optional[str], max_connections: int = 40) -> None:
+        _, _, rest = url.partition("://")
+        host_port, _, path = rest.partition("/")
+        host, _, port = host_port.partition(":")
+        self._address = (host, int(port or 80))
+        self._path = "/" + path
+        self._secret_token = secret_token
+        self._max_connections = max_connections
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._opened = 0
+
+    async def _connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._idle.empty() and self._opened < self._max_connections:
+            self._opened += 1
+            return await asyncio.open_connection(*self._address)
+        return await self._idle.get()
+
+    async def post(self, update: Dict[str, Any], secret_token: Optional[str] = None) -> int:
+        """Sends one update and returns the HTTP status code."""
+        body = json.dumps(update).encode()
+        headers = [
+            f"POST {self._path} HTTP/1.1",
+            f"Host: {self._address[0]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        secret_token = secret_token or self._secret_token
+        if secret_token:
+            headers.append(f"X-Telegram-Bot-Api-Secret-Token: {secret_token}")
+        reader, writer = await self._connection()
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        length = 0
+        for line in head[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        await reader.readexactly(length)
+        self._idle.put_nowait((reader, writer))
+        return int(head[0].split()[1])
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            _, writer = self._idle.get_nowait()
+            writer.close()
@@ -1,4 +1,6 @@
+import os
 from sqlalchemy.orm import Session
+from src.config import DATABASE_PATH
 from .models import Admin, PostType, PostLog, SessionLocal, Base, engine
 import datetime
 
@@ -11,6 +13,7 @@ class DBManager:
 
     def create_tables(self):
         """Creates all tables in the database based on the models."""
+        os.makedirs(os.path.dirname(os.path.abspath(DATABASE_PATH)), exist_ok=True)
         Base.metadata.create_all(bind=engine)
         print("Database tables created successfully.")
 
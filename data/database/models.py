@@ -1,3 +1,5 @@
+# Legacy schema of the first release. The bot uses src/database/models.py; data in
+# posts_log is copied into post_logs by src/database/migrations.py.
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from sqlalchemy.sql import func
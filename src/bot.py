@@ -1,27 +1,44 @@
+import asyncio
 import logging
+import secrets
+from typing import Optional
+
 from telegram import Update
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
 
 # Import handlers
 from src.handlers.start_handler import start as start_admin, back_to_main_menu, handle_main_menu_buttons
 from src.handlers.post_handler import post_creation_handler
-from src.handlers.admin_handlers import admin_management_handler, admin_panel
-from src.handlers.movie_design_handler import movie_design_handler
+from src.handlers.admin_handlers import admin_management_handler, admin_panel, list_admins, add_admin, remove_admin, rebuild_stats, archive_logs, restore_logs, show_migrations
+from src.handlers.movie_design_handler import movie_design_handler, batch_movie_design_handler
+from src.handlers.import_handler import bulk_import_handler
+from src.handlers.search_handler import search_posts, search_page
 
 # Import configuration
-from src.config import TELEGRAM_BOT_TOKEN, LOG_LEVEL
+from src.config import settings, setup_logging
+from src.database.init_db import init_db
+from src.database.migrations import schema_migrator
+from src.database.async_db import async_db
+from src.database.persistence import SQLitePersistence
+from src.utils.bot_request import SharedSSLRequest
+from src.utils.metrics import ERRORS, instrument_application, metrics_server
+from src.tracing import TracedApplication, tracer
+from src.utils.send_queue import SendQueue
+from src.utils.update_processor import ShardedUpdateProcessor
+from src.utils.scheduler import post_scheduler
+from src.utils.post_type_registry import post_type_registry
+from src.utils.admin_roster import admin_roster
+from src.utils.stats import post_stats
+from src.utils.log_archive import post_log_archiver
+from src.utils.near_duplicates import near_duplicates
 
-# --- Logging Setup ---
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=getattr(logging, LOG_LEVEL, logging.INFO)
-)
 logger = logging.getLogger(__name__)
 
 # --- Error Handler ---
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log the error and send a telegram message to notify the developer."""
     logger.error("Exception while handling an update:", exc_info=context.error)
+    ERRORS.inc(error=type(context.error).__name__)
     # Optionally, notify the user or developer
     if isinstance(update, Update) and update.effective_message:
         try:
@@ -29,23 +46,107 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         except Exception as e:
             logger.error(f"Failed to send error message to user: {e}")
 
-# --- Main Bot Logic ---
-def main() -> None:
-    """Start the bot."""
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+# --- Lifecycle Hooks ---
+# Catch-up work started a little after the bot, see start_background_services()
+_background_start: Optional[asyncio.Task] = None
+
+async def start_background_services() -> None:
+    """Starts the catch-up work (backfills, migrations, index loads, retention) once the first updates had their turn."""
+    await asyncio.sleep(settings.BACKGROUND_START_DELAY)
+    await post_stats.ensure()
+    schema_migrator.start()
+    near_duplicates.start()
+    await post_log_archiver.start()
+
+async def start_metrics(application: Application) -> None:
+    """Serves /metrics and the probes; ready once updates are being received and the database answers."""
+    async def receiving_updates() -> bool:
+        return application.running and (application.updater is None or application.updater.running)
+
+    metrics_server.add_readiness_check("updates", receiving_updates)
+    metrics_server.add_readiness_check("database", async_db.ping)
+    try:
+        await metrics_server.start()
+    except OSError as e:
+        # A taken port must not keep the bot from serving
+        logger.error(f"Could not serve metrics on {metrics_server.host}:{metrics_server.port}: {e}")
+
+async def post_init(application: Application) -> None:
+    """Loads what the handlers need, then lets polling start; the rest starts in the background."""
+    global _background_start
+    # Independent loads, run side by side on the database executor
+    await asyncio.gather(admin_roster.load(), post_type_registry.load(), post_scheduler.start(application.bot))
+    await start_metrics(application)
+    await tracer.start()
+    _background_start = asyncio.create_task(start_background_services())
+
+async def post_shutdown(application: Application) -> None:
+    """Stops background services before the bot shuts down."""
+    if _background_start is not None:
+        _background_start.cancel()
+    await metrics_server.stop()
+    await tracer.stop()
+    await post_log_archiver.stop()
+    await schema_migrator.stop()
+    await post_stats.stop()
+    await near_duplicates.stop()
+    await post_scheduler.stop()
+
+# --- Application Setup ---
+def build_application() -> Application:
+    """Builds the application with its whole handler stack; shared by polling and webhook mode."""
+    # Every Bot API call goes through the send queue (rate limits, flood control, priorities)
+    send_queue = SendQueue(
+        global_per_second=settings.SEND_GLOBAL_PER_SECOND,
+        chat_per_second=settings.SEND_CHAT_PER_SECOND,
+        chat_burst=settings.SEND_CHAT_BURST,
+        channel_per_minute=settings.SEND_CHANNEL_PER_MINUTE,
+        max_retries=settings.SEND_MAX_RETRIES,
+    )
+    builder = (
+        Application.builder()
+        # Starts a trace for the sampled share of updates (TRACE_SAMPLE_RATE)
+        .application_class(TracedApplication)
+        .token(settings.TELEGRAM_BOT_TOKEN)
+        .base_url(settings.TELEGRAM_API_URL)
+        .base_file_url(settings.TELEGRAM_FILE_URL)
+        # Same pool sizes as PTB's defaults, but one SSL context for both clients
+        .request(SharedSSLRequest(connection_pool_size=256))
+        .get_updates_request(SharedSSLRequest(connection_pool_size=1))
+        .rate_limiter(send_queue)
+        # Open conversations and user_data survive restarts; written in batches, never per update
+        .persistence(SQLitePersistence(update_interval=settings.PERSISTENCE_INTERVAL))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if settings.UPDATE_WORKERS > 1:
+        # Different admins are served concurrently; each admin's updates still run in order
+        builder.concurrent_updates(ShardedUpdateProcessor(settings.UPDATE_WORKERS, settings.UPDATE_SHARDS))
+    application = builder.build()
 
     # --- Register Handlers ---
     # Add command handlers first
     application.add_handler(CommandHandler("start", start_admin))
     application.add_handler(CommandHandler("admin", admin_panel))
+    application.add_handler(CommandHandler("admins", list_admins))
+    application.add_handler(CommandHandler("addadmin", add_admin))
+    application.add_handler(CommandHandler("removeadmin", remove_admin))
+    application.add_handler(CommandHandler("rebuildstats", rebuild_stats))
+    application.add_handler(CommandHandler("archivelogs", archive_logs))
+    application.add_handler(CommandHandler("migrations", show_migrations))
+    application.add_handler(CommandHandler("restorelogs", restore_logs))
+    application.add_handler(CommandHandler("search", search_posts))
     
     # Add conversation handlers
     application.add_handler(post_creation_handler)
     application.add_handler(admin_management_handler)
     application.add_handler(movie_design_handler)
+    application.add_handler(batch_movie_design_handler)
+    application.add_handler(bulk_import_handler)
 
     # Add callback query handlers
     application.add_handler(CallbackQueryHandler(back_to_main_menu, pattern='^back_to_main_menu$'))
+    application.add_handler(CallbackQueryHandler(search_page, pattern='^search_page_'))
     
     # Add message handler for main menu buttons
     application.add_handler(MessageHandler(filters.Regex('^⚙️ مدیریت انواع پست$'), handle_main_menu_buttons))
@@ -53,10 +154,37 @@ def main() -> None:
 
     # Register the error handler
     application.add_error_handler(error_handler)
+    # Latency of every handler above, update counts and open conversations on /metrics
+    instrument_application(application)
+    return application
+
+# --- Main Bot Logic ---
+def main() -> None:
+    """Start the bot."""
+    setup_logging()
+    logger.info(f"Configuration loaded: {settings.summary()}")
+    # Create missing tables/columns before any handler touches the database
+    init_db()
+    application = build_application()
 
-    # Run the bot
-    logger.info("Bot is starting...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if settings.WEBHOOK_URL:
+        # Telegram pushes updates to us: no idle requests and no polling round trip per update.
+        # The secret is checked on every request, so only Telegram can inject updates.
+        secret_token = settings.WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)
+        webhook_url = f"{settings.WEBHOOK_URL.rstrip('/')}/{settings.WEBHOOK_PATH}"
+        logger.info(f"Bot is starting with a webhook at {webhook_url} (listening on {settings.WEBHOOK_LISTEN}:{settings.PORT})...")
+        application.run_webhook(
+            listen=settings.WEBHOOK_LISTEN,
+            port=settings.PORT,
+            url_path=settings.WEBHOOK_PATH,
+            webhook_url=webhook_url,
+            secret_token=secret_token,
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    else:
+        logger.info("Bot is starting with long polling...")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == '__main__':
     main()
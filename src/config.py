@@ -1,68 +1,217 @@
+import logging
 import os
-from dotenv import load_dotenv
+from functools import cached_property
+from typing import Callable, List, Mapping, Optional
 
-# Load environment variables from .env file
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # --- General Settings ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# --- Telegram Bot Configuration ---
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-if not TELEGRAM_BOT_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN is not set in the environment variables!")
-
-# --- Admin Configuration ---
-# Get admin IDs from environment variables, split by comma, and convert to int
-ADMIN_IDS_STR = os.getenv("ADMIN_USER_ID", "")
-try:
-    ADMIN_IDS = [int(admin_id.strip()) for admin_id in ADMIN_IDS_STR.split(',') if admin_id.strip()]
-except ValueError:
-    ADMIN_IDS = []
-    
-if not ADMIN_IDS:
-    print("Warning: ADMIN_USER_ID is not set or is invalid. No admin users are configured.")
-
-# --- Database Configuration ---
-DATABASE_DIR = os.path.join(BASE_DIR, 'data', 'database')
-DATABASE_PATH = os.path.join(DATABASE_DIR, 'bot.db')
-os.makedirs(DATABASE_DIR, exist_ok=True) # Ensure the directory exists
-
-# --- Banners and Media ---
 BANNERS_DIR = os.path.join(BASE_DIR, 'data', 'banners')
-os.makedirs(BANNERS_DIR, exist_ok=True) # Ensure the directory exists
-
-# --- Channel Configuration ---
-CHANNEL_ID = os.getenv("TARGET_CHANNEL_ID")
-if not CHANNEL_ID:
-    print("Warning: TARGET_CHANNEL_ID is not set. Posting to channel will fail.")
-
-# --- Logging Configuration ---
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-
-# --- Webhook Configuration (Optional) ---
-WEBHOOK_URL = os.getenv("WEBHOOK_URL")
-PORT = int(os.getenv("PORT", "8443"))
 
 # --- Bot Behavior ---
 DEFAULT_REPLY_MARKUP = None # Example: ReplyKeyboardMarkup(...)
 DEFAULT_PARSE_MODE = 'HTML'
 
-# --- Banner Settings ---
-# Example of how you might want to list banners
-def get_banner_list():
-    if not os.path.exists(BANNERS_DIR):
+
+def _env(name: str, default: Optional[str] = None, parse: Callable = str) -> cached_property:
+    """A setting read from the environment variable ``name`` on first access; None when unset without a default."""
+    def read(settings: "Settings"):
+        value = settings.get(name, default)
+        return None if value is None else parse(value)
+    read.__name__ = name
+    return cached_property(read)
+
+
+def _id_list(value: str) -> List[int]:
+    try:
+        return [int(item.strip()) for item in value.split(',') if item.strip()]
+    except ValueError:
         return []
-    return [f for f in os.listdir(BANNERS_DIR) if os.path.isfile(os.path.join(BANNERS_DIR, f))]
-
-BANNER_FILES = get_banner_list()
-
-# --- Print a confirmation that the config is loaded ---
-print("Configuration loaded successfully.")
-if TELEGRAM_BOT_TOKEN.endswith("..."): # Basic check to avoid printing the full token
-    print(f"Bot token loaded (ends with '...').")
-else:
-    print(f"Bot token loaded (ends with '...{TELEGRAM_BOT_TOKEN[-4:]}').")
-print(f"Admin IDs: {ADMIN_IDS}")
-print(f"Database path: {DATABASE_PATH}")
-print(f"Banners path: {BANNERS_DIR}")
\ No newline at end of file
+
+
+def _str_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class Settings:
+    """
+    The bot configuration, read from the environment (and the .env file) on
+    first access and cached: importing this module does no I/O, and a setting
+    that is never used is never parsed. Modules keep importing the settings
+    by name (``from src.config import CHANNEL_IDS``), which reads them from
+    the shared instance below.
+    """
+
+    def __init__(self, environ: Optional[Mapping[str, str]] = None):
+        self._environ = environ
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        if self._environ is None:
+            from dotenv import load_dotenv
+
+            # Load environment variables from .env file
+            load_dotenv()
+            self._environ = os.environ
+        return self._environ.get(name, default)
+
+    # --- Telegram Bot Configuration ---
+    @cached_property
+    def TELEGRAM_BOT_TOKEN(self) -> str:
+        token = self.get("TELEGRAM_BOT_TOKEN")
+        if not token:
+            raise ValueError("TELEGRAM_BOT_TOKEN is not set in the environment variables!")
+        return token
+
+    # Bot API server, e.g. a self-hosted telegram-bot-api instance ("http://localhost:8081/bot")
+    TELEGRAM_API_URL = _env("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+
+    # Where files (e.g. banners) are downloaded from; by default next to TELEGRAM_API_URL
+    @cached_property
+    def TELEGRAM_FILE_URL(self) -> str:
+        api_url = self.TELEGRAM_API_URL
+        default = api_url[:-len("/bot")] + "/file/bot" if api_url.endswith("/bot") else "https://api.telegram.org/file/bot"
+        return self.get("TELEGRAM_FILE_URL", default)
+
+    # --- Admin Configuration ---
+    @cached_property
+    def ADMIN_IDS(self) -> List[int]:
+        # Comma-separated user ids
+        admin_ids = _id_list(self.get("ADMIN_USER_ID", ""))
+        if not admin_ids:
+            logger.warning("ADMIN_USER_ID is not set or is invalid. No admin users are configured.")
+        return admin_ids
+
+    # --- Database Configuration ---
+    DATABASE_PATH = _env("DATABASE_PATH", os.path.join(BASE_DIR, 'data', 'database', 'bot.db'))
+    # Worker threads that run database queries off the event loop
+    DB_MAX_WORKERS = _env("DB_MAX_WORKERS", "4", int)
+    # Rows copied per transaction by the data migrations, which run while the bot keeps serving
+    MIGRATION_BATCH = _env("MIGRATION_BATCH", "500", int)
+
+    # --- Channel Configuration ---
+    @cached_property
+    def CHANNEL_IDS(self) -> List[str]:
+        # Comma-separated; used by post types that don't define their own channels
+        channel_ids = _str_list(self.get("TARGET_CHANNEL_ID", ""))
+        if not channel_ids:
+            logger.warning("TARGET_CHANNEL_ID is not set. Posting to channel will fail.")
+        return channel_ids
+
+    @property
+    def CHANNEL_ID(self) -> Optional[str]:
+        return self.CHANNEL_IDS[0] if self.CHANNEL_IDS else None
+
+    # --- Outbound Rate Limits ---
+    # Telegram allows ~30 messages/s overall, ~1/s per private chat and 20/min per channel or group
+    SEND_GLOBAL_PER_SECOND = _env("SEND_GLOBAL_PER_SECOND", "30", float)
+    SEND_CHAT_PER_SECOND = _env("SEND_CHAT_PER_SECOND", "1", float)
+    SEND_CHAT_BURST = _env("SEND_CHAT_BURST", "3", int)
+    SEND_CHANNEL_PER_MINUTE = _env("SEND_CHANNEL_PER_MINUTE", "20", float)
+    SEND_MAX_RETRIES = _env("SEND_MAX_RETRIES", "3", int)
+
+    # --- Update Processing ---
+    # Updates processed at the same time (one user's updates always run one after another); 1 processes them one by one
+    UPDATE_WORKERS = _env("UPDATE_WORKERS", "32", int)
+    # Per-user queues; users sharing one wait for each other, so keep it well above the number of admins
+    UPDATE_SHARDS = _env("UPDATE_SHARDS", "256", int)
+
+    # --- Scheduled Posts ---
+    # Timezone used to read the times admins type in
+    SCHEDULE_TIMEZONE = _env("SCHEDULE_TIMEZONE", "UTC")
+    # What to do with posts that became due while the bot was down: "run" (publish late) or "skip"
+    SCHEDULE_MISSED_POLICY = _env("SCHEDULE_MISSED_POLICY", "run", str.lower)
+    # Posts overdue by less than this are always published
+    SCHEDULE_MISSED_GRACE_MINUTES = _env("SCHEDULE_MISSED_GRACE_MINUTES", "10", int)
+
+    # --- Bulk Import ---
+    # Posts published in parallel while importing a file
+    IMPORT_CONCURRENCY = _env("IMPORT_CONCURRENCY", "4", int)
+
+    # --- Movie Design ---
+    # Post type designed films are published and logged under; its channels (or CHANNEL_IDS) receive them
+    MOVIE_POST_TYPE = _env("MOVIE_POST_TYPE", "فیلم")
+
+    # --- Caption Templates ---
+    # Compiled caption templates kept in memory (least recently used ones are dropped first)
+    CAPTION_TEMPLATE_CACHE_SIZE = _env("CAPTION_TEMPLATE_CACHE_SIZE", "128", int)
+
+    # --- Persistence ---
+    # Seconds between two writes of conversation states and user data to the database
+    PERSISTENCE_INTERVAL = _env("PERSISTENCE_INTERVAL", "30", float)
+
+    # --- Startup ---
+    # Seconds after startup before catch-up work (backfills, migrations, index loads) begins,
+    # so the first updates after a restart are not queued behind it
+    BACKGROUND_START_DELAY = _env("BACKGROUND_START_DELAY", "5", float)
+
+    # --- Post Log Retention ---
+    # Post logs older than this many days are moved to compressed archive files; 0 keeps them in the database
+    LOG_RETENTION_DAYS = _env("LOG_RETENTION_DAYS", "0", int)
+    LOG_ARCHIVE_DIR = _env("LOG_ARCHIVE_DIR", os.path.join(BASE_DIR, 'data', 'archive'))
+    # Rows moved per transaction; archiving pauses between batches so the database is never held for long
+    LOG_ARCHIVE_BATCH = _env("LOG_ARCHIVE_BATCH", "1000", int)
+    # Hours between two retention passes
+    LOG_ARCHIVE_INTERVAL_HOURS = _env("LOG_ARCHIVE_INTERVAL_HOURS", "6", float)
+    # Restored logs stay in the database this many days before they can be archived again
+    LOG_RESTORE_HOLD_DAYS = _env("LOG_RESTORE_HOLD_DAYS", "7", int)
+
+    # --- Near-Duplicate Detection ---
+    # Posts whose 64-bit fingerprints differ in at most this many bits are reported as near-duplicates
+    DUPLICATE_MAX_DISTANCE = _env("DUPLICATE_MAX_DISTANCE", "8", int)
+    # Only posts published in the last this many days are compared
+    DUPLICATE_LOOKBACK_DAYS = _env("DUPLICATE_LOOKBACK_DAYS", "90", int)
+
+    # --- Logging Configuration ---
+    LOG_LEVEL = _env("LOG_LEVEL", "INFO", str.upper)
+
+    # --- Tracing ---
+    # Share of updates (0-1) traced from receipt through handlers, database calls and Bot API calls; 0 disables tracing
+    TRACE_SAMPLE_RATE = _env("TRACE_SAMPLE_RATE", "0", float)
+    # Traces are appended to this file as OTLP/JSON, one export request per line...
+    TRACE_FILE = _env("TRACE_FILE", os.path.join(BASE_DIR, 'data', 'traces', 'traces.jsonl'))
+    # ...or sent to this OpenTelemetry collector (OTLP/HTTP base URL, e.g. http://localhost:4318) when set
+    TRACE_OTLP_ENDPOINT = _env("TRACE_OTLP_ENDPOINT", None, lambda value: value or None)
+    # Seconds between two exports of finished traces
+    TRACE_FLUSH_INTERVAL = _env("TRACE_FLUSH_INTERVAL", "5", float)
+
+    # --- Metrics ---
+    # Local HTTP endpoint with /metrics (Prometheus text format), /healthz and /readyz; 0 disables it
+    METRICS_PORT = _env("METRICS_PORT", "9102", int)
+    METRICS_LISTEN = _env("METRICS_LISTEN", "127.0.0.1")
+
+    # --- Webhook Configuration (Optional) ---
+    # Public HTTPS base URL of the bot; when set the bot serves a webhook instead of long polling
+    WEBHOOK_URL = _env("WEBHOOK_URL")
+    PORT = _env("PORT", "8443", int)
+    WEBHOOK_LISTEN = _env("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PATH = _env("WEBHOOK_PATH", "telegram", lambda value: value.strip("/"))
+    # Telegram sends it in every request; a random one is generated per start when unset
+    WEBHOOK_SECRET_TOKEN = _env("WEBHOOK_SECRET_TOKEN", None, lambda value: value or None)
+    # Simultaneous connections Telegram may open to the webhook (1-100)
+    WEBHOOK_MAX_CONNECTIONS = _env("WEBHOOK_MAX_CONNECTIONS", "40", int)
+
+    def summary(self) -> str:
+        """One line for the startup log; the token is reduced to its last characters."""
+        return (
+            f"bot token ...{self.TELEGRAM_BOT_TOKEN[-4:]}, admins {self.ADMIN_IDS}, "
+            f"channels {self.CHANNEL_IDS}, database {self.DATABASE_PATH}"
+        )
+
+
+settings = Settings()
+
+
+def setup_logging() -> None:
+    """Configures the root logger once, for the entry points (the bot, CLI scripts)."""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=getattr(logging, settings.LOG_LEVEL, logging.INFO),
+    )
+
+
+def __getattr__(name: str):
+    # Module attributes like ``src.config.CHANNEL_IDS`` are read from the settings on first use
+    if name.isupper() and hasattr(Settings, name):
+        return getattr(settings, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
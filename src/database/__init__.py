@@ -1,5 +1,7 @@
 # Database package initialization
-from src.database.models import Base, engine, SessionLocal, PostType, PostLog
+from src.database.models import Base, engine, SessionLocal, Admin, PostType, PostLog, PostStat, LogArchive, ScheduledPost, PersistenceEntry
 from src.database.database import DBManager
+from src.database.async_db import AsyncDBManager, async_db
+from src.database.persistence import SQLitePersistence
 
-__all__ = ['Base', 'engine', 'SessionLocal', 'PostType', 'PostLog', 'DBManager']
+__all__ = ['Base', 'engine', 'SessionLocal', 'Admin', 'PostType', 'PostLog', 'PostStat', 'LogArchive', 'ScheduledPost', 'PersistenceEntry', 'DBManager', 'AsyncDBManager', 'async_db', 'SQLitePersistence']
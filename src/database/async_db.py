@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import DB_MAX_WORKERS
+from src.database.database import DBManager
+from src.database.models import LogArchive, PostType, ScheduledPost
+from src.tracing import KIND_CLIENT, is_tracing, span
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool, so a burst of updates can't open an unbounded number of SQLite connections
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="db")
+
+def _call_with_session(func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    db = DBManager()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+def _traced_call_with_session(func: Callable[..., Any], args: tuple, kwargs: dict, submitted: float) -> Any:
+    with span(f"db {func.__qualname__}", kind=KIND_CLIENT) as current:
+        # Time spent waiting for a free database thread before the call started
+        current.set_attribute("db.wait_ms", round((time.perf_counter() - submitted) * 1000, 3))
+        return _call_with_session(func, args, kwargs)
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs ``func(db, *args, **kwargs)`` with a fresh DBManager on the database executor.
+
+    The returned ORM objects are detached from their (closed) session, so only
+    their loaded column attributes should be used.
+    """
+    loop = asyncio.get_running_loop()
+    if is_tracing():
+        # The worker thread runs in a copy of this context, so its span nests under the caller's
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, context.run, partial(_traced_call_with_session, func, args, kwargs, time.perf_counter()))
+    return await loop.run_in_executor(_executor, partial(_call_with_session, func, args, kwargs))
+
+class AsyncDBManager:
+    """Awaitable counterpart of DBManager that never blocks the event loop."""
+
+    async def get_post_types(self) -> List[PostType]:
+        return await run_db(DBManager.get_post_types)
+
+    async def get_post_type_names(self) -> List[str]:
+        return await run_db(DBManager.get_post_type_names)
+
+    async def get_post_type(self, name: str) -> Optional[PostType]:
+        return await run_db(DBManager.get_post_type, name)
+
+    async def add_post_type(self, name: str, banner_file: Optional[str] = None) -> bool:
+        return await run_db(DBManager.add_post_type, name, banner_file)
+
+    async def delete_post_type(self, type_name: str) -> bool:
+        return await run_db(DBManager.delete_post_type, type_name)
+
+    async def set_banner_file_id(self, name: str, file_id: Optional[str], file_unique_id: Optional[str]) -> bool:
+        return await run_db(DBManager.set_banner_file_id, name, file_id, file_unique_id)
+
+    async def set_post_type_channels(self, name: str, channels: Optional[List[str]]) -> bool:
+        return await run_db(DBManager.set_post_type_channels, name, channels)
+
+    async def set_post_type_templates(self, name: str, caption_template: Optional[str], file_caption_template: Optional[str]) -> bool:
+        return await run_db(DBManager.set_post_type_templates, name, caption_template, file_caption_template)
+
+    async def add_post_log(self, post_type_name: str, text: str, sent_by: int, media_path: Optional[str] = None, channel_id: Optional[str] = None):
+        return await run_db(DBManager.add_post_log, post_type_name, text, sent_by, media_path, channel_id)
+
+    async def add_post_logs(self, post_type_name: str, text: str, sent_by: int, media_path: Optional[str], channel_ids: List[Optional[str]], meta: str = '', simhash: Optional[int] = None) -> Optional[int]:
+        return await run_db(DBManager.add_post_logs, post_type_name, text, sent_by, media_path, channel_ids, meta, simhash)
+
+    async def get_post_fingerprints(self, since: datetime, after_id: int, limit: int) -> List[Tuple[int, Optional[int], Optional[str], Optional[datetime]]]:
+        return await run_db(DBManager.get_post_fingerprints, since, after_id, limit)
+
+    async def set_post_fingerprints(self, fingerprints: List[Tuple[int, int]]) -> bool:
+        return await run_db(DBManager.set_post_fingerprints, fingerprints)
+
+    async def search_posts(self, terms: List[str], limit: int, offset: int = 0, window: int = 1000) -> Tuple[int, List[tuple]]:
+        return await run_db(DBManager.search_posts, terms, limit, offset, window)
+
+    async def get_post_stats(self, days: List[str]) -> Dict[str, Dict[str, int]]:
+        return await run_db(DBManager.get_post_stats, days)
+
+    async def needs_stats_rebuild(self) -> bool:
+        return await run_db(DBManager.needs_stats_rebuild)
+
+    async def get_max_post_log_id(self) -> int:
+        return await run_db(DBManager.get_max_post_log_id)
+
+    async def aggregate_post_logs(self, after_id: int, up_to_id: Optional[int] = None) -> Counter:
+        return await run_db(DBManager.aggregate_post_logs, after_id, up_to_id)
+
+    async def replace_post_stats(self, counts: Dict[Tuple[str, str], int], watermark: int) -> bool:
+        return await run_db(DBManager.replace_post_stats, counts, watermark)
+
+    async def get_archivable_post_logs(self, cutoff: datetime, limit: int, held: List[Tuple[int, int]]) -> List[dict]:
+        return await run_db(DBManager.get_archivable_post_logs, cutoff, limit, held)
+
+    async def archive_post_logs(self, path: str, rows: List[dict], stats: Dict[str, Dict[str, int]]) -> bool:
+        return await run_db(DBManager.archive_post_logs, path, rows, stats)
+
+    async def get_log_archives(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[LogArchive]:
+        return await run_db(DBManager.get_log_archives, since, until)
+
+    async def get_held_log_ranges(self, restored_since: datetime) -> List[Tuple[int, int]]:
+        return await run_db(DBManager.get_held_log_ranges, restored_since)
+
+    async def release_log_archives(self, restored_before: datetime) -> int:
+        return await run_db(DBManager.release_log_archives, restored_before)
+
+    async def restore_post_logs(self, archive_id: int, rows: List[dict]) -> bool:
+        return await run_db(DBManager.restore_post_logs, archive_id, rows)
+
+    async def add_scheduled_post(self, post_type_name: str, text: str, media_path: Optional[str], run_at: datetime, created_by: int, chat_id: Optional[int] = None) -> Optional[int]:
+        return await run_db(DBManager.add_scheduled_post, post_type_name, text, media_path, run_at, created_by, chat_id)
+
+    async def get_pending_schedule(self) -> List[Tuple[int, datetime]]:
+        return await run_db(DBManager.get_pending_schedule)
+
+    async def get_scheduled_post(self, scheduled_id: int) -> Optional[Tuple[ScheduledPost, Optional[str]]]:
+        return await run_db(DBManager.get_scheduled_post, scheduled_id)
+
+    async def interrupt_scheduled_posts(self) -> List[Tuple[int, Optional[int]]]:
+        return await run_db(DBManager.interrupt_scheduled_posts)
+
+    async def set_scheduled_post_status(self, scheduled_id: int, status: str, expected: Optional[str] = None) -> bool:
+        return await run_db(DBManager.set_scheduled_post_status, scheduled_id, status, expected)
+
+    async def add_movie_delivery(self, name: str, year: Optional[str], photo_file_id: str, file_id: str, file_type: str, sent_by: int) -> Optional[int]:
+        return await run_db(DBManager.add_movie_delivery, name, year, photo_file_id, file_id, file_type, sent_by)
+
+    async def finish_movie_delivery(self, delivery_id: int, status: str, results: Dict[str, dict], log_id: Optional[int]) -> bool:
+        return await run_db(DBManager.finish_movie_delivery, delivery_id, status, results, log_id)
+
+    async def get_admins(self) -> List[Tuple[int, str]]:
+        return await run_db(DBManager.get_admins)
+
+    async def set_admin(self, user_id: int, role: str, added_by: Optional[int] = None, username: Optional[str] = None) -> bool:
+        return await run_db(DBManager.set_admin, user_id, role, added_by, username)
+
+    async def remove_admin(self, user_id: int) -> bool:
+        return await run_db(DBManager.remove_admin, user_id)
+
+    async def get_persistence_entries(self, kind: str) -> List[Tuple[str, bytes]]:
+        return await run_db(DBManager.get_persistence_entries, kind)
+
+    async def save_persistence_entries(self, entries: Dict[Tuple[str, str], Optional[bytes]]) -> bool:
+        return await run_db(DBManager.save_persistence_entries, entries)
+
+    async def ping(self) -> bool:
+        return await run_db(DBManager.ping)
+
+async_db = AsyncDBManager()
@@ -1,10 +1,39 @@
+from sqlalchemy import and_, bindparam, literal_column, or_, text as sql_text
 from sqlalchemy.orm import Session
-from src.database.models import PostType, PostLog, SessionLocal
-from typing import List, Optional
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.sql import func
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from src.config import SCHEDULE_TIMEZONE
+from src.text_normalize import normalize_persian
+from src.database.models import Admin, LogArchive, MovieDelivery, PostType, PostLog, PostStat, ScheduledPost, PersistenceEntry, SessionLocal
+from typing import Dict, List, Optional, Tuple
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Days and hours of the statistics are counted in the admins' timezone
+STATS_ZONE = ZoneInfo(SCHEDULE_TIMEZONE)
+
+# Longest prefix with its own index in post_search (see init_db.SEARCH_INDEX_DDL)
+SEARCH_PREFIX_LENGTH = 4
+
+def stat_keys(post_type_name: str, sent_by: int, sent_at: Optional[datetime]) -> List[Tuple[str, str]]:
+    """The rollup counters (dimension, key) a post log row adds to; ``sent_at`` is local time."""
+    keys = [('total', 'all'), ('type', post_type_name), ('admin', str(sent_by))]
+    if sent_at is not None:
+        keys += [('day', sent_at.strftime('%Y-%m-%d')), ('hour', f"{sent_at.hour:02d}")]
+    return keys
+
+@lru_cache(maxsize=65536)
+def _local_slot(utc_slot: str) -> Tuple[str, str]:
+    """Local (day, hour) of a UTC 'YYYY-MM-DD HH:MM' time."""
+    local = datetime.fromisoformat(utc_slot).replace(tzinfo=timezone.utc).astimezone(STATS_ZONE)
+    return local.strftime('%Y-%m-%d'), f"{local.hour:02d}"
+
 class DBManager:
     def __init__(self):
         self.db: Session = SessionLocal()
@@ -44,24 +73,623 @@ class DBManager:
             self.db.rollback()
             return False
 
-    def add_post_log(self, post_type_name: str, text: str, sent_by: int, media_path: Optional[str] = None):
+    def get_post_type_names(self) -> List[str]:
+        try:
+            return [name for (name,) in self.db.query(PostType.name).all()]
+        except Exception as e:
+            logger.error(f"Error fetching post type names: {e}")
+            return []
+
+    def get_post_type(self, name: str) -> Optional[PostType]:
+        try:
+            return self.db.query(PostType).filter(PostType.name == name).first()
+        except Exception as e:
+            logger.error(f"Error fetching post type '{name}': {e}")
+            return None
+
+    def set_banner_file_id(self, name: str, file_id: Optional[str], file_unique_id: Optional[str]) -> bool:
+        """Stores (or clears, when None) the Telegram file_id of a post type's banner."""
+        try:
+            post_type = self.db.query(PostType).filter(PostType.name == name).first()
+            if not post_type:
+                return False
+            post_type.banner_file_id = file_id
+            post_type.banner_file_unique_id = file_unique_id
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating banner file_id for '{name}': {e}")
+            self.db.rollback()
+            return False
+
+    def set_post_type_channels(self, name: str, channels: Optional[List[str]]) -> bool:
+        """Sets the target channels of a post type; None/empty falls back to the default channels."""
+        try:
+            post_type = self.db.query(PostType).filter(PostType.name == name).first()
+            if not post_type:
+                return False
+            post_type.channels = ",".join(channels) if channels else None
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating channels for '{name}': {e}")
+            self.db.rollback()
+            return False
+
+    def set_post_type_templates(self, name: str, caption_template: Optional[str], file_caption_template: Optional[str]) -> bool:
+        """Sets the caption templates of a post type; None/empty falls back to the built-in layout."""
+        try:
+            post_type = self.db.query(PostType).filter(PostType.name == name).first()
+            if not post_type:
+                return False
+            post_type.caption_template = caption_template or None
+            post_type.file_caption_template = file_caption_template or None
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating caption templates for '{name}': {e}")
+            self.db.rollback()
+            return False
+
+    def add_post_log(self, post_type_name: str, text: str, sent_by: int, media_path: Optional[str] = None, channel_id: Optional[str] = None):
+        self.add_post_logs(post_type_name, text, sent_by, media_path, [channel_id])
+
+    def add_post_logs(self, post_type_name: str, text: str, sent_by: int, media_path: Optional[str], channel_ids: List[Optional[str]], meta: str = '', simhash: Optional[int] = None) -> Optional[int]:
+        """
+        Adds one log row per channel the post was delivered to, in a single commit,
+        and returns the id of the first one. The post is indexed for search once,
+        with ``meta`` (e.g. film details) next to its text; the meta is kept with
+        the logs, so a restored or re-indexed post is found by it again.
+        """
         try:
             post_type = self.db.query(PostType).filter(PostType.name == post_type_name).first()
             if not post_type:
                 logger.error(f"Post type '{post_type_name}' not found.")
-                return
+                return None
+
+            logs = [
+                PostLog(
+                    post_type_id=post_type.id,
+                    text=text,
+                    media_path=media_path,
+                    channel_id=channel_id,
+                    sent_by=sent_by,
+                    simhash=simhash,
+                    meta=meta or None
+                )
+                for channel_id in channel_ids
+            ]
+            self.db.add_all(logs)
+            self.db.flush()
+            self._index_posts([(logs[0].id, text, f"{post_type_name} {meta}")])
+            # Rollups are bumped in the same transaction, so they never drift from the logs
+            now = datetime.now(STATS_ZONE)
+            self._increment_stats({key: len(channel_ids) for key in stat_keys(post_type_name, sent_by, now)})
+            self.db.commit()
+            return logs[0].id
+        except Exception as e:
+            logger.error(f"Error adding post log: {e}")
+            self.db.rollback()
+            return None
+
+    # --- Search index ---
+    def _index_posts(self, posts: List[Tuple[int, str, str]]):
+        """Adds (first log id, text, meta) posts to the full-text index."""
+        if posts:
+            self.db.execute(
+                sql_text("INSERT INTO post_search (rowid, body, meta) VALUES (:id, :body, :meta)"),
+                [{"id": log_id, "body": normalize_persian(body), "meta": normalize_persian(meta)} for log_id, body, meta in posts]
+            )
+
+    def _index_log_rows(self, rows: List[Tuple[int, str, Optional[str], int, Optional[datetime], Optional[int], Optional[str]]]) -> int:
+        """
+        Indexes (id, text, post type, sent_by, sent_at, post_type_id, meta) log rows
+        that aren't indexed yet, one entry per post: the rows of a post delivered to
+        several channels share their text, sender and time.
+        """
+        if not rows:
+            return 0
+        posts = {}
+        for log_id, body, type_name, sent_by, sent_at, post_type_id, meta in rows:
+            posts.setdefault((body, sent_by, sent_at, post_type_id), (log_id, body, f"{type_name or ''} {meta or ''}"))
+        ids = [log_id for log_id, _, _ in posts.values()]
+        indexed = set(self.db.execute(
+            sql_text("SELECT rowid FROM post_search WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": ids}
+        ).scalars())
+        missing = [post for post in posts.values() if post[0] not in indexed]
+        self._index_posts(missing)
+        return len(missing)
 
-            new_log = PostLog(
+    def _log_rows(self, query):
+        return query.with_entities(
+            PostLog.id, PostLog.text, PostType.name, PostLog.sent_by, PostLog.sent_at, PostLog.post_type_id, PostLog.meta
+        ).outerjoin(PostType, PostLog.post_type_id == PostType.id).order_by(PostLog.id).all()
+
+    def search_posts(self, terms: List[str], limit: int, offset: int = 0, window: int = 1000) -> Tuple[int, List[tuple]]:
+        """
+        Full-text search of the posts containing every (normalized) term; a short
+        last term also matches as a prefix. The newest ``window`` matches are ranked
+        with bm25, so a very common word costs the same as a rare one. Returns the
+        number of matches (``window + 1`` meaning "more than window") and one page
+        of (log id, snippet, post type, sent_by, sent_at) rows, best first.
+        """
+        if not terms:
+            return 0, []
+        quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+        # A short last word is probably still being typed; prefixes up to this length have their own index
+        match = " ".join(quoted) + ("*" if len(terms[-1]) <= SEARCH_PREFIX_LENGTH else "")
+        params = {"match": match, "window": window, "limit": limit, "offset": offset}
+        try:
+            total = self.db.execute(sql_text(
+                "SELECT count(*) FROM (SELECT rowid FROM post_search WHERE post_search MATCH :match "
+                "ORDER BY rowid DESC LIMIT :window + 1)"
+            ), params).scalar()
+            ids = self.db.execute(sql_text(
+                "SELECT rowid FROM (SELECT rowid, rank FROM post_search WHERE post_search MATCH :match "
+                "ORDER BY rowid DESC LIMIT :window) ORDER BY rank LIMIT :limit OFFSET :offset"
+            ), params).scalars().all()
+            if not ids:
+                return total, []
+            # Snippets and details only for the page
+            snippets = dict(self.db.execute(
+                sql_text(
+                    "SELECT rowid, snippet(post_search, 0, char(2), char(3), '…', 24) FROM post_search "
+                    "WHERE post_search MATCH :match AND rowid IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"match": match, "ids": ids}
+            ).all())
+            logs = {
+                log_id: (name, sent_by, sent_at)
+                for log_id, name, sent_by, sent_at in self.db.query(PostLog.id, PostType.name, PostLog.sent_by, PostLog.sent_at)
+                .outerjoin(PostType, PostLog.post_type_id == PostType.id)
+                .filter(PostLog.id.in_(ids))
+            }
+            return total, [(log_id, snippets.get(log_id, ''), *logs[log_id]) for log_id in ids if log_id in logs]
+        except Exception as e:
+            logger.error(f"Error searching posts for {terms}: {e}")
+            return 0, []
+
+    def _increment_stats(self, counts: Dict[Tuple[str, str], int]):
+        rows = [{"dimension": dimension, "key": key, "count": count} for (dimension, key), count in counts.items() if count]
+        if not rows:
+            return
+        statement = insert(PostStat)
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[PostStat.dimension, PostStat.key],
+            set_={"count": PostStat.count + statement.excluded.count}
+        ), rows)
+
+    def get_post_stats(self, days: List[str]) -> Dict[str, Dict[str, int]]:
+        """Reads the rollups for a report: every counter except days, of which only ``days`` are read."""
+        report: Dict[str, Dict[str, int]] = {}
+        try:
+            rows = self.db.query(PostStat.dimension, PostStat.key, PostStat.count).filter(or_(
+                PostStat.dimension.in_(('total', 'type', 'admin', 'hour')),
+                and_(PostStat.dimension == 'day', PostStat.key.in_(days))
+            )).all()
+            for dimension, key, count in rows:
+                report.setdefault(dimension, {})[key] = count
+        except Exception as e:
+            logger.error(f"Error fetching post stats: {e}")
+        return report
+
+    def needs_stats_rebuild(self) -> bool:
+        """True when there are post logs but no rollups yet (e.g. the first start after an upgrade)."""
+        try:
+            has_total = self.db.query(PostStat.count).filter(PostStat.dimension == 'total').first() is not None
+            return not has_total and self.db.query(PostLog.id).first() is not None
+        except Exception as e:
+            logger.error(f"Error checking post stats: {e}")
+            return False
+
+    def get_max_post_log_id(self) -> int:
+        return self.db.query(func.max(PostLog.id)).scalar() or 0
+
+    def aggregate_post_logs(self, after_id: int, up_to_id: Optional[int] = None) -> Counter:
+        """
+        Counts the post logs with after_id < id <= up_to_id into rollup keys.
+
+        SQLite does the grouping: once by type and admin, once by UTC quarter-hour.
+        Every timezone offset is a multiple of 15 minutes, so only the quarter-hour
+        groups need converting to local days and hours here.
+        """
+        def in_range(query):
+            query = query.filter(PostLog.id > after_id)
+            return query.filter(PostLog.id <= up_to_id) if up_to_id is not None else query
+
+        counts: Counter = Counter()
+        by_sender = in_range(
+            self.db.query(PostType.name, PostLog.sent_by, func.count(PostLog.id))
+            .outerjoin(PostType, PostLog.post_type_id == PostType.id)
+        ).group_by(PostLog.post_type_id, PostLog.sent_by)
+        for name, sent_by, count in by_sender:
+            for key in stat_keys(name or '?', sent_by, None):
+                counts[key] += count
+
+        quarter = literal_column(
+            "strftime('%Y-%m-%d %H:', post_logs.sent_at) || "
+            "printf('%02d', CAST(strftime('%M', post_logs.sent_at) AS INTEGER) / 15 * 15)"
+        )
+        for slot, count in in_range(self.db.query(quarter, func.count(PostLog.id))).group_by(quarter):
+            if not slot:
+                continue
+            day, hour = _local_slot(slot)
+            counts[('day', day)] += count
+            counts[('hour', hour)] += count
+        return counts
+
+    def replace_post_stats(self, counts: Dict[Tuple[str, str], int], watermark: int) -> bool:
+        """
+        Swaps in rebuilt rollups covering logs up to ``watermark``, plus the logs
+        added since, all in one transaction.
+        """
+        try:
+            # Deleting first takes the write lock, so no log can be added between the tail count and the insert
+            self.db.query(PostStat).delete()
+            totals = Counter(counts)
+            totals.update(self.aggregate_post_logs(watermark))
+            # Archived logs are gone from post_logs but still count
+            totals.update(self._archived_stats())
+            rows = [{"dimension": dimension, "key": key, "count": count} for (dimension, key), count in totals.items()]
+            if rows:
+                self.db.execute(insert(PostStat), rows)
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error replacing post stats: {e}")
+            self.db.rollback()
+            return False
+
+    def _archived_stats(self) -> Counter:
+        counts: Counter = Counter()
+        for (stats,) in self.db.query(LogArchive.stats).filter(LogArchive.restored_at.is_(None)):
+            for dimension, keys in json.loads(stats or '{}').items():
+                for key, count in keys.items():
+                    counts[(dimension, key)] += count
+        return counts
+
+    # --- Near-duplicate fingerprints ---
+    def get_post_fingerprints(self, since: datetime, after_id: int, limit: int) -> List[Tuple[int, Optional[int], Optional[str], Optional[datetime]]]:
+        """
+        (id, simhash, text, sent_at) of the logs sent since ``since`` (naive UTC), by id;
+        the text is only read for logs without a fingerprint yet.
+        """
+        try:
+            rows = self.db.query(PostLog.id, PostLog.simhash, PostLog.text, PostLog.sent_at).filter(
+                PostLog.sent_at >= since, PostLog.id > after_id
+            ).order_by(PostLog.id).limit(limit).all()
+            return [(log_id, simhash, text if simhash is None else None, sent_at) for log_id, simhash, text, sent_at in rows]
+        except Exception as e:
+            logger.error(f"Error fetching post fingerprints: {e}")
+            return []
+
+    def set_post_fingerprints(self, fingerprints: List[Tuple[int, int]]) -> bool:
+        try:
+            self.db.execute(
+                PostLog.__table__.update().where(PostLog.__table__.c.id == bindparam("log_id")).values(simhash=bindparam("value")),
+                [{"log_id": log_id, "value": value} for log_id, value in fingerprints]
+            )
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error storing post fingerprints: {e}")
+            self.db.rollback()
+            return False
+
+    # --- Post log retention ---
+    def get_archivable_post_logs(self, cutoff: datetime, limit: int, held: List[Tuple[int, int]]) -> List[dict]:
+        """The oldest ``limit`` logs sent before ``cutoff`` (naive UTC), skipping the ``held`` id ranges."""
+        try:
+            # Plain columns: building ORM objects for every batch would cost more than the query
+            columns = (PostLog.id, PostLog.post_type_id, PostType.name, PostLog.text, PostLog.media_path, PostLog.channel_id, PostLog.sent_at, PostLog.sent_by, PostLog.meta)
+            query = (
+                self.db.query(*columns)
+                .outerjoin(PostType, PostLog.post_type_id == PostType.id)
+                .filter(PostLog.sent_at < cutoff)
+            )
+            for first_id, last_id in held:
+                query = query.filter(~PostLog.id.between(first_id, last_id))
+            keys = ("id", "post_type_id", "post_type", "text", "media_path", "channel_id", "sent_at", "sent_by", "meta")
+            rows = [dict(zip(keys, row)) for row in query.order_by(PostLog.id).limit(limit)]
+            for row in rows:
+                row["sent_at"] = row["sent_at"].isoformat() if row["sent_at"] else None
+            return rows
+        except Exception as e:
+            logger.error(f"Error fetching post logs to archive: {e}")
+            return []
+
+    def archive_post_logs(self, path: str, rows: List[dict], stats: Dict[str, Dict[str, int]]) -> bool:
+        """Records the archive file of ``rows`` and deletes them from post_logs, in one transaction."""
+        try:
+            sent = [datetime.fromisoformat(row["sent_at"]) for row in rows if row["sent_at"]]
+            self.db.add(LogArchive(
+                path=path,
+                first_id=rows[0]["id"],
+                last_id=rows[-1]["id"],
+                first_sent_at=min(sent) if sent else None,
+                last_sent_at=max(sent) if sent else None,
+                rows=len(rows),
+                stats=json.dumps(stats, ensure_ascii=False),
+            ))
+            ids = [row["id"] for row in rows]
+            self.db.query(PostLog).filter(PostLog.id.in_(ids)).delete(synchronize_session=False)
+            self.db.execute(sql_text("DELETE FROM post_search WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error archiving post logs to {path}: {e}")
+            self.db.rollback()
+            return False
+
+    def get_log_archives(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[LogArchive]:
+        """Archives not restored yet that hold logs sent between ``since`` and ``until`` (naive UTC)."""
+        try:
+            query = self.db.query(LogArchive).filter(LogArchive.restored_at.is_(None))
+            if since is not None:
+                query = query.filter(LogArchive.last_sent_at >= since)
+            if until is not None:
+                query = query.filter(LogArchive.first_sent_at < until)
+            return query.order_by(LogArchive.first_id).all()
+        except Exception as e:
+            logger.error(f"Error fetching log archives: {e}")
+            return []
+
+    def get_held_log_ranges(self, restored_since: datetime) -> List[Tuple[int, int]]:
+        """Id ranges restored after ``restored_since``, which the retention job must leave alone."""
+        try:
+            return self.db.query(LogArchive.first_id, LogArchive.last_id).filter(LogArchive.restored_at >= restored_since).all()
+        except Exception as e:
+            logger.error(f"Error fetching held log ranges: {e}")
+            return []
+
+    def release_log_archives(self, restored_before: datetime) -> int:
+        """Forgets archives restored before ``restored_before``; their logs can be archived again."""
+        try:
+            count = self.db.query(LogArchive).filter(LogArchive.restored_at < restored_before).delete(synchronize_session=False)
+            self.db.commit()
+            return count
+        except Exception as e:
+            logger.error(f"Error releasing log archives: {e}")
+            self.db.rollback()
+            return 0
+
+    def restore_post_logs(self, archive_id: int, rows: List[dict]) -> bool:
+        """
+        Puts the rows of an archive back into post_logs and marks the archive
+        restored, in one transaction: either every row comes back or none does.
+        The rollups already count these logs.
+
+        Rows keep their original ids, except where a newer log took the id in
+        the meantime (SQLite hands out the ids of deleted newest rows again);
+        those get new ids, and the archive's id range is widened to cover them
+        so the retention job holds them like the others.
+        """
+        try:
+            archive = self.db.get(LogArchive, archive_id)
+            if archive is None or archive.restored_at is not None:
+                return False
+            if rows:
+                taken = set(self.db.execute(
+                    sql_text("SELECT id FROM post_logs WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": [row["id"] for row in rows]}
+                ).scalars())
+                values = [
+                    {
+                        "id": row["id"],
+                        "post_type_id": row["post_type_id"],
+                        "text": row["text"],
+                        "media_path": row["media_path"],
+                        "channel_id": row["channel_id"],
+                        "sent_at": datetime.fromisoformat(row["sent_at"]) if row["sent_at"] else None,
+                        "sent_by": row["sent_by"],
+                        # Archives written before logs kept their meta have none
+                        "meta": row.get("meta"),
+                    }
+                    for row in rows
+                ]
+                kept = [value for value in values if value["id"] not in taken]
+                if kept:
+                    self.db.execute(insert(PostLog), kept)
+                moved = [PostLog(**{key: value for key, value in row.items() if key != "id"}) for row in values if row["id"] in taken]
+                if moved:
+                    self.db.add_all(moved)
+                    self.db.flush()
+                    archive.last_id = max(archive.last_id, max(log.id for log in moved))
+                    logger.warning(f"Log archive {archive_id}: {len(moved)} logs got new ids, their old ids are used by newer logs.")
+                restored_ids = [value["id"] for value in kept] + [log.id for log in moved]
+                self._index_log_rows(self._log_rows(self.db.query(PostLog).filter(PostLog.id.in_(restored_ids))))
+            archive.restored_at = datetime.utcnow()
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error restoring log archive {archive_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def add_scheduled_post(self, post_type_name: str, text: str, media_path: Optional[str], run_at: datetime, created_by: int, chat_id: Optional[int] = None) -> Optional[int]:
+        """Stores a post to publish at ``run_at`` (naive UTC) and returns its id."""
+        try:
+            post_type = self.db.query(PostType).filter(PostType.name == post_type_name).first()
+            if not post_type:
+                logger.error(f"Post type '{post_type_name}' not found.")
+                return None
+
+            scheduled = ScheduledPost(
                 post_type_id=post_type.id,
                 text=text,
                 media_path=media_path,
-                sent_by=sent_by
+                run_at=run_at,
+                created_by=created_by,
+                chat_id=chat_id,
+                status='pending'
             )
-            self.db.add(new_log)
+            self.db.add(scheduled)
             self.db.commit()
+            return scheduled.id
         except Exception as e:
-            logger.error(f"Error adding post log: {e}")
+            logger.error(f"Error adding scheduled post: {e}")
             self.db.rollback()
+            return None
+
+    def get_pending_schedule(self) -> List[Tuple[int, datetime]]:
+        """Returns (id, run_at) of every pending scheduled post, without loading the posts."""
+        try:
+            return self.db.query(ScheduledPost.id, ScheduledPost.run_at).filter(ScheduledPost.status == 'pending').all()
+        except Exception as e:
+            logger.error(f"Error fetching scheduled posts: {e}")
+            return []
+
+    def interrupt_scheduled_posts(self) -> List[Tuple[int, Optional[int]]]:
+        """
+        Marks the posts left 'sending' by a stopped bot as 'interrupted' and returns
+        their (id, chat_id): some channels may have them already, so they aren't resent.
+        """
+        try:
+            rows = self.db.query(ScheduledPost.id, ScheduledPost.chat_id).filter(ScheduledPost.status == 'sending').all()
+            if rows:
+                self.db.query(ScheduledPost).filter(ScheduledPost.id.in_([scheduled_id for scheduled_id, _ in rows])).update(
+                    {ScheduledPost.status: 'interrupted'}, synchronize_session=False
+                )
+                self.db.commit()
+            return [(scheduled_id, chat_id) for scheduled_id, chat_id in rows]
+        except Exception as e:
+            logger.error(f"Error recovering interrupted scheduled posts: {e}")
+            self.db.rollback()
+            return []
+
+    def get_scheduled_post(self, scheduled_id: int) -> Optional[Tuple[ScheduledPost, Optional[str]]]:
+        """Returns a scheduled post together with its post type name."""
+        try:
+            scheduled = self.db.query(ScheduledPost).filter(ScheduledPost.id == scheduled_id).first()
+            if not scheduled:
+                return None
+            return scheduled, scheduled.post_type.name if scheduled.post_type else None
+        except Exception as e:
+            logger.error(f"Error fetching scheduled post {scheduled_id}: {e}")
+            return None
+
+    def set_scheduled_post_status(self, scheduled_id: int, status: str, expected: Optional[str] = None) -> bool:
+        """Sets the status of a scheduled post; with ``expected``, only if that is its current status."""
+        try:
+            query = self.db.query(ScheduledPost).filter(ScheduledPost.id == scheduled_id)
+            if expected is not None:
+                query = query.filter(ScheduledPost.status == expected)
+            updated = query.update({ScheduledPost.status: status})
+            self.db.commit()
+            return bool(updated)
+        except Exception as e:
+            logger.error(f"Error updating scheduled post {scheduled_id}: {e}")
+            self.db.rollback()
+            return False
+
+    # --- Movie deliveries ---
+    def add_movie_delivery(self, name: str, year: Optional[str], photo_file_id: str, file_id: str, file_type: str, sent_by: int) -> Optional[int]:
+        """Records a film about to be published and returns the id of its delivery record."""
+        try:
+            delivery = MovieDelivery(
+                name=name,
+                year=year,
+                photo_file_id=photo_file_id,
+                file_id=file_id,
+                file_type=file_type,
+                sent_by=sent_by,
+                status='pending'
+            )
+            self.db.add(delivery)
+            self.db.commit()
+            return delivery.id
+        except Exception as e:
+            logger.error(f"Error adding movie delivery: {e}")
+            self.db.rollback()
+            return None
+
+    def finish_movie_delivery(self, delivery_id: int, status: str, results: Dict[str, dict], log_id: Optional[int]) -> bool:
+        """Stores the outcome of a film's delivery: per-channel message ids or errors, and its post log."""
+        try:
+            updated = self.db.query(MovieDelivery).filter(MovieDelivery.id == delivery_id).update({
+                MovieDelivery.status: status,
+                MovieDelivery.results: json.dumps(results, ensure_ascii=False),
+                MovieDelivery.log_id: log_id,
+                MovieDelivery.finished_at: datetime.now(timezone.utc).replace(tzinfo=None),
+            })
+            self.db.commit()
+            return bool(updated)
+        except Exception as e:
+            logger.error(f"Error updating movie delivery {delivery_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def get_admins(self) -> List[Tuple[int, str]]:
+        """Returns (user_id, role) of every admin."""
+        try:
+            return self.db.query(Admin.user_id, Admin.role).all()
+        except Exception as e:
+            logger.error(f"Error fetching admins: {e}")
+            return []
+
+    def set_admin(self, user_id: int, role: str, added_by: Optional[int] = None, username: Optional[str] = None) -> bool:
+        """Adds an admin, or changes the role of an existing one."""
+        try:
+            admin = self.db.query(Admin).filter(Admin.user_id == user_id).first()
+            if admin:
+                admin.role = role
+                if username:
+                    admin.username = username
+            else:
+                self.db.add(Admin(user_id=user_id, role=role, added_by=added_by, username=username))
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving admin {user_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def remove_admin(self, user_id: int) -> bool:
+        try:
+            deleted = self.db.query(Admin).filter(Admin.user_id == user_id).delete()
+            self.db.commit()
+            return bool(deleted)
+        except Exception as e:
+            logger.error(f"Error removing admin {user_id}: {e}")
+            self.db.rollback()
+            return False
+
+    def get_persistence_entries(self, kind: str) -> List[Tuple[str, bytes]]:
+        try:
+            return self.db.query(PersistenceEntry.key, PersistenceEntry.data).filter(PersistenceEntry.kind == kind).all()
+        except Exception as e:
+            logger.error(f"Error fetching persistence entries '{kind}': {e}")
+            return []
+
+    def save_persistence_entries(self, entries: Dict[Tuple[str, str], Optional[bytes]]) -> bool:
+        """Writes a batch of (kind, key) -> data entries in one transaction; None deletes the entry."""
+        try:
+            upserts = [{"kind": kind, "key": key, "data": data} for (kind, key), data in entries.items() if data is not None]
+            if upserts:
+                statement = insert(PersistenceEntry)
+                self.db.execute(statement.on_conflict_do_update(
+                    index_elements=[PersistenceEntry.kind, PersistenceEntry.key],
+                    set_={"data": statement.excluded.data, "updated_at": func.now()}
+                ), upserts)
+            for (kind, key), data in entries.items():
+                if data is None:
+                    self.db.query(PersistenceEntry).filter(PersistenceEntry.kind == kind, PersistenceEntry.key == key).delete()
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving persistence entries: {e}")
+            self.db.rollback()
+            return False
+
+    # --- Health ---
+    def ping(self) -> bool:
+        """True when the database answers a trivial query (readiness probe)."""
+        try:
+            return self.db.execute(sql_text("SELECT 1")).scalar() == 1
+        except Exception as e:
+            logger.error(f"Database ping failed: {e}")
+            return False
 
     def close(self):
         """Explicitly close the database session."""
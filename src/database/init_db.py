@@ -1,15 +1,82 @@
+import logging
 import os
 import sys
 
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+from sqlalchemy import inspect, text
+from src.config import DATABASE_PATH, setup_logging
 from src.database.models import Base, engine
 
+logger = logging.getLogger(__name__)
+
+# Columns added after the first release; create_all() does not alter existing tables
+ADDED_COLUMNS = {
+    'post_types': {
+        'banner_file': 'VARCHAR',
+        'banner_file_id': 'VARCHAR',
+        'banner_file_unique_id': 'VARCHAR',
+        'channels': 'VARCHAR',
+        'caption_template': 'VARCHAR',
+        'file_caption_template': 'VARCHAR',
+    },
+    'post_logs': {
+        'channel_id': 'VARCHAR',
+        'simhash': 'INTEGER',
+        'meta': 'VARCHAR',
+    },
+    # Older databases may have the admins table of data/database/models.py
+    'admins': {
+        'role': "VARCHAR NOT NULL DEFAULT 'admin'",
+        'added_by': 'INTEGER',
+        'created_at': 'DATETIME',
+    },
+}
+
+def upgrade_db():
+    """Adds missing columns and indexes to tables created by an older version of the bot."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table)}
+            for name, column_type in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+                    logger.info(f"Added column {table}.{name}.")
+
+        # Indexes declared after a table was first created
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    logger.info(f"Added index {index.name}.")
+
+# Full-text index of the posts: one row per post (rowid = its first post_logs id), Persian-normalized text.
+# Prefix indexes keep short "as you type" prefixes from expanding over the whole vocabulary.
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5("
+    "body, meta, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+)
+
+def create_search_index():
+    with engine.begin() as conn:
+        conn.execute(text(SEARCH_INDEX_DDL))
+
 def init_db():
-    print("Initializing database...")
+    logger.info("Initializing database...")
+    # SQLite creates the file, but not its directory
+    os.makedirs(os.path.dirname(os.path.abspath(DATABASE_PATH)), exist_ok=True)
     Base.metadata.create_all(bind=engine)
-    print("Database initialized successfully.")
+    upgrade_db()
+    create_search_index()
+    logger.info("Database initialized successfully.")
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    setup_logging()
+    init_db()
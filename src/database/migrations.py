@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import inspect, text as sql_text
+from sqlalchemy.dialects.sqlite import insert
+from src.config import MIGRATION_BATCH
+from src.database.async_db import run_db
+from src.database.database import DBManager, STATS_ZONE, stat_keys
+from src.database.models import PostLog, SchemaMigration
+
+logger = logging.getLogger(__name__)
+
+# Pause between two batches, so handlers get the database in between
+BATCH_PAUSE = 0.1
+# Seconds between two progress log lines of a running migration
+PROGRESS_INTERVAL = 30
+
+# A step migrates at most ``limit`` source rows after ``cursor`` in the caller's
+# transaction and returns (new cursor, rows migrated); fewer rows than ``limit``
+# means the migration is complete.
+Step = Callable[[DBManager, int, int], Tuple[int, int]]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    step: Step
+    remaining: Callable[[DBManager, int], int]  # Source rows after a cursor
+
+
+@dataclass(frozen=True)
+class MigrationProgress:
+    version: int
+    name: str
+    status: str  # pending, running, done
+    rows_done: int
+    rows_total: Optional[int]
+
+    @property
+    def percent(self) -> float:
+        if self.status == 'done':
+            return 100.0
+        if not self.rows_total:
+            return 0.0
+        return min(100.0, self.rows_done * 100 / self.rows_total)
+
+
+def _has_table(db: DBManager, name: str) -> bool:
+    return inspect(db.db.connection()).has_table(name)
+
+
+def _count_after(db: DBManager, table: str, cursor: int) -> int:
+    if not _has_table(db, table):
+        return 0
+    return db.db.execute(sql_text(f"SELECT COUNT(*) FROM {table} WHERE id > :cursor"), {"cursor": cursor}).scalar()
+
+
+# --- Legacy schema (data/database/models.py) ---
+def _migrate_admins(db: DBManager, cursor: int, limit: int) -> Tuple[int, int]:
+    """
+    Admins of the legacy schema live in the same ``admins`` table (upgrade_db adds
+    the role columns); their placeholder ``Admin_<id>`` usernames are cleared and
+    their creation time filled in.
+    """
+    if not _has_table(db, 'admins'):
+        return cursor, 0
+    ids = db.db.execute(
+        sql_text("SELECT id FROM admins WHERE id > :cursor ORDER BY id LIMIT :limit"), {"cursor": cursor, "limit": limit}
+    ).scalars().all()
+    if not ids:
+        return cursor, 0
+    db.db.execute(sql_text(
+        "UPDATE admins SET "
+        "username = CASE WHEN username = 'Admin_' || user_id THEN NULL ELSE username END, "
+        "role = COALESCE(NULLIF(role, ''), 'admin'), "
+        "created_at = COALESCE(created_at, CURRENT_TIMESTAMP) "
+        "WHERE id > :cursor AND id <= :last"
+    ), {"cursor": cursor, "last": ids[-1]})
+    return ids[-1], len(ids)
+
+
+def _migrate_posts_log(db: DBManager, cursor: int, limit: int) -> Tuple[int, int]:
+    """
+    Copies legacy ``posts_log`` rows into ``post_logs`` (content -> text,
+    sender_id -> sent_by), indexing them for search and counting them in the
+    statistics. ``file_id`` is a Telegram file id, not a local path, so it is
+    not carried into ``media_path``; the legacy table is left untouched.
+    """
+    if not _has_table(db, 'posts_log'):
+        return cursor, 0
+    rows = db.db.execute(sql_text(
+        "SELECT l.id, l.post_type_id, t.name, l.content, l.sender_id, l.sent_at "
+        "FROM posts_log l LEFT JOIN post_types t ON t.id = l.post_type_id "
+        "WHERE l.id > :cursor ORDER BY l.id LIMIT :limit"
+    ), {"cursor": cursor, "limit": limit}).all()
+    if not rows:
+        return cursor, 0
+
+    # The caller holds the write lock, so every log after this id is one of ours
+    first_new = db.get_max_post_log_id()
+    counts: Counter = Counter()
+    values = []
+    for _, post_type_id, type_name, content, sender_id, sent_at in rows:
+        sent_at = datetime.fromisoformat(sent_at) if sent_at else None
+        values.append({
+            "post_type_id": post_type_id,
+            "text": content or '',
+            "media_path": None,
+            "channel_id": None,
+            "sent_at": sent_at,
+            "sent_by": sender_id,
+        })
+        local = sent_at.replace(tzinfo=timezone.utc).astimezone(STATS_ZONE) if sent_at else None
+        counts.update(stat_keys(type_name or '?', sender_id, local))
+    db.db.execute(insert(PostLog), values)
+    db._index_log_rows(db._log_rows(db.db.query(PostLog).filter(PostLog.id > first_new)))
+    db._increment_stats(counts)
+    return rows[-1][0], len(rows)
+
+
+# --- Search index ---
+def _post_key(row: tuple) -> tuple:
+    """The logs of a post delivered to several channels share text, sender, time and type."""
+    _, body, _, sent_by, sent_at, post_type_id, _ = row
+    return body, sent_by, sent_at, post_type_id
+
+
+def _backfill_search(db: DBManager, cursor: int, limit: int) -> Tuple[int, int]:
+    """
+    Indexes the posts logged before the search index existed. Posts logged
+    since are indexed by add_post_logs and skipped, so the backfill walks the
+    whole history even when the index is no longer empty, and resumes from its
+    cursor after a restart.
+    """
+    ids = [log_id for (log_id,) in db.db.query(PostLog.id).filter(PostLog.id > cursor).order_by(PostLog.id).limit(limit)]
+    if not ids:
+        return cursor, 0
+    rows = db._log_rows(db.db.query(PostLog).filter(PostLog.id >= cursor, PostLog.id <= ids[-1]))
+    # Logs continuing the last post of the previous batch were indexed with its first log
+    if rows and rows[0][0] == cursor:
+        previous = _post_key(rows[0])
+        start = 1
+        while start < len(rows) and _post_key(rows[start]) == previous:
+            start += 1
+        rows = rows[start:]
+    db._index_log_rows(rows)
+    return ids[-1], len(ids)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "legacy_admins", _migrate_admins, lambda db, cursor: _count_after(db, 'admins', cursor)),
+    Migration(2, "legacy_posts_log", _migrate_posts_log, lambda db, cursor: _count_after(db, 'posts_log', cursor)),
+    Migration(3, "search_backfill", _backfill_search, lambda db, cursor: _count_after(db, 'post_logs', cursor)),
+]
+_BY_VERSION: Dict[int, Migration] = {migration.version: migration for migration in MIGRATIONS}
+
+
+# --- Runner (database side) ---
+def _progress(migration: Migration, state: Optional[SchemaMigration]) -> MigrationProgress:
+    if state is None:
+        return MigrationProgress(migration.version, migration.name, 'pending', 0, None)
+    return MigrationProgress(migration.version, migration.name, state.status, state.rows_done, state.rows_total)
+
+
+def get_migrations(db: DBManager) -> List[MigrationProgress]:
+    """The progress of every known migration, by version."""
+    try:
+        states = {state.version: state for state in db.db.query(SchemaMigration)}
+        return [_progress(migration, states.get(migration.version)) for migration in MIGRATIONS]
+    except Exception as e:
+        logger.error(f"Error fetching schema migrations: {e}")
+        return []
+
+
+def run_migration_batch(db: DBManager, version: int, batch_size: int) -> Optional[MigrationProgress]:
+    """
+    Migrates the next batch of a migration and moves its cursor, in one
+    transaction: an interrupted migration resumes exactly where it stopped.
+    """
+    migration = _BY_VERSION[version]
+    try:
+        now = datetime.utcnow()
+        state = db.db.get(SchemaMigration, version)
+        if state is None:
+            state = SchemaMigration(version=version, name=migration.name, status='pending', cursor=0, rows_done=0)
+            db.db.add(state)
+        if state.status == 'done':
+            return _progress(migration, state)
+        if state.status == 'pending':
+            state.status = 'running'
+            state.started_at = now
+            state.rows_total = migration.remaining(db, state.cursor)
+        # Writing the state first takes the write lock for the whole batch
+        state.updated_at = now
+        db.db.flush()
+
+        state.cursor, migrated = migration.step(db, state.cursor, batch_size)
+        state.rows_done += migrated
+        if migrated < batch_size:
+            state.status = 'done'
+            state.finished_at = now
+        progress = _progress(migration, state)
+        db.db.commit()
+        return progress
+    except Exception as e:
+        logger.error(f"Error running migration {version} ({migration.name}): {e}")
+        db.db.rollback()
+        return None
+
+
+def run_pending(batch_size: int = MIGRATION_BATCH, report: Callable[[MigrationProgress], None] = lambda progress: None) -> bool:
+    """Runs every unfinished migration to completion in this thread; returns False if one failed."""
+    db = DBManager()
+    try:
+        for progress in get_migrations(db):
+            while progress.status != 'done':
+                progress = run_migration_batch(db, progress.version, batch_size)
+                if progress is None:
+                    return False
+                report(progress)
+        return True
+    finally:
+        db.close()
+
+
+# --- Runner (bot side) ---
+class SchemaMigrator:
+    """
+    Runs the pending data migrations in the background while the bot serves.
+
+    Each batch is one short transaction on the database executor, with a pause
+    in between, so handlers keep getting the database. Progress is stored in
+    ``schema_migrations``: after a restart or a failure the runner picks up at
+    the next batch. Migrations run in version order, each after the previous
+    one is done.
+    """
+
+    def __init__(self, batch_size: int = MIGRATION_BATCH, batch_pause: float = BATCH_PAUSE):
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def status(self) -> List[MigrationProgress]:
+        return await run_db(get_migrations)
+
+    async def run(self) -> int:
+        """Runs every unfinished migration; returns the number of rows migrated."""
+        migrated = 0
+        for progress in await self.status():
+            if progress.status == 'done':
+                continue
+            logger.info(f"Running migration {progress.version} ({progress.name}).")
+            start = last_report = time.monotonic()
+            done_before = progress.rows_done
+            while progress.status != 'done':
+                progress = await run_db(run_migration_batch, progress.version, self.batch_size)
+                if progress is None:
+                    raise RuntimeError("migration batch failed")
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    logger.info(f"Migration {progress.version} ({progress.name}): {progress.rows_done}/{progress.rows_total or '?'} rows ({progress.percent:.0f}%).")
+                if progress.status != 'done':
+                    await asyncio.sleep(self.batch_pause)
+            migrated += progress.rows_done - done_before
+            logger.info(f"Migration {progress.version} ({progress.name}) done: {progress.rows_done} rows in {time.monotonic() - start:.1f}s.")
+        return migrated
+
+    async def _run(self) -> None:
+        try:
+            await self.run()
+        except Exception as e:
+            logger.error(f"Error running schema migrations, they resume on the next start: {e}")
+
+    def start(self) -> bool:
+        """Starts the pending migrations in the background; False if they are already running."""
+        if self.running:
+            return False
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self) -> None:
+        if self.running:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+
+schema_migrator = SchemaMigrator()
+
+
+if __name__ == "__main__":
+    from src.database.init_db import init_db
+
+    parser = argparse.ArgumentParser(description="Runs the pending data migrations to completion (they also run in the background when the bot starts).")
+    parser.add_argument("--status", action="store_true", help="only show the progress of every migration")
+    parser.add_argument("--batch", type=int, default=MIGRATION_BATCH, help="rows per transaction")
+    args = parser.parse_args()
+
+    init_db()
+    if not args.status:
+        last_print = 0.0
+
+        def report(progress: MigrationProgress) -> None:
+            global last_print
+            if progress.status == 'done' or time.monotonic() - last_print >= 1:
+                last_print = time.monotonic()
+                print(f"{progress.version} {progress.name}: {progress.rows_done}/{progress.rows_total or '?'} rows ({progress.percent:.0f}%)")
+
+        if not run_pending(args.batch, report):
+            print("A migration failed; run again to resume it.")
+            sys.exit(1)
+    db = DBManager()
+    for progress in get_migrations(db):
+        print(f"{progress.version} {progress.name}: {progress.status}, {progress.rows_done} rows")
+    db.close()
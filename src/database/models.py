@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 from sqlalchemy.sql import func
 from src.config import DATABASE_PATH
@@ -10,7 +10,19 @@ class PostType(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, nullable=False, index=True)
     banner_file = Column(String, nullable=True)
+    # Telegram ids of the first upload of the banner, reused instead of re-uploading the file
+    banner_file_id = Column(String, nullable=True)
+    banner_file_unique_id = Column(String, nullable=True)
+    # Comma-separated target channels; empty means the default TARGET_CHANNEL_ID list
+    channels = Column(String, nullable=True)
+    # Caption templates ({field} placeholders, see src/utils/caption_templates.py); empty means the built-in layout
+    caption_template = Column(String, nullable=True)
+    file_caption_template = Column(String, nullable=True)
     
+    @property
+    def channel_list(self) -> list:
+        return [channel for channel in (self.channels or "").split(',') if channel]
+
     def __repr__(self):
         return f"<PostType(id={self.id}, name='{self.name}')>"
 
@@ -21,12 +33,133 @@ class PostLog(Base):
     post_type = relationship("PostType", backref="logs")
     text = Column(String, nullable=False)
     media_path = Column(String, nullable=True)
+    channel_id = Column(String, nullable=True) # One row per channel the post was delivered to
     sent_at = Column(DateTime(timezone=True), server_default=func.now())
     sent_by = Column(Integer, nullable=False) # Admin User ID
+    simhash = Column(Integer, nullable=True) # 64-bit SimHash of the text (signed), for near-duplicate detection
+    meta = Column(String, nullable=True) # Searchable details beyond the text (e.g. a film's genre, language, actors)
+
+    # Reports filter by time, admin and type; retention scans by time
+    __table_args__ = (
+        Index('ix_post_logs_sent_at', 'sent_at'),
+        Index('ix_post_logs_sent_by', 'sent_by'),
+        Index('ix_post_logs_post_type_id_sent_at', 'post_type_id', 'sent_at'),
+    )
     
     def __repr__(self):
         return f"<PostLog(id={self.id}, post_type_id={self.post_type_id}, sent_by={self.sent_by})>"
 
+class ScheduledPost(Base):
+    __tablename__ = 'scheduled_posts'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    post_type_id = Column(Integer, ForeignKey('post_types.id', ondelete='CASCADE'))
+    post_type = relationship("PostType")
+    text = Column(String, nullable=False)
+    media_path = Column(String, nullable=True)
+    run_at = Column(DateTime, nullable=False) # UTC
+    status = Column(String, nullable=False, default='pending') # pending, sending, sent, failed, missed, interrupted
+    created_by = Column(Integer, nullable=False) # Admin User ID
+    chat_id = Column(Integer, nullable=True) # Admin chat notified about the outcome
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index('ix_scheduled_posts_status_run_at', 'status', 'run_at'),)
+
+    def __repr__(self):
+        return f"<ScheduledPost(id={self.id}, run_at={self.run_at}, status='{self.status}')>"
+
+class MovieDelivery(Base):
+    """A film published to the channels by the movie design flow, with the outcome per channel."""
+    __tablename__ = 'movie_deliveries'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False)
+    year = Column(String, nullable=True)
+    photo_file_id = Column(String, nullable=False)
+    file_id = Column(String, nullable=False)
+    file_type = Column(String, nullable=False) # document, video
+    status = Column(String, nullable=False, default='pending') # pending, sent, partial, failed
+    # JSON: channel -> {"message_ids": [...], "error": ...}
+    results = Column(String, nullable=False, default='{}')
+    log_id = Column(Integer, nullable=True) # First post_logs row of the delivered post
+    sent_by = Column(Integer, nullable=False) # Admin User ID
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime, nullable=True) # UTC
+
+    __table_args__ = (Index('ix_movie_deliveries_created_at', 'created_at'),)
+
+    def __repr__(self):
+        return f"<MovieDelivery(id={self.id}, name='{self.name}', status='{self.status}')>"
+
+class PostStat(Base):
+    """Rollup counters of post_logs rows, kept up to date by add_post_logs."""
+    __tablename__ = 'post_stats'
+    dimension = Column(String, primary_key=True) # total, type, admin, day, hour
+    key = Column(String, primary_key=True) # all, post type name, admin id, YYYY-MM-DD, HH
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PostStat({self.dimension}={self.key}: {self.count})>"
+
+class LogArchive(Base):
+    """A gzip JSONL file holding post_logs rows moved out of the database by the retention job."""
+    __tablename__ = 'log_archives'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path = Column(String, nullable=False) # File name inside LOG_ARCHIVE_DIR
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    first_sent_at = Column(DateTime, nullable=True) # UTC
+    last_sent_at = Column(DateTime, nullable=True) # UTC
+    rows = Column(Integer, nullable=False)
+    # JSON rollup counters of the archived rows, so statistics rebuilds keep counting them
+    stats = Column(String, nullable=False, default='{}')
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set when the rows were put back into post_logs; they are not archived again until the hold ends
+    restored_at = Column(DateTime, nullable=True) # UTC
+
+    __table_args__ = (Index('ix_log_archives_sent_at', 'first_sent_at', 'last_sent_at'),)
+
+    def __repr__(self):
+        return f"<LogArchive(path='{self.path}', ids={self.first_id}-{self.last_id}, rows={self.rows})>"
+
+class SchemaMigration(Base):
+    """Progress of a versioned data migration; batched ones resume from ``cursor``."""
+    __tablename__ = 'schema_migrations'
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='pending') # pending, running, done
+    cursor = Column(Integer, nullable=False, default=0) # Last source id migrated
+    rows_done = Column(Integer, nullable=False, default=0)
+    rows_total = Column(Integer, nullable=True) # Estimated when the migration started
+    started_at = Column(DateTime, nullable=True) # UTC
+    updated_at = Column(DateTime, nullable=True) # UTC, last batch
+    finished_at = Column(DateTime, nullable=True) # UTC
+
+    def __repr__(self):
+        return f"<SchemaMigration(version={self.version}, name='{self.name}', status='{self.status}')>"
+
+class Admin(Base):
+    """Users allowed to use the bot; owners can also manage the roster."""
+    __tablename__ = 'admins'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, unique=True, nullable=False)
+    username = Column(String(100), nullable=True)
+    role = Column(String, nullable=False, default='admin') # owner, admin
+    added_by = Column(Integer, nullable=True) # User ID of the owner who added the admin
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Admin(user_id={self.user_id}, role='{self.role}')>"
+
+class PersistenceEntry(Base):
+    """Pickled conversation state or user/chat/bot data of the bot's persistence."""
+    __tablename__ = 'persistence'
+    kind = Column(String, primary_key=True) # user_data, chat_data, bot_data, callback_data or conversation:<name>
+    key = Column(String, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PersistenceEntry(kind='{self.kind}', key='{self.key}')>"
+
 # Create engine with better configuration
 engine = create_engine(
     f'sqlite:///{DATABASE_PATH}',
@@ -34,6 +167,15 @@ engine = create_engine(
     connect_args={"check_same_thread": False}
 )
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside a writer and needs far fewer fsyncs per commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
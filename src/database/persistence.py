@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import pickle
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from src.database.async_db import async_db
+
+logger = logging.getLogger(__name__)
+
+ConversationKey = Tuple[Union[int, str], ...]
+ConversationDict = Dict[ConversationKey, object]
+# Cache of arbitrary callback data (only used when the bot enables it)
+CDCData = Tuple[List[Tuple[str, float, Dict[str, Any]]], Dict[str, str]]
+
+class SQLitePersistence(BasePersistence[Dict[Any, Any], Dict[Any, Any], Dict[Any, Any]]):
+    """
+    Stores conversation states and user/chat/bot data in the bot's SQLite database.
+
+    The Application hands over changed data once every ``update_interval`` seconds.
+    Entries are pickled right away (a snapshot) and kept in memory; the whole batch
+    is then written in a single transaction on the database executor, so no update
+    ever waits for a commit. Blobs equal to the last stored ones are not rewritten.
+    ``flush()``, called by the Application on shutdown, writes whatever is left.
+    """
+
+    def __init__(self, store_data: Optional[PersistenceInput] = None, update_interval: float = 60):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self._dirty: Dict[Tuple[str, str], Optional[bytes]] = {}
+        self._stored: Dict[Tuple[str, str], bytes] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    # --- Loading ---
+    async def _load(self, kind: str) -> Dict[str, Any]:
+        loaded = {}
+        for key, data in await async_db.get_persistence_entries(kind):
+            try:
+                loaded[key] = pickle.loads(data)
+            except Exception as e:
+                logger.error(f"Dropping unreadable persistence entry {kind}/{key}: {e}")
+                continue
+            self._stored[(kind, key)] = data
+        return loaded
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {int(key): value for key, value in (await self._load("user_data")).items()}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {int(key): value for key, value in (await self._load("chat_data")).items()}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return (await self._load("bot_data")).get("bot", {})
+
+    async def get_callback_data(self) -> Optional[CDCData]:
+        return (await self._load("callback_data")).get("callback")
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        loaded = await self._load(f"conversation:{name}")
+        return {tuple(json.loads(key)): state for key, state in loaded.items()}
+
+    # --- Write-behind ---
+    def _mark(self, kind: str, key: str, value: Any) -> None:
+        entry = (kind, key)
+        if value is None:
+            data = None
+        else:
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.error(f"Could not pickle persistence entry {kind}/{key}: {e}")
+                return
+        if data == self._stored.get(entry) and entry not in self._dirty:
+            return
+        self._dirty[entry] = data
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_dirty())
+
+    async def _flush_dirty(self) -> None:
+        # The Application updates every changed entry in one go; let the whole batch arrive first
+        await asyncio.sleep(0)
+        async with self._write_lock:
+            while self._dirty:
+                batch, self._dirty = self._dirty, {}
+                if not await async_db.save_persistence_entries(batch):
+                    # Keep the batch for the next run, unless newer data replaced it meanwhile
+                    self._dirty = {**batch, **self._dirty}
+                    return
+                for entry, data in batch.items():
+                    if data is None:
+                        self._stored.pop(entry, None)
+                    else:
+                        self._stored[entry] = data
+                logger.debug(f"Persisted {len(batch)} entries.")
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._mark("user_data", str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._mark("chat_data", str(chat_id), data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._mark("bot_data", "bot", data)
+
+    async def update_callback_data(self, data: CDCData) -> None:
+        self._mark("callback_data", "callback", data)
+
+    async def update_conversation(self, name: str, key: ConversationKey, new_state: Optional[object]) -> None:
+        self._mark(f"conversation:{name}", json.dumps(list(key)), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._mark("user_data", str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._mark("chat_data", str(chat_id), None)
+
+    # This persistence holds the only other copy of the data, nothing to refresh from
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Writes every pending entry; called once when the Application stops."""
+        if self._flush_task:
+            await self._flush_task
+        await self._flush_dirty()
+        stats = defaultdict(int)
+        for kind, _ in self._stored:
+            stats[kind.split(':')[0]] += 1
+        logger.info(f"Persistence flushed: {dict(stats)}")
@@ -1,7 +1,9 @@
 # Handlers package initialization
 from src.handlers.start_handler import start, back_to_main_menu, handle_main_menu_buttons
 from src.handlers.post_handler import post_creation_handler
-from src.handlers.admin_handlers import admin_management_handler, admin_panel
+from src.handlers.admin_handlers import admin_management_handler, admin_panel, list_admins, add_admin, remove_admin, rebuild_stats, archive_logs, restore_logs, show_migrations
+from src.handlers.import_handler import bulk_import_handler
+from src.handlers.search_handler import search_posts, search_page
 
 __all__ = [
     'start',
@@ -9,5 +11,15 @@ __all__ = [
     'handle_main_menu_buttons',
     'post_creation_handler',
     'admin_management_handler',
-    'admin_panel'
+    'admin_panel',
+    'list_admins',
+    'add_admin',
+    'remove_admin',
+    'rebuild_stats',
+    'archive_logs',
+    'restore_logs',
+    'show_migrations',
+    'bulk_import_handler',
+    'search_posts',
+    'search_page'
 ]
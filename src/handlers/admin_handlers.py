@@ -1,5 +1,6 @@
 import logging
-import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from telegram import Update
 from telegram.ext import (
     ContextTypes,
@@ -9,14 +10,19 @@ from telegram.ext import (
     CommandHandler,
     filters,
 )
-from src.utils.validators import admin_only
+from src.utils.validators import admin_only, owner_only, parse_channel_ids
+from src.utils.admin_roster import admin_roster, ADMIN, OWNER, ROLES
+from src.utils.stats import post_stats
+from src.utils.log_archive import post_log_archiver
+from src.database.migrations import schema_migrator
+from src.database.database import STATS_ZONE
 from src.utils.keyboards import admin_panel_keyboard, back_to_admin_panel_keyboard
-from src.database.database import DBManager
+from src.config import CHANNEL_IDS
+from src.utils.post_type_registry import post_type_registry
+from src.utils.banner_cache import banner_cache
+from src.utils.banner_store import banner_store
+from src.utils.caption_templates import FIELDS, caption_templates, check_template
 
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 # --- Conversation States ---
@@ -24,7 +30,12 @@ logger = logging.getLogger(__name__)
     ADD_POST_TYPE_NAME,
     ADD_POST_TYPE_BANNER,
     DELETE_POST_TYPE_SELECT,
-) = range(4)
+    SET_CHANNELS_TYPE,
+    SET_CHANNELS_LIST,
+    SET_TEMPLATE_TYPE,
+    SET_TEMPLATE_CAPTION,
+    SET_TEMPLATE_FILE_CAPTION,
+) = range(9)
 
 # --- Main Admin Panel ---
 @admin_only
@@ -42,17 +53,13 @@ async def view_post_types(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
 
-    db = DBManager()
-    try:
-        post_types = db.get_post_types()
-        
-        if not post_types:
-            text = "هیچ نوع پستی تعریف نشده است."
-        else:
-            text = "انواع پست موجود:\n\n"
-            text += "\n".join([f"- {pt.name}" for pt in post_types])
-    finally:
-        db.close()
+    post_types = await post_type_registry.all()
+
+    if not post_types:
+        text = "هیچ نوع پستی تعریف نشده است."
+    else:
+        text = "انواع پست موجود:\n\n"
+        text += "\n".join([f"- {pt.name} ({', '.join(pt.channel_list or CHANNEL_IDS) or 'بدون کانال'})" for pt in post_types])
 
     await query.edit_message_text(text=text, reply_markup=back_to_admin_panel_keyboard())
     return MANAGE_POST_TYPES
@@ -86,28 +93,27 @@ async def add_post_type_banner_received(update: Update, context: ContextTypes.DE
     photo = update.message.photo[-1]
     file = await photo.get_file()
 
-    # Ensure banner directory exists
-    os.makedirs("data/banners", exist_ok=True)
-    banner_path = f"data/banners/{post_type_name}.jpg"
-
-    await file.download_to_drive(banner_path)
-    logger.info(f"Banner for '{post_type_name}' saved to {banner_path}.")
-
-    db = DBManager()
     try:
-        if db.add_post_type(post_type_name):
-            await update.message.reply_text(
-                f"نوع پست '{post_type_name}' با موفقیت اضافه شد.",
-                reply_markup=admin_panel_keyboard(),
-            )
-            logger.info(f"Post type '{post_type_name}' added to the database.")
-        else:
-            await update.message.reply_text(
-                f"خطا: نوع پستی با نام '{post_type_name}' از قبل وجود دارد.",
-                reply_markup=admin_panel_keyboard(),
-            )
-    finally:
-        db.close()
+        banner_file = await banner_store.ingest(file)
+    except Exception as e:
+        logger.error(f"Error saving banner for '{post_type_name}': {e}")
+        await update.message.reply_text("خطا در ذخیره بنر. لطفاً دوباره عکس را ارسال کنید.")
+        return ADD_POST_TYPE_BANNER
+    logger.info(f"Banner for '{post_type_name}' saved as {banner_file}.")
+
+    if await post_type_registry.add(post_type_name, banner_file):
+        await update.message.reply_text(
+            f"نوع پست '{post_type_name}' با موفقیت اضافه شد.",
+            reply_markup=admin_panel_keyboard(),
+        )
+        logger.info(f"Post type '{post_type_name}' added to the database.")
+    else:
+        # The existing post type keeps its banner; drop the new file unless some post type has the same image
+        await banner_store.release(post_type_name, banner_file, [info.banner_file for info in await post_type_registry.all()])
+        await update.message.reply_text(
+            f"خطا: نوع پستی با نام '{post_type_name}' از قبل وجود دارد.",
+            reply_markup=admin_panel_keyboard(),
+        )
 
     context.user_data.clear()
     return MANAGE_POST_TYPES
@@ -119,15 +125,10 @@ async def delete_post_type_start(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     
-    db = DBManager()
-    try:
-        post_types = db.get_post_types()
-        if not post_types:
-            await query.edit_message_text("هیچ نوع پستی برای حذف وجود ندارد.", reply_markup=back_to_admin_panel_keyboard())
-            return MANAGE_POST_TYPES
-    finally:
-        db.close()
-    
+    if not await post_type_registry.names():
+        await query.edit_message_text("هیچ نوع پستی برای حذف وجود ندارد.", reply_markup=back_to_admin_panel_keyboard())
+        return MANAGE_POST_TYPES
+
     await query.edit_message_text(
         "لطفاً نام دقیق نوع پستی که می‌خواهید حذف کنید را وارد نمایید.",
         reply_markup=back_to_admin_panel_keyboard()
@@ -138,30 +139,305 @@ async def delete_post_type_start(update: Update, context: ContextTypes.DEFAULT_T
 async def delete_post_type_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Deletes the selected post type."""
     post_type_name = update.message.text.strip()
-    db = DBManager()
-    
+    deleted = await post_type_registry.get(post_type_name)
+
+    if await post_type_registry.delete(post_type_name):
+        # Also delete the banner file, unless another post type uses the same image
+        await banner_store.release(post_type_name, deleted.banner_file if deleted else None,
+                                   [info.banner_file for info in await post_type_registry.all()])
+        await banner_cache.invalidate(post_type_name, persist=False)
+        caption_templates.invalidate(post_type_name)
+
+        await update.message.reply_text(
+            f"نوع پست '{post_type_name}' با موفقیت حذف شد.",
+            reply_markup=admin_panel_keyboard()
+        )
+        logger.info(f"Admin {update.effective_user.id} deleted post type '{post_type_name}'.")
+    else:
+        await update.message.reply_text(
+            f"نوع پستی با نام '{post_type_name}' یافت نشد.",
+            reply_markup=admin_panel_keyboard()
+        )
+
+    return MANAGE_POST_TYPES
+
+# --- Post Type Channels ---
+@admin_only
+async def set_channels_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Asks which post type's target channels should be changed."""
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_text(
+        "لطفاً نام نوع پستی که می‌خواهید کانال‌های آن را تنظیم کنید وارد نمایید.",
+        reply_markup=back_to_admin_panel_keyboard()
+    )
+    return SET_CHANNELS_TYPE
+
+@admin_only
+async def set_channels_type_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Receives the post type name and asks for its channels."""
+    post_type_name = update.message.text.strip()
+    post_type = await post_type_registry.get(post_type_name)
+    if not post_type:
+        await update.message.reply_text(
+            f"نوع پستی با نام '{post_type_name}' یافت نشد.",
+            reply_markup=admin_panel_keyboard()
+        )
+        return MANAGE_POST_TYPES
+
+    context.user_data["channels_post_type"] = post_type_name
+    current = ", ".join(post_type.channel_list) or f"پیش‌فرض ({', '.join(CHANNEL_IDS) or 'بدون کانال'})"
+    await update.message.reply_text(
+        f"کانال‌های فعلی: {current}\n\n"
+        "کانال‌های جدید را با کاما جدا کنید (مثلاً @channel1, -1001234567890).\n"
+        "برای استفاده از کانال‌های پیش‌فرض، علامت - را ارسال کنید."
+    )
+    return SET_CHANNELS_LIST
+
+@admin_only
+async def set_channels_list_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Saves the target channels of the post type."""
+    post_type_name = context.user_data.get("channels_post_type")
+    text = update.message.text.strip()
+    channels = [] if text == "-" else parse_channel_ids(text)
+    if channels is None:
+        await update.message.reply_text("فرمت کانال‌ها نامعتبر است. لطفاً دوباره ارسال کنید.")
+        return SET_CHANNELS_LIST
+
+    if await post_type_registry.set_channels(post_type_name, channels):
+        await update.message.reply_text(
+            f"کانال‌های نوع پست '{post_type_name}' ذخیره شد.",
+            reply_markup=admin_panel_keyboard()
+        )
+        logger.info(f"Admin {update.effective_user.id} set channels of '{post_type_name}' to {channels or 'default'}.")
+    else:
+        await update.message.reply_text(
+            f"نوع پستی با نام '{post_type_name}' یافت نشد.",
+            reply_markup=admin_panel_keyboard()
+        )
+
+    context.user_data.pop("channels_post_type", None)
+    return MANAGE_POST_TYPES
+
+# --- Post Type Caption Templates ---
+TEMPLATE_HELP = (
+    "فیلدها: " + " ".join(f"{{{field}}}" for field in FIELDS) + "\n"
+    "مقدار جایگزین برای فیلد خالی: {country|🇺🇸 USA}\n"
+    "برای قالب پیش‌فرض علامت - و برای حفظ قالب فعلی علامت . را ارسال کنید."
+)
+
+def _template_reply(text: str, current: Optional[str]) -> Optional[str]:
+    """The template to save: None for the default ('-'), the current one ('.'), or the text sent."""
+    if text == "-":
+        return None
+    if text == ".":
+        return current
+    return text
+
+@admin_only
+async def set_templates_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Asks which post type's caption templates should be changed."""
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_text(
+        "لطفاً نام نوع پستی که می‌خواهید قالب کپشن آن را تنظیم کنید وارد نمایید.",
+        reply_markup=back_to_admin_panel_keyboard()
+    )
+    return SET_TEMPLATE_TYPE
+
+@admin_only
+async def set_templates_type_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Receives the post type name and asks for its caption template."""
+    post_type_name = update.message.text.strip()
+    post_type = await post_type_registry.get(post_type_name)
+    if not post_type:
+        await update.message.reply_text(
+            f"نوع پستی با نام '{post_type_name}' یافت نشد.",
+            reply_markup=admin_panel_keyboard()
+        )
+        return MANAGE_POST_TYPES
+
+    context.user_data["template_post_type"] = post_type_name
+    await update.message.reply_text(
+        f"قالب فعلی کپشن:\n\n{post_type.caption_template or 'پیش‌فرض'}\n\n"
+        f"قالب جدید کپشن پست را ارسال کنید.\n{TEMPLATE_HELP}"
+    )
+    return SET_TEMPLATE_CAPTION
+
+@admin_only
+async def set_templates_caption_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Checks the caption template and asks for the template of the film file's caption."""
+    post_type = await post_type_registry.get(context.user_data.get("template_post_type"))
+    template = _template_reply(update.message.text.strip(), post_type.caption_template if post_type else None)
+    unknown = check_template(template) if template else None
+    if unknown:
+        await update.message.reply_text(f"فیلد '{unknown}' وجود ندارد. لطفاً دوباره ارسال کنید.\n{TEMPLATE_HELP}")
+        return SET_TEMPLATE_CAPTION
+
+    context.user_data["template_caption"] = template
+    await update.message.reply_text(
+        f"قالب فعلی کپشن فایل (پست دوم فیلم):\n\n{(post_type.file_caption_template if post_type else None) or 'پیش‌فرض'}\n\n"
+        f"قالب جدید کپشن فایل را ارسال کنید.\n{TEMPLATE_HELP}"
+    )
+    return SET_TEMPLATE_FILE_CAPTION
+
+@admin_only
+async def set_templates_file_caption_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Saves both caption templates of the post type."""
+    post_type_name = context.user_data.get("template_post_type")
+    post_type = await post_type_registry.get(post_type_name)
+    template = _template_reply(update.message.text.strip(), post_type.file_caption_template if post_type else None)
+    unknown = check_template(template) if template else None
+    if unknown:
+        await update.message.reply_text(f"فیلد '{unknown}' وجود ندارد. لطفاً دوباره ارسال کنید.\n{TEMPLATE_HELP}")
+        return SET_TEMPLATE_FILE_CAPTION
+
+    if await post_type_registry.set_templates(post_type_name, context.user_data.get("template_caption"), template):
+        caption_templates.invalidate(post_type_name)
+        await update.message.reply_text(
+            f"قالب‌های کپشن نوع پست '{post_type_name}' ذخیره شد.",
+            reply_markup=admin_panel_keyboard()
+        )
+        logger.info(f"Admin {update.effective_user.id} set caption templates of '{post_type_name}'.")
+    else:
+        await update.message.reply_text(
+            f"نوع پستی با نام '{post_type_name}' یافت نشد.",
+            reply_markup=admin_panel_keyboard()
+        )
+
+    context.user_data.pop("template_post_type", None)
+    context.user_data.pop("template_caption", None)
+    return MANAGE_POST_TYPES
+
+# --- Admin Roster ---
+ROLE_TITLES = {"owner": "👑 مالک", "admin": "🛡 ادمین"}
+
+@owner_only
+async def list_admins(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/admins: lists the admin roster."""
+    lines = [f"{ROLE_TITLES.get(role, role)} — {user_id}" for user_id, role in admin_roster.members()]
+    await update.message.reply_text("👥 فهرست ادمین‌ها:\n\n" + "\n".join(lines))
+
+@owner_only
+async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/addadmin <user_id> [owner|admin]: adds an admin or changes their role, without a restart."""
+    args = context.args or []
+    role = args[1].lower() if len(args) > 1 else ADMIN
+    if not args or not args[0].isdigit() or role not in ROLES:
+        await update.message.reply_text(
+            "استفاده: /addadmin <شناسه عددی کاربر> [owner|admin]\n"
+            "مثال: /addadmin 123456789"
+        )
+        return
+
+    user_id = int(args[0])
+    if user_id in admin_roster.configured_owners and role != OWNER:
+        await update.message.reply_text("⛔️ این کاربر در تنظیمات (ADMIN_USER_ID) مالک تعریف شده و نقش او از ربات قابل تغییر نیست.")
+    elif await admin_roster.add(user_id, role, added_by=update.effective_user.id):
+        await update.message.reply_text(f"✅ کاربر {user_id} با نقش {ROLE_TITLES[role]} ذخیره شد.")
+    else:
+        await update.message.reply_text("❌ خطا در ذخیره ادمین. لطفاً دوباره تلاش کنید.")
+
+@owner_only
+async def remove_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/removeadmin <user_id>: removes an admin, effective immediately."""
+    args = context.args or []
+    if not args or not args[0].isdigit():
+        await update.message.reply_text("استفاده: /removeadmin <شناسه عددی کاربر>")
+        return
+
+    user_id = int(args[0])
+    if user_id in admin_roster.configured_owners:
+        await update.message.reply_text("⛔️ این کاربر در تنظیمات (ADMIN_USER_ID) تعریف شده و از ربات قابل حذف نیست.")
+    elif await admin_roster.remove(user_id):
+        await update.message.reply_text(f"✅ کاربر {user_id} از فهرست ادمین‌ها حذف شد.")
+        logger.info(f"Owner {update.effective_user.id} removed admin {user_id}.")
+    else:
+        await update.message.reply_text(f"کاربر {user_id} ادمین نیست.")
+
+# --- Statistics ---
+@owner_only
+async def rebuild_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/rebuildstats: recounts the statistics rollups from the post logs in the background."""
+    if post_stats.start_rebuild():
+        await update.message.reply_text("⏳ بازسازی آمار در پس‌زمینه شروع شد.")
+        logger.info(f"Owner {update.effective_user.id} started a statistics rebuild.")
+    else:
+        await update.message.reply_text("⏳ بازسازی آمار از قبل در حال اجراست.")
+
+# --- Post Log Retention ---
+@owner_only
+async def archive_logs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/archivelogs: runs a retention pass now, in the background."""
+    if not post_log_archiver.enabled:
+        await update.message.reply_text("بایگانی گزارش‌ها غیرفعال است (LOG_RETENTION_DAYS برابر ۰ است).")
+        return
+
+    async def run() -> None:
+        try:
+            moved = await post_log_archiver.archive_pass()
+            await update.message.reply_text(f"✅ {moved} گزارش ارسال قدیمی بایگانی شد.")
+        except Exception as e:
+            logger.error(f"Error in manual post log archiving: {e}")
+            await update.message.reply_text("❌ خطا در بایگانی گزارش‌ها.")
+
+    await update.message.reply_text(f"⏳ بایگانی گزارش‌های قدیمی‌تر از {post_log_archiver.retention_days} روز شروع شد.")
+    context.application.create_task(run(), update=update)
+
+@owner_only
+async def restore_logs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/restorelogs <from> [to]: puts archived logs of a date range (YYYY-MM-DD, local time) back into the database."""
+    args = context.args or []
     try:
-        if db.delete_post_type(post_type_name):
-            # Also delete the banner file
-            banner_path = f"data/banners/{post_type_name}.jpg"
-            if os.path.exists(banner_path):
-                os.remove(banner_path)
-                logger.info(f"Banner file {banner_path} deleted.")
+        dates = [datetime.strptime(arg, "%Y-%m-%d").replace(tzinfo=STATS_ZONE) for arg in args[:2]]
+    except ValueError:
+        dates = []
+    if not dates:
+        await update.message.reply_text(
+            "استفاده: /restorelogs <از تاریخ> [تا تاریخ]\n"
+            "مثال: /restorelogs 2024-01-01 2024-01-31"
+        )
+        return
 
+    since = dates[0].astimezone(timezone.utc).replace(tzinfo=None)
+    until = (dates[-1] + timedelta(days=1)).astimezone(timezone.utc).replace(tzinfo=None)
+
+    async def run() -> None:
+        try:
+            restored = await post_log_archiver.restore(since, until)
             await update.message.reply_text(
-                f"نوع پست '{post_type_name}' با موفقیت حذف شد.",
-                reply_markup=admin_panel_keyboard()
+                f"✅ {restored} گزارش از بایگانی بازگردانده شد."
+                + (f"\nاین گزارش‌ها تا {post_log_archiver.hold_days} روز دوباره بایگانی نمی‌شوند." if restored else "")
             )
-            logger.info(f"Admin {update.effective_user.id} deleted post type '{post_type_name}'.")
+            logger.info(f"Owner {update.effective_user.id} restored {restored} archived post logs ({args[:2]}).")
+        except Exception as e:
+            logger.error(f"Error restoring archived post logs: {e}")
+            await update.message.reply_text("❌ خطا در بازگرداندن گزارش‌ها.")
+
+    await update.message.reply_text("⏳ بازگرداندن گزارش‌های بایگانی‌شده شروع شد.")
+    context.application.create_task(run(), update=update)
+
+# --- Schema Migrations ---
+MIGRATION_STATUS = {'pending': "در انتظار", 'running': "در حال اجرا", 'done': "انجام شد"}
+
+@owner_only
+async def show_migrations(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/migrations: shows the progress of the data migrations and resumes unfinished ones."""
+    migrations = await schema_migrator.status()
+    lines = ["🗄 مهاجرت‌های پایگاه داده:"]
+    for progress in migrations:
+        total = f"/{progress.rows_total}" if progress.rows_total is not None else ""
+        lines.append(
+            f"{progress.version}. {progress.name}: {MIGRATION_STATUS.get(progress.status, progress.status)} "
+            f"({progress.rows_done}{total} ردیف، {progress.percent:.0f}%)"
+        )
+    if any(progress.status != 'done' for progress in migrations):
+        if schema_migrator.start():
+            lines.append("\n⏳ ادامه مهاجرت‌های ناتمام در پس‌زمینه شروع شد.")
+            logger.info(f"Owner {update.effective_user.id} resumed the schema migrations.")
         else:
-            await update.message.reply_text(
-                f"نوع پستی با نام '{post_type_name}' یافت نشد.",
-                reply_markup=admin_panel_keyboard()
-            )
-    finally:
-        db.close()
-        
-    return MANAGE_POST_TYPES
+            lines.append("\n⏳ مهاجرت‌ها در پس‌زمینه در حال اجرا هستند.")
+    await update.message.reply_text("\n".join(lines))
 
 # --- Back and Cancel ---
 @admin_only
@@ -187,16 +463,25 @@ admin_management_handler = ConversationHandler(
             CallbackQueryHandler(view_post_types, pattern="^view_post_types$"),
             CallbackQueryHandler(add_post_type_start, pattern="^add_post_type$"),
             CallbackQueryHandler(delete_post_type_start, pattern="^delete_post_type$"),
+            CallbackQueryHandler(set_channels_start, pattern="^set_post_type_channels$"),
+            CallbackQueryHandler(set_templates_start, pattern="^set_post_type_templates$"),
             CallbackQueryHandler(back_to_admin_menu, pattern="^back_to_admin_menu$"),
         ],
         ADD_POST_TYPE_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_post_type_name_received)],
         ADD_POST_TYPE_BANNER: [MessageHandler(filters.PHOTO, add_post_type_banner_received)],
         DELETE_POST_TYPE_SELECT: [MessageHandler(filters.TEXT & ~filters.COMMAND, delete_post_type_received)],
+        SET_CHANNELS_TYPE: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_channels_type_received)],
+        SET_CHANNELS_LIST: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_channels_list_received)],
+        SET_TEMPLATE_TYPE: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_templates_type_received)],
+        SET_TEMPLATE_CAPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_templates_caption_received)],
+        SET_TEMPLATE_FILE_CAPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_templates_file_caption_received)],
     },
     fallbacks=[
         CallbackQueryHandler(cancel_admin_action, pattern="^cancel$"),
         MessageHandler(filters.Regex('^❌ لغو$'), cancel_admin_action)
     ],
     allow_reentry=True,
-    per_message=False
+    per_message=False,
+    name="admin_management",
+    persistent=True
 )
@@ -0,0 +1,221 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Set, Tuple
+
+from telegram import Bot, Update
+from telegram.ext import (
+    ContextTypes,
+    ConversationHandler,
+    CommandHandler,
+    MessageHandler,
+    filters,
+)
+from src.config import IMPORT_CONCURRENCY
+from src.utils.validators import admin_only
+from src.utils.keyboards import main_menu_keyboard
+from src.utils.post_builder import deliver_post, get_banner_path
+from src.utils.post_type_registry import post_type_registry
+from src.utils.caption_templates import CAPTION, DEFAULT_POST_CAPTION, caption_templates
+
+logger = logging.getLogger(__name__)
+
+# --- Conversation States ---
+WAITING_FOR_IMPORT_FILE = 0
+
+# Minimum seconds between two edits of the progress message
+PROGRESS_INTERVAL = 2.0
+# Invalid rows listed in the final report
+MAX_REPORTED_ERRORS = 10
+
+@dataclass
+class ImportProgress:
+    sent: int = 0
+    failed: int = 0
+    invalid: int = 0
+    errors: List[str] = field(default_factory=list)
+    done: bool = False
+
+    def add_error(self, line: int, reason: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"سطر {line}: {reason}")
+
+    def render(self) -> str:
+        title = "✅ درون‌ریزی پایان یافت." if self.done else "📥 در حال درون‌ریزی پست‌ها..."
+        text = (
+            f"{title}\n\n"
+            f"ارسال‌شده: {self.sent}\n"
+            f"ناموفق: {self.failed}\n"
+            f"نامعتبر: {self.invalid}"
+        )
+        if self.done and self.errors:
+            text += "\n\n" + "\n".join(self.errors)
+        return text
+
+# --- Parsing ---
+def iter_import_rows(path: str, file_format: str) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Streams (line number, post type, text) rows from a CSV or JSONL file.
+    Rows that can't be parsed are yielded with a None type.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, (row.get("type") or "").strip() or None, row.get("text")
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield line_no, None, None
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, None, None
+                    continue
+                yield line_no, (str(row.get("type") or "")).strip() or None, row.get("text")
+
+def detect_format(file_name: str) -> Optional[str]:
+    extension = os.path.splitext(file_name or "")[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return None
+
+# --- Pipeline ---
+async def run_import(bot: Bot, chat_id: int, status_message_id: int, path: str, file_format: str, sent_by: int) -> None:
+    """Validates the rows of an import file and publishes them with a bounded worker pool."""
+    progress = ImportProgress()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=IMPORT_CONCURRENCY * 2)
+    last_render = ""
+    last_edit = 0.0
+
+    async def report(force: bool = False) -> None:
+        nonlocal last_render, last_edit
+        text = progress.render()
+        if text == last_render or (not force and time.monotonic() - last_edit < PROGRESS_INTERVAL):
+            return
+        last_render, last_edit = text, time.monotonic()
+        try:
+            await bot.edit_message_text(chat_id=chat_id, message_id=status_message_id, text=text)
+        except Exception as e:
+            logger.warning(f"Could not update import progress: {e}")
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            post_type, text = item
+            try:
+                text = await caption_templates.render(post_type, CAPTION, {'text': text, 'post_type': post_type}, DEFAULT_POST_CAPTION)
+                results = await deliver_post(bot, post_type, text, await get_banner_path(post_type), sent_by)
+                ok = bool(results) and all(results.values())
+            except Exception as e:
+                logger.error(f"Error publishing imported post: {e}")
+                ok = False
+            if ok:
+                progress.sent += 1
+            else:
+                progress.failed += 1
+            await report()
+
+    try:
+        # Rows are checked against the in-memory post type registry
+        known_types: Set[str] = set(await post_type_registry.names())
+        workers = [asyncio.create_task(worker()) for _ in range(IMPORT_CONCURRENCY)]
+        try:
+            for count, (line_no, post_type, text) in enumerate(iter_import_rows(path, file_format), start=1):
+                if count % 100 == 0:
+                    # Long runs of invalid rows never await; give other updates a turn
+                    await asyncio.sleep(0)
+                if post_type is None:
+                    progress.add_error(line_no, "فرمت نامعتبر یا نوع پست خالی")
+                elif post_type not in known_types:
+                    progress.add_error(line_no, f"نوع پست '{post_type}' وجود ندارد")
+                elif not text or not str(text).strip():
+                    progress.add_error(line_no, "متن خالی")
+                else:
+                    # Blocks while the workers are busy, so the file is never read ahead
+                    await queue.put((post_type, str(text)))
+                    continue
+                await report()
+        except (UnicodeDecodeError, csv.Error) as e:
+            progress.add_error(0, f"خطا در خواندن فایل: {e}")
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+    finally:
+        os.remove(path)
+
+    progress.done = True
+    await report(force=True)
+    logger.info(f"Admin {sent_by} imported posts: {progress.sent} sent, {progress.failed} failed, {progress.invalid} invalid.")
+
+# --- Handler Functions ---
+@admin_only
+async def start_import(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Asks for the file to import."""
+    await update.message.reply_text(
+        "📥 درون‌ریزی گروهی پست‌ها\n\n"
+        "لطفاً یک فایل CSV (با ستون‌های type و text) یا JSONL "
+        "(هر سطر یک شیء با کلیدهای type و text) ارسال کنید.\n"
+        "برای لغو، ❌ لغو را ارسال کنید."
+    )
+    return WAITING_FOR_IMPORT_FILE
+
+@admin_only
+async def import_file_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Downloads the file and starts the import pipeline in the background."""
+    document = update.message.document
+    file_format = detect_format(document.file_name)
+    if not file_format:
+        await update.message.reply_text("❌ فقط فایل‌های .csv و .jsonl پشتیبانی می‌شوند.")
+        return WAITING_FOR_IMPORT_FILE
+
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}")
+    os.close(fd)
+    file = await document.get_file()
+    await file.download_to_drive(path)
+
+    status = await update.message.reply_text("📥 در حال درون‌ریزی پست‌ها...")
+    logger.info(f"Admin {update.effective_user.id} started importing '{document.file_name}'.")
+
+    # The import can take minutes; run it outside the update so the bot stays responsive
+    context.application.create_task(
+        run_import(context.bot, update.effective_chat.id, status.message_id, path, file_format, update.effective_user.id),
+        update=update
+    )
+    return ConversationHandler.END
+
+async def cancel_import(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Cancels the import before a file was sent."""
+    await update.message.reply_text("❌ عملیات لغو شد.", reply_markup=main_menu_keyboard())
+    return ConversationHandler.END
+
+# --- Conversation Handler ---
+bulk_import_handler = ConversationHandler(
+    entry_points=[CommandHandler("import", start_import)],
+    states={
+        WAITING_FOR_IMPORT_FILE: [
+            MessageHandler(filters.Document.ALL, import_file_received)
+        ]
+    },
+    fallbacks=[
+        MessageHandler(filters.Regex('^❌ لغو$'), cancel_import)
+    ],
+    allow_reentry=True,
+    per_message=False,
+    name="bulk_import",
+    persistent=True
+)
@@ -1,6 +1,9 @@
 import logging
 import re
-from telegram import Update
+import time
+from typing import List, Tuple
+
+from telegram import Bot, Update
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -9,20 +12,55 @@ from telegram.ext import (
     filters,
 )
 from src.utils.validators import admin_only
-from src.utils.keyboards import confirm_keyboard, main_menu_keyboard
+from src.utils.keyboards import batch_collect_keyboard, confirm_keyboard, main_menu_keyboard
+from src.utils.post_builder import deliver_movie, format_delivery_report
+from src.utils.caption_templates import CAPTION, DEFAULT_FILE_CAPTION, DEFAULT_MOVIE_CAPTION, FILE_CAPTION, caption_templates
+from src.utils.send_queue import BULK
+from src.text_normalize import PERSIAN_DIGITS
+from src.config import MOVIE_POST_TYPE
 
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 # --- Conversation States ---
 WAITING_FOR_MOVIE_POST, WAITING_FOR_CONFIRM_FIRST, WAITING_FOR_FILE, WAITING_FOR_FINAL_CONFIRM = range(4)
+WAITING_FOR_BATCH_ITEMS, WAITING_FOR_BATCH_CONFIRM = range(4, 6)
+
+# حداقل فاصله (ثانیه) بین دو ویرایش پیام وضعیت دیزاین گروهی
+BATCH_STATUS_INTERVAL = 2.0
+# حداکثر طول یک پیام تلگرام
+MAX_MESSAGE_LENGTH = 4096
+
+# --- Caption Parser ---
+# خط یک فیلد تا انتهای خط؛ '.' از \n عبور نمی‌کند، پس .+ همان .+? قبلی را می‌گیرد
+_LINE = r'\s*(?P<{}>.+)(?:\n|$)'
+
+# All fields in one pattern, scanned once over the caption. Every alternative
+# consumes only the first character of its marker and checks the rest with a
+# lookahead, so no position is skipped and fields may overlap exactly like the
+# separate searches did. The leading character set lets the regex engine jump
+# straight to positions where some field can start.
+MOVIE_CAPTION_PATTERN = re.compile(
+    r'[🎥📽📄📃⭐️🎁⏳⌛🎬📹/Q0-9BbWwHhخ]'
+    r'(?:'
+    r'(?<=🎥)(?=فیلم' + _LINE.format('name') + r')'
+    r'|(?<=📽)(?=ژانر:' + _LINE.format('genre') + r')'
+    r'|(?<=[📄📃])(?=زبان:' + _LINE.format('language') + r')'
+    r'|(?<=[⭐️])(?=امتیاز\s*(?P<score>[۰-۹0-9\.]+)\s*از\s*(?P<total>[۰-۹0-9]+))'
+    r'|(?<=🎁)(?=جوایز:' + _LINE.format('awards') + r')'
+    r'|(?<=/)(?=(?P<actor>[A-Za-z_]+))'
+    r'|(?<=[⏳⌛️])(?=مدت زمان:' + _LINE.format('duration') + r')'
+    r'|(?<=[🎬📹🎥])(?=کیفیت:' + _LINE.format('quality_label') + r')'
+    r'|(?<=Q)(?=uality:' + _LINE.format('quality_en') + r')'
+    r'|(?<!\w.)(?<=[0-9])(?=(?P<resolution>(?i:(?<=4)K|(?<=2)160p|(?<=1)080p|(?<=7)20p|(?<=4)80p|(?<=3)60p))\b)'
+    r'|(?<!\w.)(?<=[BbWwHh])(?=(?P<source>(?i:(?<=B)luRay|(?<=B)RRip|(?<=W)EB-DL|(?<=W)EBRip|(?<=H)DRip))\b)'
+    r'|(?<=خ)(?=لاصه داستان:\s*(?P<summary>(?s:.+))$)'
+    r')'
+)
+
+YEAR_PATTERN = re.compile(r'\((\d{4})')
 
-# --- Helper Functions ---
 def extract_movie_info(caption: str) -> dict:
-    """استخراج اطلاعات فیلم از کپشن"""
+    """استخراج اطلاعات فیلم از کپشن در یک پیمایش"""
     info = {
         'name': '',
         'genre': '',
@@ -36,125 +74,83 @@ def extract_movie_info(caption: str) -> dict:
         'country': '',
         'quality': '720p'  # مقدار پیش‌فرض
     }
-    
+
+    # اولین مورد هر فیلد (مثل re.search)؛ بازیگران همه موارد (مثل re.findall)
+    found = {}
+    actors = info['actors']
+    for match in MOVIE_CAPTION_PATTERN.finditer(caption):
+        field = match.lastgroup
+        if field == 'actor':
+            actors.append(match.group('actor'))
+        elif field == 'total':
+            found.setdefault('score', match)
+        elif field == 'resolution' or field == 'source':
+            # متن کامل کیفیت از اولین کاراکتر (که مصرف شده) شروع می‌شود
+            found.setdefault(field, caption[match.start():match.end(field)])
+        elif field not in found:
+            found[field] = match.group(field)
+
     # استخراج نام فیلم و سال
-    name_line_match = re.search(r'🎥فیلم\s*(.+?)(?:\n|$)', caption)
-    if name_line_match:
-        full_name = name_line_match.group(1).strip()
-        
+    full_name = found.get('name')
+    if full_name is not None:
+        full_name = full_name.strip()
+
         # استخراج سال (اولین عدد 4 رقمی)
-        year_match = re.search(r'\((\d{4})', full_name)
+        year_match = YEAR_PATTERN.search(full_name)
         if year_match:
             info['year'] = year_match.group(1)
-        
+
         # استخراج نام انگلیسی
         # فرمت: (April..s Daug..hter Las hij..as de Ab..ril (2017 (دختر ماه آوریل)
         name_clean = full_name.lstrip('(').strip()
-        
+
         # حذف قسمت (سال) و بعد از آن
         if year_match:
             year_pos = name_clean.find(f"({info['year']}")
             if year_pos > 0:
                 name_clean = name_clean[:year_pos].strip()
-        
+
         # حذف نقطه‌های اضافی
-        name_clean = re.sub(r'\.\.', '', name_clean)
-        info['name'] = name_clean.strip()
-    
-    # استخراج ژانر
-    genre_match = re.search(r'📽ژانر:\s*(.+?)(?:\n|$)', caption)
-    if genre_match:
-        info['genre'] = genre_match.group(1).strip()
-    
-    # استخراج زبان (پشتیبانی از 📄 و 📃)
-    lang_match = re.search(r'[📄📃]زبان:\s*(.+?)(?:\n|$)', caption)
-    if lang_match:
-        info['language'] = lang_match.group(1).strip()
-    
-    # استخراج امتیاز (با پشتیبانی از اعداد فارسی و ایموجی‌های مختلف)
-    score_match = re.search(r'[⭐️⭐]امتیاز\s*([۰-۹0-9\.]+)\s*از\s*([۰-۹0-9]+)', caption)
+        info['name'] = name_clean.replace('..', '').strip()
+
+    for field in ('genre', 'language', 'awards'):
+        if field in found:
+            info[field] = found[field].strip()
+
+    score_match = found.get('score')
     if score_match:
-        score = score_match.group(1).strip()
-        total = score_match.group(2).strip()
-        logger.info(f"Score extracted: {score} از {total}")
-        # تبدیل اعداد فارسی به انگلیسی
-        persian_to_english = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
-        score = score.translate(persian_to_english)
-        total = total.translate(persian_to_english)
+        score = score_match.group('score').strip().translate(PERSIAN_DIGITS)
+        total = score_match.group('total').strip().translate(PERSIAN_DIGITS)
         info['score'] = f"{score}/{total}"
-        logger.info(f"Score converted: {info['score']}")
     else:
-        logger.warning("Score not found in caption")
-    
-    # استخراج جوایز
-    awards_match = re.search(r'🎁جوایز:\s*(.+?)(?:\n|$)', caption)
-    if awards_match:
-        info['awards'] = awards_match.group(1).strip()
-    
-    # استخراج بازیگران
-    actors = re.findall(r'/([A-Za-z_]+)', caption)
-    info['actors'] = actors
-    
-    # استخراج مدت زمان (با پشتیبانی از اعداد فارسی و ایموجی ⌛️)
-    duration_match = re.search(r'[⏳⌛️]مدت زمان:\s*(.+?)(?:\n|$)', caption)
-    if duration_match:
-        duration = duration_match.group(1).strip()
-        # تبدیل اعداد فارسی به انگلیسی
-        persian_to_english = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
-        info['duration'] = duration.translate(persian_to_english)
-    
-    # استخراج کیفیت (Quality)
-    quality_match = re.search(r'[🎬📹🎥]کیفیت:\s*(.+?)(?:\n|$)', caption)
-    if not quality_match:
-        quality_match = re.search(r'Quality:\s*(.+?)(?:\n|$)', caption)
-    if not quality_match:
-        # جستجو برای الگوهای رایج کیفیت
-        quality_patterns = [
-            r'\b(4K|2160p|1080p|720p|480p|360p)\b',
-            r'\b(BluRay|BRRip|WEB-DL|WEBRip|HDRip)\b'
-        ]
-        for pattern in quality_patterns:
-            quality_match = re.search(pattern, caption, re.IGNORECASE)
-            if quality_match:
-                info['quality'] = quality_match.group(1)
-                break
-    else:
-        info['quality'] = quality_match.group(1).strip()
-    
-    # استخراج خلاصه داستان
-    summary_match = re.search(r'خلاصه داستان:\s*(.+?)$', caption, re.DOTALL)
-    if summary_match:
-        info['summary'] = summary_match.group(1).strip()
-    
-    return info
+        logger.debug("Score not found in caption")
 
-def create_formatted_caption(info: dict) -> str:
-    """ساخت کپشن فرمت شده بر اساس قالب"""
-    caption = f"""Download 🔞#Film_Nights🔞
+    if 'duration' in found:
+        info['duration'] = found['duration'].strip().translate(PERSIAN_DIGITS)
 
-⬛️ Name: {info['name']}
-🟨 Data Release: {info['year']}
-🟥 Score IMDB: 《{info['score']}》
-🟩 Country: {info['country'] if info['country'] else '🇺🇸 USA'}
-🟪 Time: {info['duration']}
-🟫 Genre: 《{info['genre']}》
+    # کیفیت: برچسب فارسی، سپس Quality:، سپس رزولوشن و در آخر منبع
+    if 'quality_label' in found:
+        info['quality'] = found['quality_label'].strip()
+    elif 'quality_en' in found:
+        info['quality'] = found['quality_en'].strip()
+    elif 'resolution' in found:
+        info['quality'] = found['resolution']
+    elif 'source' in found:
+        info['quality'] = found['source']
 
-{info['summary']}
+    if 'summary' in found:
+        info['summary'] = found['summary'].strip()
 
-🔗 https://t.me/Film_Maamnooe"""
-    
-    return caption
+    return info
 
-def create_file_caption(info: dict) -> str:
-    """ساخت کپشن برای فایل"""
-    quality = info.get('quality', '720p')
-    caption = f"""🟧 {info['name']}
-🟥 Quality: {quality}
-🟦 Language: 《زیرنویس چسبیده》
+# --- Helper Functions ---
+async def create_formatted_caption(info: dict) -> str:
+    """ساخت کپشن فرمت شده بر اساس قالب نوع پست فیلم"""
+    return await caption_templates.render(MOVIE_POST_TYPE, CAPTION, info, DEFAULT_MOVIE_CAPTION)
 
-🔗 https://t.me/Film_Maamnooe"""
-    
-    return caption
+async def create_file_caption(info: dict) -> str:
+    """ساخت کپشن برای فایل بر اساس قالب نوع پست فیلم"""
+    return await caption_templates.render(MOVIE_POST_TYPE, FILE_CAPTION, info, DEFAULT_FILE_CAPTION)
 
 # --- Handler Functions ---
 
@@ -199,7 +195,7 @@ async def receive_movie_post(update: Update, context: ContextTypes.DEFAULT_TYPE)
     context.user_data['movie_info'] = movie_info
     
     # ساخت کپشن فرمت شده
-    formatted_caption = create_formatted_caption(movie_info)
+    formatted_caption = await create_formatted_caption(movie_info)
     context.user_data['formatted_caption'] = formatted_caption
     
     # نمایش پیش‌نمایش
@@ -232,7 +228,7 @@ async def handle_first_confirm(update: Update, context: ContextTypes.DEFAULT_TYP
     await query.edit_message_reply_markup(reply_markup=None)
     
     movie_info = context.user_data.get('movie_info', {})
-    file_caption = create_file_caption(movie_info)
+    file_caption = await create_file_caption(movie_info)
     context.user_data['file_caption'] = file_caption
     
     await context.bot.send_message(
@@ -287,7 +283,7 @@ async def receive_movie_file(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text(
             f"📋 پیش‌نمایش پست دوم:\n\n{file_caption}\n\n"
             "✅ فایل دریافت شد.\n"
-            "آیا می‌خواهید هر دو پست را دریافت کنید؟",
+            "آیا می‌خواهید هر دو پست در کانال‌ها منتشر شوند؟",
             reply_markup=confirm_keyboard()
         )
     
@@ -296,7 +292,7 @@ async def receive_movie_file(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 @admin_only
 async def handle_final_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """مدیریت تأیید نهایی و ارسال به ادمین"""
+    """مدیریت تأیید نهایی و انتشار در کانال‌ها"""
     query = update.callback_query
     await query.answer()
     
@@ -310,56 +306,44 @@ async def handle_final_confirm(update: Update, context: ContextTypes.DEFAULT_TYP
         context.user_data.clear()
         return ConversationHandler.END
     
-    # ارسال به ادمین
+    # انتشار مستقیم در کانال‌ها
     await query.edit_message_reply_markup(reply_markup=None)
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
-        text="⏳ در حال آماده‌سازی پست‌ها..."
+        text="⏳ در حال انتشار در کانال‌ها..."
     )
     
     try:
-        # ارسال پست اول (تصویر)
-        photo_id = context.user_data.get('movie_photo')
-        formatted_caption = context.user_data.get('formatted_caption')
-        
-        await context.bot.send_photo(
-            chat_id=update.effective_chat.id,
-            photo=photo_id,
-            caption=formatted_caption
+        delivery_id, results = await deliver_movie(
+            context.bot,
+            context.user_data.get('movie_info', {}),
+            context.user_data.get('movie_photo'),
+            context.user_data.get('formatted_caption'),
+            context.user_data.get('movie_file'),
+            context.user_data.get('file_type'),
+            context.user_data.get('file_caption'),
+            update.effective_user.id
         )
         
-        # ارسال پست دوم (فایل)
-        file_id = context.user_data.get('movie_file')
-        file_type = context.user_data.get('file_type')
-        file_caption = context.user_data.get('file_caption')
-        
-        if file_type == 'document':
-            await context.bot.send_document(
-                chat_id=update.effective_chat.id,
-                document=file_id,
-                caption=file_caption
-            )
+        if results and all(results.values()):
+            text = "✅ هر دو پست در کانال‌ها منتشر شدند!"
+        elif any(results.values()):
+            text = "⚠️ پست‌ها فقط در بخشی از کانال‌ها منتشر شدند."
         else:
-            await context.bot.send_video(
-                chat_id=update.effective_chat.id,
-                video=file_id,
-                caption=file_caption
-            )
-        
+            text = "❌ انتشار پست‌ها ناموفق بود."
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
-            text="✅ هر دو پست آماده شدند!\n\n"
-                 "می‌توانید آنها را به کانال خود فوروارد کنید.",
+            text=f"{text}\n\n{format_delivery_report(results)}",
             reply_markup=main_menu_keyboard()
         )
         
-        logger.info(f"Admin {update.effective_user.id} successfully created movie posts.")
+        logger.info(f"Admin {update.effective_user.id} published movie posts (delivery {delivery_id}): {results}")
         
     except Exception as e:
-        logger.error(f"Error creating movie posts: {e}")
+        logger.error(f"Error publishing movie posts: {e}")
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
-            text=f"❌ خطا در آماده‌سازی پست‌ها:\n{str(e)}",
+            text=f"❌ خطا در انتشار پست‌ها:\n{str(e)}",
             reply_markup=main_menu_keyboard()
         )
     
@@ -384,6 +368,230 @@ async def cancel_movie_design(update: Update, context: ContextTypes.DEFAULT_TYPE
     logger.info(f"User {update.effective_user.id} canceled movie design.")
     return ConversationHandler.END
 
+# --- Batch Design ---
+# کلمات نام فایل که جزو نام فیلم نیستند (کیفیت، منبع، کدک و ...)
+_FILE_NAME_NOISE = re.compile(
+    r'\b(?:(?:19|20)\d{2}|\d{3,4}p|4k|bluray|brrip|web|dl|webrip|hdrip|x26[45]|hevc|'
+    r'10bit|aac|dubbed|softsub|hardsub|farsi|mkv|mp4|avi)\b'
+)
+_NON_WORD = re.compile(r'[\W_]+')
+
+def _name_key(text: str) -> str:
+    """کلید مقایسه نام: حروف کوچک، بدون علائم و بدون سال/کیفیت"""
+    words = _NON_WORD.sub(' ', (text or '').lower())
+    return ' '.join(_FILE_NAME_NOISE.sub(' ', words).split())
+
+def pair_batch_items(posters: List[dict], files: List[dict]) -> Tuple[List[Tuple[dict, dict]], List[dict], List[dict]]:
+    """
+    جفت کردن پوسترها با فایل‌ها؛ ابتدا بر اساس نام فیلم و نام فایل،
+    سپس باقی‌مانده‌ها به ترتیب ارسال. خروجی: (جفت‌ها، پوسترهای بی‌فایل، فایل‌های بی‌پوستر)
+    """
+    posters = sorted(posters, key=lambda item: item['message_id'])
+    files = sorted(files, key=lambda item: item['message_id'])
+    matched = {}
+    used = set()
+
+    # مرحله اول: نام فیلم داخل نام فایل؛ همه جفت‌های ممکن امتیاز می‌گیرند (اول تطابق کامل،
+    # سپس نام طولانی‌تر) تا مثلاً «Up» فایل «Up in the Air» را نگیرد
+    file_keys = [_name_key(file['file_name']) for file in files]
+    candidates = []
+    for index, poster in enumerate(posters):
+        key = _name_key(poster['info']['name'])
+        if not key:
+            continue
+        for file_index, file_key in enumerate(file_keys):
+            if f" {key} " in f" {file_key} ":
+                candidates.append((key == file_key, len(key), index, file_index))
+    # در امتیاز برابر، ترتیب ارسال تعیین می‌کند
+    candidates.sort(key=lambda candidate: (not candidate[0], -candidate[1], candidate[2], candidate[3]))
+    for _, _, index, file_index in candidates:
+        if index not in matched and file_index not in used:
+            matched[index] = file_index
+            used.add(file_index)
+
+    # مرحله دوم: ترتیب ارسال
+    remaining = iter([i for i in range(len(files)) if i not in used])
+    pairs, lonely_posters = [], []
+    for index, poster in enumerate(posters):
+        file_index = matched.get(index)
+        if file_index is None:
+            file_index = next(remaining, None)
+        if file_index is None:
+            lonely_posters.append(poster)
+        else:
+            used.add(file_index)
+            pairs.append((poster, files[file_index]))
+    lonely_files = [file for i, file in enumerate(files) if i not in used]
+    return pairs, lonely_posters, lonely_files
+
+def render_batch_preview(pairs: List[Tuple[dict, dict]], lonely_posters: List[dict], lonely_files: List[dict], skipped_photos: int = 0) -> List[str]:
+    """پیش‌نمایش ترکیبی همه جفت‌ها؛ در صورت طولانی بودن به چند پیام تقسیم می‌شود"""
+    lines = [f"📋 پیش‌نمایش دیزاین گروهی ({len(pairs)} فیلم):", ""]
+    for number, (poster, file) in enumerate(pairs, start=1):
+        info = poster['info']
+        name = info['name'] or '❓ بدون نام'
+        year = f" ({info['year']})" if info['year'] else ''
+        lines.append(f"{number}. {name}{year} | {info['quality']} | 📁 {file['file_name']}")
+    if lonely_posters:
+        lines += ["", f"⚠️ پوستر بدون فایل ({len(lonely_posters)}) ارسال نمی‌شود:"]
+        lines += [f"• {poster['info']['name'] or '❓ بدون نام'}" for poster in lonely_posters]
+    if lonely_files:
+        lines += ["", f"⚠️ فایل بدون پوستر ({len(lonely_files)}) ارسال نمی‌شود:"]
+        lines += [f"• {file['file_name']}" for file in lonely_files]
+    if skipped_photos:
+        lines += ["", f"⚠️ {skipped_photos} تصویر بدون کپشن نادیده گرفته شد."]
+
+    messages, current = [], ''
+    for line in lines:
+        if current and len(current) + len(line) + 1 > MAX_MESSAGE_LENGTH:
+            messages.append(current)
+            current = ''
+        current = f"{current}\n{line}" if current else line
+    messages.append(current)
+    return messages
+
+async def publish_batch(bot: Bot, chat_id: int, pairs: List[Tuple[dict, dict]], user_id: int) -> None:
+    """انتشار همه جفت‌ها به ترتیب در کانال‌ها؛ در پس‌زمینه اجرا می‌شود تا ربات پاسخگو بماند"""
+    sent, failed = 0, []
+    for poster, file in pairs:
+        info = poster['info']
+        try:
+            # صف ارسال: این پیام‌ها پشت پاسخ‌های تعاملی قرار می‌گیرند
+            _, results = await deliver_movie(
+                bot, info,
+                poster['photo'], await create_formatted_caption(info),
+                file['file_id'], file['file_type'], await create_file_caption(info),
+                user_id,
+                rate_limit_args=BULK
+            )
+            if results and all(results.values()):
+                sent += 1
+            else:
+                failed.append(info['name'] or file['file_name'])
+        except Exception as e:
+            logger.error(f"Error publishing batch movie post '{info['name']}': {e}")
+            failed.append(info['name'] or file['file_name'])
+
+    text = f"✅ {sent} فیلم از {len(pairs)} در کانال‌ها منتشر شد."
+    if failed:
+        text += "\n\n❌ ناموفق (در همه کانال‌ها منتشر نشد):\n" + "\n".join(f"• {name}" for name in failed)
+    await bot.send_message(chat_id=chat_id, text=text, reply_markup=main_menu_keyboard())
+    logger.info(f"Admin {user_id} published {sent} batch movie posts ({len(failed)} failed).")
+
+@admin_only
+async def start_batch_design(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """شروع دیزاین گروهی: دریافت چند پست فیلم و فایل‌ها"""
+    logger.info(f"Admin {update.effective_user.id} started batch movie design.")
+    context.user_data.clear()
+    context.user_data['batch_posters'] = []
+    context.user_data['batch_files'] = []
+
+    await update.message.reply_text(
+        "📦 دیزاین گروهی فیلم\n\n"
+        "پست‌های فیلم (تصویر + کپشن) و فایل‌های آنها را ارسال یا فوروارد کنید؛ "
+        "آلبوم و فوروارد چندتایی هم پذیرفته می‌شود.\n"
+        "فایل‌ها بر اساس نام فیلم و در غیر این صورت به ترتیب ارسال با پوسترها جفت می‌شوند.\n\n"
+        "در پایان دکمه ✅ پایان ارسال را بزنید.",
+        reply_markup=batch_collect_keyboard()
+    )
+    return WAITING_FOR_BATCH_ITEMS
+
+@admin_only
+async def receive_batch_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """ذخیره یک پوستر یا فایل؛ کپشن‌ها در پایان یکجا پردازش می‌شوند"""
+    message = update.message
+    if message.photo and not message.caption:
+        # یک هشدار برای همه در پیش‌نمایش، نه یک پیام برای هر تصویر
+        context.user_data['batch_skipped_photos'] = context.user_data.get('batch_skipped_photos', 0) + 1
+    elif message.photo:
+        context.user_data.setdefault('batch_posters', []).append({
+            'message_id': message.message_id,
+            'photo': message.photo[-1].file_id,
+            'caption': message.caption,
+        })
+    else:
+        file_obj = message.document or message.video
+        context.user_data.setdefault('batch_files', []).append({
+            'message_id': message.message_id,
+            'file_id': file_obj.file_id,
+            'file_type': 'document' if message.document else 'video',
+            'file_name': file_obj.file_name or 'video.mp4',
+        })
+
+    # یک پیام وضعیت که حداکثر هر چند ثانیه یک بار ویرایش می‌شود (آلبوم‌ها چندین پیام هم‌زمان‌اند)
+    text = (
+        f"📥 دریافت شد: {len(context.user_data.get('batch_posters', []))} پوستر، "
+        f"{len(context.user_data.get('batch_files', []))} فایل"
+    )
+    if context.user_data.get('batch_skipped_photos'):
+        text += f"\n⚠️ {context.user_data['batch_skipped_photos']} تصویر بدون کپشن نادیده گرفته شد"
+    status_id = context.user_data.get('batch_status_id')
+    if status_id is None:
+        status = await message.reply_text(text)
+        context.user_data['batch_status_id'] = status.message_id
+        context.user_data['batch_status_at'] = time.time()
+    elif time.time() - context.user_data.get('batch_status_at', 0) >= BATCH_STATUS_INTERVAL:
+        context.user_data['batch_status_at'] = time.time()
+        try:
+            await context.bot.edit_message_text(chat_id=update.effective_chat.id, message_id=status_id, text=text)
+        except Exception as e:
+            logger.debug(f"Could not update batch status: {e}")
+    return WAITING_FOR_BATCH_ITEMS
+
+@admin_only
+async def finish_batch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """پردازش همه کپشن‌ها، جفت کردن و نمایش پیش‌نمایش ترکیبی"""
+    posters = context.user_data.get('batch_posters', [])
+    files = context.user_data.get('batch_files', [])
+    for poster in posters:
+        poster['info'] = extract_movie_info(poster['caption'])
+
+    pairs, lonely_posters, lonely_files = pair_batch_items(posters, files)
+    if not pairs:
+        await update.message.reply_text(
+            "❌ هیچ پوستر و فایلی برای جفت شدن پیدا نشد.\n"
+            "لطفاً پست‌ها و فایل‌ها را ارسال کنید یا ❌ لغو را بزنید."
+        )
+        return WAITING_FOR_BATCH_ITEMS
+
+    context.user_data['batch_pairs'] = pairs
+    messages = render_batch_preview(pairs, lonely_posters, lonely_files, context.user_data.get('batch_skipped_photos', 0))
+    for text in messages[:-1]:
+        await update.message.reply_text(text)
+    await update.message.reply_text(messages[-1], reply_markup=confirm_keyboard())
+
+    logger.info(f"Admin {update.effective_user.id} prepared {len(pairs)} batch movie posts.")
+    return WAITING_FOR_BATCH_CONFIRM
+
+@admin_only
+async def handle_batch_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """تأیید یکجا و انتشار همه جفت‌ها"""
+    query = update.callback_query
+    await query.answer()
+
+    if query.data == 'cancel_action':
+        await query.edit_message_text("❌ عملیات لغو شد.")
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="به منوی اصلی بازگشتید:",
+            reply_markup=main_menu_keyboard()
+        )
+        context.user_data.clear()
+        return ConversationHandler.END
+
+    await query.edit_message_reply_markup(reply_markup=None)
+    pairs = context.user_data.get('batch_pairs', [])
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text=f"⏳ در حال انتشار {len(pairs)} فیلم در کانال‌ها..."
+    )
+    context.application.create_task(
+        publish_batch(context.bot, update.effective_chat.id, pairs, update.effective_user.id),
+        update=update
+    )
+    context.user_data.clear()
+    return ConversationHandler.END
+
 # --- Conversation Handler ---
 movie_design_handler = ConversationHandler(
     entry_points=[MessageHandler(filters.Regex('^🎬 دیزاین پست فیلم$'), start_movie_design)],
@@ -406,5 +614,28 @@ movie_design_handler = ConversationHandler(
         MessageHandler(filters.Regex('^❌ لغو$'), cancel_movie_design)
     ],
     allow_reentry=True,
-    per_message=False
+    per_message=False,
+    name="movie_design",
+    persistent=True
+)
+
+batch_movie_design_handler = ConversationHandler(
+    entry_points=[MessageHandler(filters.Regex('^📦 دیزاین گروهی فیلم$'), start_batch_design)],
+    states={
+        WAITING_FOR_BATCH_ITEMS: [
+            MessageHandler(filters.Regex('^✅ پایان ارسال$'), finish_batch),
+            MessageHandler(filters.PHOTO | filters.Document.ALL | filters.VIDEO, receive_batch_item)
+        ],
+        WAITING_FOR_BATCH_CONFIRM: [
+            CallbackQueryHandler(handle_batch_confirm, pattern='^(confirm_send|cancel_action)$')
+        ]
+    },
+    fallbacks=[
+        CallbackQueryHandler(cancel_movie_design, pattern='^cancel_action$'),
+        MessageHandler(filters.Regex('^❌ لغو$'), cancel_movie_design)
+    ],
+    allow_reentry=True,
+    per_message=False,
+    name="batch_movie_design",
+    persistent=True
 )
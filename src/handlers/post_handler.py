@@ -1,5 +1,6 @@
 import logging
-import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
 from telegram import Update
 from telegram.ext import (
     ContextTypes,
@@ -8,45 +9,48 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-from src.config import CHANNEL_ID
-from src.utils.validators import admin_only
-from src.utils.keyboards import post_types_keyboard, confirm_keyboard, main_menu_keyboard
-from src.utils.post_builder import send_post_to_channel
-from src.database.database import DBManager
-
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
+from src.config import SCHEDULE_TIMEZONE
+from src.database.database import STATS_ZONE
+from src.utils.validators import admin_only, parse_schedule_time
+from src.utils.keyboards import post_confirm_keyboard, main_menu_keyboard
+from src.utils.post_type_registry import post_type_registry
+from src.utils.post_builder import send_banner_photo, deliver_post, format_delivery_report, get_banner_path
+from src.utils.scheduler import post_scheduler
+from src.utils.caption_templates import CAPTION, DEFAULT_POST_CAPTION, caption_templates
+from src.utils.near_duplicates import DuplicateMatch, near_duplicates
+
 logger = logging.getLogger(__name__)
 
 # --- Conversation States ---
-SELECTING_POST_TYPE, WAITING_FOR_TEXT, WAITING_FOR_CONFIRM = range(3)
+SELECTING_POST_TYPE, WAITING_FOR_TEXT, WAITING_FOR_CONFIRM, WAITING_FOR_SCHEDULE_TIME = range(4)
 
 # --- Helper Functions ---
-def create_preview(post_type: str, text: str, context: ContextTypes.DEFAULT_TYPE) -> tuple:
+async def create_preview(post_type: str, text: str, context: ContextTypes.DEFAULT_TYPE) -> tuple:
     """
-    Finds the banner for the post type and creates the preview text.
+    Finds the banner for the post type and renders the text through the post
+    type's caption template; the rendered text is what gets published.
     Returns a tuple of (banner_path, preview_text).
     """
-    banner_path = f"data/banners/{post_type}.jpg"
-    if not os.path.exists(banner_path):
-        banner_path = None
+    banner_path = await get_banner_path(post_type)
     context.user_data['banner_path'] = banner_path
-    return banner_path, text
+    preview_text = await caption_templates.render(post_type, CAPTION, {'text': text, 'post_type': post_type}, DEFAULT_POST_CAPTION)
+    context.user_data['text'] = preview_text
+    return banner_path, preview_text
+
+def duplicate_warning(match: DuplicateMatch) -> str:
+    sent_at = datetime.fromtimestamp(match.sent_at, STATS_ZONE).strftime("%Y-%m-%d %H:%M")
+    return (
+        f"⚠️ این پست با پستی که در {sent_at} منتشر شده حدود {match.similarity:.0%} شباهت دارد "
+        f"(شناسه گزارش {match.log_id}).\n"
+        "در صورت اطمینان می‌توانید آن را ارسال کنید."
+    )
 
 # --- Handler Functions ---
 
 @admin_only
 async def new_post(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Starts the post creation process by showing post type options."""
-    db = DBManager()
-    try:
-        post_types = [pt.name for pt in db.get_post_types()]
-    finally:
-        db.close()
-    
-    if not post_types:
+    if not await post_type_registry.post_names():
         await update.message.reply_text(
             "هیچ نوع پستی تعریف نشده است. لطفاً ابتدا از پنل مدیریت نوع پست اضافه کنید.",
             reply_markup=main_menu_keyboard()
@@ -57,7 +61,7 @@ async def new_post(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     await update.message.reply_text(
         text="لطفاً نوع پست خود را انتخاب کنید:",
-        reply_markup=post_types_keyboard(post_types)
+        reply_markup=await post_type_registry.keyboard()
     )
     return SELECTING_POST_TYPE
 
@@ -83,33 +87,39 @@ async def text_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     Receives the post text, shows a preview with a banner, and asks for confirmation.
     """
     user_text = update.message.text
-    context.user_data['text'] = user_text
     post_type = context.user_data.get('post_type')
 
     logger.info(f"Admin {update.effective_user.id} submitted text for '{post_type}' post.")
 
-    banner_path, preview_text = create_preview(post_type, user_text, context)
+    banner_path, preview_text = await create_preview(post_type, user_text, context)
 
     if banner_path:
         try:
-            with open(banner_path, 'rb') as banner_file:
-                await update.message.reply_photo(
-                    photo=banner_file,
-                    caption=f"پیش‌نمایش پست:\n\n{preview_text}",
-                    reply_markup=confirm_keyboard()
-                )
+            await send_banner_photo(
+                context.bot,
+                update.effective_chat.id,
+                banner_path,
+                post_type,
+                caption=f"پیش‌نمایش پست:\n\n{preview_text}",
+                reply_markup=post_confirm_keyboard()
+            )
         except Exception as e:
             logger.error(f"Error sending photo banner: {e}")
             await update.message.reply_text(
                 text=f"خطا در بارگذاری بنر. پیش‌نمایش بدون بنر:\n\n{preview_text}",
-                reply_markup=confirm_keyboard()
+                reply_markup=post_confirm_keyboard()
             )
     else:
         await update.message.reply_text(
             text=f"بنری برای این نوع پست یافت نشد. پیش‌نمایش:\n\n{preview_text}",
-            reply_markup=confirm_keyboard()
+            reply_markup=post_confirm_keyboard()
         )
 
+    match = near_duplicates.check(preview_text)
+    if match:
+        logger.info(f"Admin {update.effective_user.id}'s '{post_type}' post is {match.distance} bits from post log {match.log_id}.")
+        await update.message.reply_text(duplicate_warning(match))
+
     return WAITING_FOR_CONFIRM
 
 @admin_only
@@ -122,35 +132,30 @@ async def confirmation_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
     if user_choice == 'confirm_send':
         await query.edit_message_reply_markup(reply_markup=None)
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="در حال ارسال پست به کانال...")
+        await context.bot.send_message(chat_id=update.effective_chat.id, text="در حال ارسال پست به کانال‌ها...")
 
         post_type = context.user_data.get('post_type')
         text = context.user_data.get('text')
         banner_path = context.user_data.get('banner_path')
         user_id = query.from_user.id
 
-        success = await send_post_to_channel(context.bot, CHANNEL_ID, banner_path, text)
+        results = await deliver_post(context.bot, post_type, text, banner_path, user_id)
+        delivered = [channel_id for channel_id, ok in results.items() if ok]
 
-        if success:
-            db = DBManager()
-            try:
-                db.add_post_log(post_type, text, user_id, banner_path)
-            finally:
-                db.close()
-            
+        if results and len(delivered) == len(results):
             await context.bot.send_message(
-                chat_id=update.effective_chat.id, 
-                text="✅ پست با موفقیت به کانال ارسال شد.",
+                chat_id=update.effective_chat.id,
+                text=f"✅ پست با موفقیت به کانال‌ها ارسال شد.\n\n{format_delivery_report(results)}",
                 reply_markup=main_menu_keyboard()
             )
-            logger.info(f"Admin {user_id} successfully sent a '{post_type}' post to channel {CHANNEL_ID}.")
+            logger.info(f"Admin {user_id} successfully sent a '{post_type}' post to channels {delivered}.")
         else:
             await context.bot.send_message(
-                chat_id=update.effective_chat.id, 
-                text="❌ خطایی در ارسال پست به کانال رخ داد. لطفاً دوباره تلاش کنید.",
+                chat_id=update.effective_chat.id,
+                text=f"❌ ارسال پست به برخی کانال‌ها ناموفق بود. لطفاً دوباره تلاش کنید.\n\n{format_delivery_report(results)}",
                 reply_markup=main_menu_keyboard()
             )
-            logger.error(f"Failed to send post for admin {user_id} to channel {CHANNEL_ID}.")
+            logger.error(f"Failed to send post for admin {user_id} to some channels: {results}.")
 
         context.user_data.clear()
         return ConversationHandler.END
@@ -158,6 +163,52 @@ async def confirmation_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     elif user_choice == 'cancel_action':
         return await cancel(update, context)
 
+@admin_only
+async def schedule_post_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Asks for the time at which the confirmed post should be published."""
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_reply_markup(reply_markup=None)
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text=f"⏰ زمان ارسال را وارد کنید:\n\n"
+             f"- زمان دقیق به صورت YYYY-MM-DD HH:MM (منطقه زمانی {SCHEDULE_TIMEZONE})\n"
+             f"- یا مدت نسبی مثل +30 (دقیقه)، +2h یا +1d"
+    )
+    return WAITING_FOR_SCHEDULE_TIME
+
+@admin_only
+async def schedule_time_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Stores the post in the scheduler for the given time."""
+    run_at = parse_schedule_time(update.message.text)
+    if not run_at:
+        await update.message.reply_text("❌ زمان نامعتبر است یا گذشته است. لطفاً دوباره وارد کنید:")
+        return WAITING_FOR_SCHEDULE_TIME
+
+    post_type = context.user_data.get('post_type')
+    user_id = update.effective_user.id
+    scheduled_id = await post_scheduler.schedule(
+        post_type,
+        context.user_data.get('text'),
+        context.user_data.get('banner_path'),
+        run_at,
+        user_id,
+        update.effective_chat.id
+    )
+
+    if scheduled_id is None:
+        await update.message.reply_text("❌ خطا در ذخیره پست زمان‌بندی‌شده.", reply_markup=main_menu_keyboard())
+    else:
+        local_time = run_at.astimezone(ZoneInfo(SCHEDULE_TIMEZONE)).strftime("%Y-%m-%d %H:%M")
+        await update.message.reply_text(
+            f"✅ پست #{scheduled_id} برای {local_time} ({SCHEDULE_TIMEZONE}) زمان‌بندی شد.",
+            reply_markup=main_menu_keyboard()
+        )
+        logger.info(f"Admin {user_id} scheduled a '{post_type}' post (#{scheduled_id}) for {run_at.isoformat()}.")
+
+    context.user_data.clear()
+    return ConversationHandler.END
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancels and ends the conversation."""
     query = update.callback_query
@@ -193,7 +244,11 @@ post_creation_handler = ConversationHandler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, text_received)
         ],
         WAITING_FOR_CONFIRM: [
-            CallbackQueryHandler(confirmation_handler, pattern='^(confirm_send|cancel_action)$')
+            CallbackQueryHandler(confirmation_handler, pattern='^(confirm_send|cancel_action)$'),
+            CallbackQueryHandler(schedule_post_start, pattern='^schedule_post$')
+        ],
+        WAITING_FOR_SCHEDULE_TIME: [
+            MessageHandler(filters.TEXT & ~filters.COMMAND, schedule_time_received)
         ]
     },
     fallbacks=[
@@ -201,5 +256,7 @@ post_creation_handler = ConversationHandler(
         MessageHandler(filters.Regex('^❌ لغو$'), cancel)
     ],
     allow_reentry=True,
-    per_message=False
+    per_message=False,
+    name="post_creation",
+    persistent=True
 )
@@ -0,0 +1,67 @@
+import html
+import logging
+from datetime import timezone
+
+from telegram import Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+
+from src.database.database import STATS_ZONE
+from src.utils.validators import admin_only
+from src.utils.keyboards import search_pagination_keyboard
+from src.utils.search import PAGE_SIZE, SEARCH_WINDOW, SearchPage, post_search
+
+logger = logging.getLogger(__name__)
+
+def render_snippet(snippet: str) -> str:
+    """Escapes a search snippet for HTML and bolds the matched words."""
+    return html.escape(snippet.replace("\n", " ")).replace("\x02", "<b>").replace("\x03", "</b>")
+
+def render_search_page(result: SearchPage) -> str:
+    query = html.escape(result.query)
+    if not result.total:
+        return f"🔎 نتیجه‌ای برای «{query}» یافت نشد."
+
+    total = f"بیش از {SEARCH_WINDOW} پست (جدیدترین‌ها)" if result.capped else f"{result.total} پست"
+    lines = [f"🔎 نتایج جستجو برای «{query}»: {total} (صفحه {result.page + 1} از {result.pages})"]
+    for number, hit in enumerate(result.hits, start=result.page * PAGE_SIZE + 1):
+        sent_at = hit.sent_at.replace(tzinfo=timezone.utc).astimezone(STATS_ZONE).strftime("%Y-%m-%d %H:%M") if hit.sent_at else "-"
+        lines.append(
+            f"\n<b>{number}.</b> {html.escape(hit.post_type or '?')} · {sent_at} · {hit.sent_by}\n"
+            f"{render_snippet(hit.snippet)}"
+        )
+    return "\n".join(lines)
+
+@admin_only
+async def search_posts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/search <words>: ranked full-text search over the post history."""
+    query = " ".join(context.args or []).strip()
+    if not query:
+        await update.message.reply_text("استفاده: /search <کلمات مورد نظر>\nمثال: /search فیلم اکشن ۲۰۲۳")
+        return
+
+    result = await post_search.search(query)
+    context.user_data["search_query"] = query
+    await update.message.reply_text(
+        render_search_page(result),
+        parse_mode=ParseMode.HTML,
+        reply_markup=search_pagination_keyboard(0, result.pages) if result.pages > 1 else None,
+    )
+    logger.info(f"Admin {update.effective_user.id} searched for '{query}': {result.total} posts.")
+
+@admin_only
+async def search_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows another page of the last search."""
+    query = update.callback_query
+    await query.answer()
+    page_text = query.data.removeprefix("search_page_")
+    search_query = context.user_data.get("search_query")
+    if not page_text.isdigit() or not search_query:
+        return
+
+    result = await post_search.search(search_query, int(page_text))
+    await query.edit_message_text(
+        render_search_page(result),
+        parse_mode=ParseMode.HTML,
+        reply_markup=search_pagination_keyboard(result.page, result.pages) if result.pages > 1 else None,
+    )
@@ -3,11 +3,8 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from src.utils.validators import admin_only
 from src.utils.keyboards import main_menu_keyboard, admin_panel_keyboard
+from src.utils.stats import post_stats
 
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 WELCOME_MESSAGE = "🤖 به پنل مدیریت ربات خوش آمدید!\n\nاز طریق منوی زیر می‌توانید اقدام کنید:"
@@ -49,7 +46,8 @@ async def handle_main_menu_buttons(update: Update, context: ContextTypes.DEFAULT
             reply_markup=admin_panel_keyboard()
         )
     elif text == "📊 آمار و گزارش":
+        # Served from the rollup tables; never scans post_logs
         await update.message.reply_text(
-            text="این بخش در حال توسعه است.",
+            text=await post_stats.report(),
             reply_markup=main_menu_keyboard()
         )
@@ -0,0 +1,40 @@
+import re
+from typing import List
+
+# Persian digits to ASCII (used by the caption parser and schedule times)
+PERSIAN_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
+
+_ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+
+# Letter variants typed interchangeably on Arabic and Persian keyboards, joiners and diacritics
+_SEARCH_TABLE = {
+    **PERSIAN_DIGITS,
+    **_ARABIC_DIGITS,
+    ord('ي'): 'ی',
+    ord('ى'): 'ی',
+    ord('ئ'): 'ی',
+    ord('ك'): 'ک',
+    ord('ة'): 'ه',
+    ord('ۀ'): 'ه',
+    ord('أ'): 'ا',
+    ord('إ'): 'ا',
+    ord('آ'): 'ا',
+    ord('ؤ'): 'و',
+    ord('\u200c'): ' ',  # ZWNJ: "می‌خواهم" and "می خواهم" give the same words
+    ord('\u200d'): None,
+    ord('\u0640'): None,  # tatweel
+    **{code: None for code in range(0x064B, 0x0653)},  # harakat
+    ord('\u0670'): None,
+}
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize_persian(text: str) -> str:
+    """Folds the spellings of the same Persian text to one form, for indexing and searching."""
+    return text.translate(_SEARCH_TABLE).lower()
+
+
+def search_terms(text: str) -> List[str]:
+    """The normalized words of a search query."""
+    return _WORD.findall(normalize_persian(text))
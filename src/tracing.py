@@ -0,0 +1,281 @@
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, ApplicationHandlerStop
+
+from src.config import TRACE_FILE, TRACE_FLUSH_INTERVAL, TRACE_OTLP_ENDPOINT, TRACE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "telegram-channel-bot"
+# Finished traces kept in memory between two exports; beyond this new ones are dropped
+MAX_PENDING_SPANS = 50000
+# Seconds an export to the collector may take
+EXPORT_TIMEOUT = 10
+
+# OTLP span kinds and status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+# The span code is currently running in. Tasks and run_db's worker threads inherit it,
+# so their spans nest under the span that started them.
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """The spans of one sampled unit of work (an update, a scheduled post), exported once all of them ended."""
+
+    __slots__ = ("trace_id", "spans", "open", "tracer")
+
+    def __init__(self, tracer: "Tracer"):
+        self.trace_id = random.getrandbits(128).to_bytes(16, 'big').hex()
+        self.spans: List["Span"] = []
+        self.open = 0
+        self.tracer = tracer
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, trace: Trace, name: str, parent: Optional["Span"], kind: int, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = random.getrandbits(64).to_bytes(8, 'big').hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.trace.tracer._opened(self.trace)
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        if exc is not None and not isinstance(exc, (asyncio.CancelledError, ApplicationHandlerStop)):
+            self.error = f"{exc_type.__name__}: {exc}"
+        with contextlib.suppress(ValueError):
+            # A generator-based caller may exit in another context; the span still ends
+            _current_span.reset(self._token)
+        self.trace.tracer._closed(self)
+
+
+class _NoopSpan:
+    """Returned when nothing is being traced: entering, tagging and leaving it costs next to nothing."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes: Any):
+    """A child span of the current one; a no-op outside a sampled trace."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent, kind, attributes)
+
+
+def is_tracing() -> bool:
+    """True inside a sampled trace, to skip preparing span names and attributes otherwise."""
+    return _current_span.get() is not None
+
+
+def current_trace_id() -> Optional[str]:
+    """The id of the trace being recorded, e.g. to put it in a log line."""
+    current = _current_span.get()
+    return current.trace.trace_id if current else None
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(item: Span) -> Dict[str, Any]:
+    encoded = {
+        "traceId": item.trace.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": item.kind,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+    }
+    if item.parent_id:
+        encoded["parentSpanId"] = item.parent_id
+    if item.error:
+        encoded["status"] = {"code": STATUS_ERROR, "message": item.error}
+    return encoded
+
+
+def to_otlp_json(spans: List[Span]) -> Dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest, as sent to a collector's /v1/traces or written by its file exporter."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [_otlp_span(item) for item in spans]}],
+        }]
+    }
+
+
+def _encode(spans: List[Span]) -> str:
+    return json.dumps(to_otlp_json(spans), ensure_ascii=False, separators=(',', ':'))
+
+
+class Tracer:
+    """
+    Head-sampled tracing with OTLP/JSON export.
+
+    ``trace()`` decides once per unit of work (an update, a scheduled post)
+    whether it is recorded, with probability ``sample_rate``; the spans
+    opened below it with ``span()`` follow that decision, so an unsampled
+    update only pays for a context variable lookup per span. Finished traces
+    are exported in the background every ``flush_interval`` seconds: POSTed
+    to an OTLP/HTTP collector when ``otlp_endpoint`` is set, otherwise
+    appended to ``path`` as one JSON request per line.
+    """
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, path: str = TRACE_FILE,
+                 otlp_endpoint: Optional[str] = TRACE_OTLP_ENDPOINT, flush_interval: float = TRACE_FLUSH_INTERVAL):
+        self.sample_rate = sample_rate
+        self.path = path
+        self.otlp_endpoint = otlp_endpoint.rstrip('/') if otlp_endpoint else None
+        self.flush_interval = flush_interval
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def trace(self, name: str, kind: int = KIND_SERVER, **attributes: Any):
+        """The root span of a new trace if this unit of work is sampled, a child span if one is already running."""
+        parent = _current_span.get()
+        if parent is not None:
+            return Span(parent.trace, name, parent, kind, attributes)
+        if not self.enabled or random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(Trace(self), name, None, kind, attributes)
+
+    # --- Span bookkeeping (spans end on the event loop and in database threads) ---
+    def _opened(self, trace: Trace) -> None:
+        with self._lock:
+            trace.open += 1
+
+    def _closed(self, item: Span) -> None:
+        with self._lock:
+            trace = item.trace
+            trace.spans.append(item)
+            trace.open -= 1
+            # Spans of non-blocking handlers may end after the root; the trace is complete when none is open
+            if trace.open == 0:
+                if len(self._pending) + len(trace.spans) > MAX_PENDING_SPANS:
+                    self.dropped += 1
+                else:
+                    self._pending.extend(trace.spans)
+                trace.spans = []
+
+    # --- Export ---
+    def _take_pending(self) -> List[Span]:
+        with self._lock:
+            spans, self._pending = self._pending, []
+        return spans
+
+    def _write(self, payload: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as trace_file:
+            trace_file.write(payload + '\n')
+
+    async def flush(self) -> int:
+        """Exports every finished trace; returns the number of spans exported."""
+        spans = self._take_pending()
+        if not spans:
+            return 0
+        try:
+            # Encoding a full buffer takes a good fraction of a second; keep it off the event loop
+            payload = await asyncio.to_thread(_encode, spans)
+            if self.otlp_endpoint:
+                import httpx
+
+                async with httpx.AsyncClient(timeout=EXPORT_TIMEOUT) as client:
+                    response = await client.post(f"{self.otlp_endpoint}/v1/traces", content=payload,
+                                                 headers={"Content-Type": "application/json"})
+                    response.raise_for_status()
+            else:
+                await asyncio.to_thread(self._write, payload)
+        except Exception as e:
+            logger.error(f"Error exporting {len(spans)} spans: {e}")
+            return 0
+        self.exported += len(spans)
+        return len(spans)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            target = f"{self.otlp_endpoint}/v1/traces" if self.otlp_endpoint else self.path
+            logger.info(f"Tracing {self.sample_rate:.0%} of updates, exported to {target}.")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            await self.flush()
+
+
+tracer = Tracer()
+
+
+class TracedApplication(Application):
+    """Application that starts a trace (when sampled) for every update it processes."""
+
+    async def process_update(self, update: object) -> None:
+        if not tracer.enabled or not isinstance(update, Update):
+            return await super().process_update(update)
+        attributes = {"update.id": update.update_id}
+        if update.effective_user:
+            attributes["user.id"] = update.effective_user.id
+        with tracer.trace("update", **attributes):
+            await super().process_update(update)
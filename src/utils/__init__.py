@@ -1,21 +1,31 @@
 # Utils package initialization
 from src.utils.keyboards import (
     main_menu_keyboard,
+    batch_collect_keyboard,
     post_types_keyboard,
     confirm_keyboard,
+    post_confirm_keyboard,
     admin_panel_keyboard,
-    back_to_admin_panel_keyboard
+    back_to_admin_panel_keyboard,
+    search_pagination_keyboard
 )
-from src.utils.validators import admin_only, is_admin
-from src.utils.post_builder import send_post_to_channel
+from src.utils.validators import admin_only, owner_only, is_admin, is_owner, parse_channel_ids
+from src.utils.post_builder import send_post_to_channel, publish_post
 
 __all__ = [
     'main_menu_keyboard',
+    'batch_collect_keyboard',
     'post_types_keyboard',
     'confirm_keyboard',
+    'post_confirm_keyboard',
     'admin_panel_keyboard',
     'back_to_admin_panel_keyboard',
+    'search_pagination_keyboard',
     'admin_only',
+    'owner_only',
     'is_admin',
-    'send_post_to_channel'
+    'is_owner',
+    'parse_channel_ids',
+    'send_post_to_channel',
+    'publish_post'
 ]
@@ -0,0 +1,80 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config import ADMIN_IDS
+from src.database.async_db import async_db
+
+logger = logging.getLogger(__name__)
+
+# --- Roles ---
+OWNER = "owner"
+ADMIN = "admin"
+ROLES = (OWNER, ADMIN)
+
+
+class AdminRoster:
+    """
+    In-memory copy of the ``admins`` table: a dict of user id -> role.
+
+    Every update is authorized with a single dict lookup. The roster is loaded
+    once at startup; adding or removing an admin writes the row and then updates
+    just that entry, so changes apply immediately without a restart or a reload.
+    Users listed in ADMIN_USER_ID are always owners and are seeded into the table.
+    """
+
+    def __init__(self, configured_owners: Iterable[int] = ()):
+        self.configured_owners = frozenset(configured_owners)
+        # Configured owners are authorized even before the table has been loaded
+        self._roles: Dict[int, str] = {user_id: OWNER for user_id in self.configured_owners}
+
+    async def load(self) -> None:
+        """Seeds the configured owners and loads the whole roster with one query."""
+        rows = dict(await async_db.get_admins())
+        for user_id in self.configured_owners:
+            if rows.get(user_id) != OWNER:
+                await async_db.set_admin(user_id, OWNER)
+                rows[user_id] = OWNER
+        self._roles = rows
+        logger.info(f"Admin roster loaded: {len(self._roles)} admins.")
+
+    # --- Lookups ---
+    def role(self, user_id: int) -> Optional[str]:
+        return self._roles.get(user_id)
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self._roles
+
+    def is_owner(self, user_id: int) -> bool:
+        return self._roles.get(user_id) == OWNER
+
+    def members(self) -> List[Tuple[int, str]]:
+        return sorted(self._roles.items(), key=lambda item: (ROLES.index(item[1]) if item[1] in ROLES else len(ROLES), item[0]))
+
+    # --- Changes ---
+    async def add(self, user_id: int, role: str = ADMIN, added_by: Optional[int] = None, username: Optional[str] = None) -> bool:
+        """
+        Adds an admin (or changes their role); the cache entry changes only once the row
+        is saved. Configured owners stay owners: their role can only change in the environment.
+        """
+        if role not in ROLES:
+            raise ValueError(f"Unknown role '{role}'")
+        if user_id in self.configured_owners and role != OWNER:
+            return False
+        if not await async_db.set_admin(user_id, role, added_by, username):
+            return False
+        self._roles[user_id] = role
+        logger.info(f"Admin {user_id} saved with role '{role}' by {added_by}.")
+        return True
+
+    async def remove(self, user_id: int) -> bool:
+        """Removes an admin; configured owners can only be removed from the environment."""
+        if user_id in self.configured_owners:
+            return False
+        if not await async_db.remove_admin(user_id):
+            return False
+        self._roles.pop(user_id, None)
+        logger.info(f"Admin {user_id} removed.")
+        return True
+
+
+admin_roster = AdminRoster(ADMIN_IDS)
@@ -0,0 +1,105 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.database.async_db import async_db
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedBanner:
+    file_id: str
+    file_unique_id: str
+    size: int = 0
+
+
+class BannerCache:
+    """
+    Remembers the Telegram file_id of every banner after its first upload.
+
+    Entries live in memory and are persisted on the PostType row, so a banner is
+    uploaded once per post type and later previews/posts only send its file_id.
+    They are also indexed by banner file: post types sharing an image (banners
+    are stored by content hash) share the first upload's file_id.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CachedBanner] = {}
+        self._by_file: Dict[str, CachedBanner] = {}
+        self.uploads = 0
+        self.reuses = 0
+        self.bytes_uploaded = 0
+        self.bytes_reused = 0
+
+    async def get(self, post_type: str, banner_path: Optional[str] = None) -> Optional[CachedBanner]:
+        """Returns the cached banner of a post type, loading it from the database on a miss."""
+        entry = self._entries.get(post_type)
+        if entry:
+            return entry
+
+        row = await async_db.get_post_type(post_type)
+        if not row or not row.banner_file_id:
+            shared = self._by_file.get(banner_path) if banner_path else None
+            if shared is None:
+                return None
+            # Another post type already uploaded this very file
+            self._entries[post_type] = shared
+            await async_db.set_banner_file_id(post_type, shared.file_id, shared.file_unique_id)
+            return shared
+        entry = CachedBanner(row.banner_file_id, row.banner_file_unique_id or "")
+
+        if banner_path and os.path.exists(banner_path):
+            entry.size = os.path.getsize(banner_path)
+            self._by_file.setdefault(banner_path, entry)
+        self._entries[post_type] = entry
+        return entry
+
+    async def store(self, post_type: str, file_id: str, file_unique_id: str, size: int, banner_path: Optional[str] = None) -> None:
+        """Caches the ids of a freshly uploaded banner and counts the uploaded bytes."""
+        entry = CachedBanner(file_id, file_unique_id, size)
+        self._entries[post_type] = entry
+        if banner_path:
+            self._by_file[banner_path] = entry
+        self.uploads += 1
+        self.bytes_uploaded += size
+
+        await async_db.set_banner_file_id(post_type, file_id, file_unique_id)
+        logger.info(f"Banner of '{post_type}' uploaded ({size} bytes), file_id cached.")
+
+    def record_reuse(self, post_type: str) -> None:
+        entry = self._entries.get(post_type)
+        self.reuses += 1
+        self.bytes_reused += entry.size if entry else 0
+
+    async def invalidate(self, post_type: str, persist: bool = True, rejected: bool = False) -> None:
+        """
+        Drops the cached file_id of a post type, e.g. after its banner was
+        replaced. With ``rejected`` (Telegram refused the file_id) the id is
+        also dropped for every other post type sharing the file.
+        """
+        entry = self._entries.pop(post_type, None)
+        if rejected and entry:
+            for path in [path for path, shared in self._by_file.items() if shared.file_id == entry.file_id]:
+                del self._by_file[path]
+            for other in [name for name, shared in self._entries.items() if shared.file_id == entry.file_id]:
+                del self._entries[other]
+        if not persist:
+            return
+
+        await async_db.set_banner_file_id(post_type, None, None)
+        logger.info(f"Banner cache of '{post_type}' invalidated.")
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._entries),
+            "files": len(self._by_file),
+            "uploads": self.uploads,
+            "reuses": self.reuses,
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_reused": self.bytes_reused,
+        }
+
+
+banner_cache = BannerCache()
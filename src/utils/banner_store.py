@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import uuid
+from typing import Dict, List, Optional
+
+import aiofiles
+import httpx
+from telegram import File
+
+from src.config import BANNERS_DIR
+from src.utils.bot_request import shared_ssl_context
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it banners are stored as Telegram sent them
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Telegram keeps photos at most 2560 px on the longer side and accepts uploads up to 10 MB
+MAX_BANNER_SIDE = 2560
+MAX_BANNER_BYTES = 10 * 1024 * 1024
+JPEG_QUALITY = 90
+DOWNLOAD_CHUNK = 64 * 1024
+DOWNLOAD_TIMEOUT = 60
+
+
+class BannerStore:
+    """
+    Banner files, stored under the SHA-256 of their content.
+
+    ``ingest()`` streams a photo from Telegram to disk (async file I/O, hashed
+    on the way), re-encodes it only when it exceeds what Telegram accepts for
+    a photo, and names it ``<sha256>.jpg``: the name no longer comes from the
+    post type, and post types with the same image share one file. The file
+    name is kept in ``PostType.banner_file``; banners saved by older versions
+    as ``<post type>.jpg`` are still found.
+    """
+
+    def __init__(self, directory: str = BANNERS_DIR):
+        self.directory = directory
+        # SHA-256 of a downloaded original -> file it was stored as, when it had to be re-encoded
+        self._reencoded_from: Dict[str, str] = {}
+        self.ingested = 0
+        self.deduplicated = 0
+        self.reencoded = 0
+
+    # --- Paths ---
+    def path_for(self, post_type: str, banner_file: Optional[str]) -> Optional[str]:
+        """The banner file of a post type, or None if it has no banner on disk."""
+        if banner_file:
+            path = os.path.join(self.directory, banner_file)
+            return path if os.path.exists(path) else None
+        # Banner saved by an older version under the post type's name
+        if os.path.basename(post_type) != post_type:
+            return None
+        path = os.path.join(self.directory, f"{post_type}.jpg")
+        return path if os.path.exists(path) else None
+
+    # --- Ingest ---
+    async def ingest(self, file: File) -> str:
+        """Downloads a photo, normalizes it and stores it; returns its file name (to keep in ``banner_file``)."""
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.part")
+        try:
+            source_digest = await self._download(file, temp_path)
+            banner_file = self._stored_as(source_digest)
+            if banner_file is None:
+                # Pillow holds the GIL while encoding (~30 ms for a large photo), but only oversized banners get here
+                encoded = await asyncio.to_thread(self._normalize, temp_path)
+                if encoded is None:
+                    banner_file = f"{source_digest}.jpg"
+                else:
+                    banner_file = f"{hashlib.sha256(encoded).hexdigest()}.jpg"
+                    async with aiofiles.open(temp_path, 'wb') as out:
+                        await out.write(encoded)
+                    self._reencoded_from[source_digest] = banner_file
+                    self.reencoded += 1
+
+            path = os.path.join(self.directory, banner_file)
+            if os.path.exists(path):
+                self.deduplicated += 1
+                logger.info(f"Banner {banner_file} already stored, reusing it.")
+            else:
+                os.replace(temp_path, path)
+                logger.info(f"Banner stored as {banner_file} ({os.path.getsize(path)} bytes).")
+            self.ingested += 1
+            return banner_file
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _stored_as(self, source_digest: str) -> Optional[str]:
+        """The file an identical download was already stored as, so it is not decoded and re-encoded again."""
+        for banner_file in (f"{source_digest}.jpg", self._reencoded_from.get(source_digest)):
+            if banner_file and os.path.exists(os.path.join(self.directory, banner_file)):
+                return banner_file
+        return None
+
+    async def _download(self, file: File, temp_path: str) -> str:
+        """Streams the file to ``temp_path`` chunk by chunk and returns the SHA-256 of its bytes."""
+        digest = hashlib.sha256()
+        async with aiofiles.open(temp_path, 'wb') as out:
+            if file.file_path and not file.file_path.startswith(("http://", "https://")):
+                # Local Bot API server: file_path is a path on this machine
+                async with aiofiles.open(file.file_path, 'rb') as source:
+                    while chunk := await source.read(DOWNLOAD_CHUNK):
+                        digest.update(chunk)
+                        await out.write(chunk)
+                return digest.hexdigest()
+
+            async with httpx.AsyncClient(verify=shared_ssl_context(), timeout=DOWNLOAD_TIMEOUT) as client:
+                async with client.stream("GET", file.file_path) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK):
+                        digest.update(chunk)
+                        await out.write(chunk)
+        return digest.hexdigest()
+
+    def _normalize(self, path: str) -> Optional[bytes]:
+        """
+        The banner re-encoded as a JPEG Telegram accepts, or None to keep the
+        file as it is. Photos from Telegram usually pass untouched: they are
+        already JPEGs within the limits, and re-encoding them would only lose
+        quality.
+        """
+        if Image is None:
+            if os.path.getsize(path) > MAX_BANNER_BYTES:
+                logger.warning(f"Banner is over {MAX_BANNER_BYTES} bytes and Pillow is not installed to shrink it.")
+            return None
+
+        with Image.open(path) as image:
+            fits = (
+                image.format == 'JPEG'
+                and max(image.size) <= MAX_BANNER_SIDE
+                and os.path.getsize(path) <= MAX_BANNER_BYTES
+            )
+            if fits:
+                return None
+            image = image.convert('RGB')
+            image.thumbnail((MAX_BANNER_SIDE, MAX_BANNER_SIDE), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=JPEG_QUALITY)
+        return buffer.getvalue()
+
+    # --- Cleanup ---
+    async def release(self, post_type: str, banner_file: Optional[str], still_used: List[Optional[str]]) -> None:
+        """Deletes the banner of a removed post type unless another post type (``still_used``) shares the file."""
+        if banner_file and banner_file in still_used:
+            return
+        path = self.path_for(post_type, banner_file)
+        if path:
+            await asyncio.to_thread(os.remove, path)
+            logger.info(f"Banner file {path} deleted.")
+
+    def stats(self) -> dict:
+        return {"ingested": self.ingested, "deduplicated": self.deduplicated, "reencoded": self.reencoded}
+
+
+banner_store = BannerStore()
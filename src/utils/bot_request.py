@@ -0,0 +1,25 @@
+import ssl
+from functools import lru_cache
+
+import httpx
+from telegram.request import HTTPXRequest
+
+
+@lru_cache(maxsize=None)
+def shared_ssl_context() -> ssl.SSLContext:
+    """The SSL context httpx would build by default, built once: loading the CA bundle takes ~40 ms."""
+    return httpx.create_ssl_context()
+
+
+class SharedSSLRequest(HTTPXRequest):
+    """
+    HTTPXRequest whose clients share one SSL context. The application has two
+    of them (getUpdates and every other call) and httpx loads the CA bundle
+    for each client it builds, which is most of the time spent building the
+    application at startup.
+    """
+
+    __slots__ = ()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(verify=shared_ssl_context(), **self._client_kwargs)
@@ -0,0 +1,163 @@
+import logging
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from src.config import CAPTION_TEMPLATE_CACHE_SIZE
+from src.utils.post_type_registry import post_type_registry
+
+logger = logging.getLogger(__name__)
+
+# --- Template Kinds ---
+CAPTION = 'caption'            # The post itself (the poster of a film)
+FILE_CAPTION = 'file_caption'  # The film file sent after the poster
+
+# Fields a template can use: what extract_movie_info produces, plus the text an admin typed for a post
+FIELDS = (
+    'name', 'year', 'score', 'country', 'duration', 'genre', 'language', 'awards',
+    'actors', 'quality', 'summary', 'text', 'post_type',
+)
+
+# --- Built-in Layouts ---
+# Used by post types that have no template of their own
+DEFAULT_MOVIE_CAPTION = """Download 🔞#Film_Nights🔞
+
+⬛️ Name: {name}
+🟨 Data Release: {year}
+🟥 Score IMDB: 《{score}》
+🟩 Country: {country|🇺🇸 USA}
+🟪 Time: {duration}
+🟫 Genre: 《{genre}》
+
+{summary}
+
+🔗 https://t.me/Film_Maamnooe"""
+
+DEFAULT_FILE_CAPTION = """🟧 {name}
+🟥 Quality: {quality|720p}
+🟦 Language: 《زیرنویس چسبیده》
+
+🔗 https://t.me/Film_Maamnooe"""
+
+# A post is sent as the admin typed it
+DEFAULT_POST_CAPTION = "{text}"
+
+# {field}, {field|fallback when empty}; {{ and }} are literal braces. Other braces are kept as they are.
+PLACEHOLDER_PATTERN = re.compile(r'\{\{|\}\}|\{(?P<field>\w+)(?:\|(?P<fallback>[^{}]*))?\}')
+
+Renderer = Callable[[Mapping], str]
+
+
+class TemplateError(ValueError):
+    """A template uses a field that doesn't exist."""
+
+
+def _value(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+def compile_template(template: str) -> Renderer:
+    """
+    Parses a template once into literal text and (field, fallback) slots and
+    returns a function rendering it from a dict of field values.
+
+    Raises:
+        TemplateError: If a placeholder names an unknown field.
+    """
+    literals = []
+    slots = []
+    literal = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(template):
+        literal.append(template[position:match.start()])
+        position = match.end()
+        field = match.group('field')
+        if field is None:
+            literal.append(match.group()[0])
+            continue
+        if field not in FIELDS:
+            raise TemplateError(field)
+        literals.append("".join(literal))
+        literal = []
+        slots.append((field, match.group('fallback') or ""))
+    literal.append(template[position:])
+    tail = "".join(literal)
+
+    def render(values: Mapping) -> str:
+        parts = []
+        for prefix, (field, fallback) in zip(literals, slots):
+            parts.append(prefix)
+            parts.append(_value(values.get(field)) or fallback)
+        parts.append(tail)
+        return "".join(parts)
+
+    return render
+
+
+class CaptionTemplates:
+    """
+    Compiled caption templates of the post types.
+
+    A post type's template (``PostType.caption_template`` and
+    ``file_caption_template``, or the built-in layout when unset) is compiled
+    the first time it is rendered; the renderer is kept in a bounded LRU cache,
+    so a caption is built without parsing its template again. An entry is
+    recompiled when the post type's template changes, and dropped by
+    ``invalidate()`` when the template is edited or the post type deleted.
+    """
+
+    def __init__(self, max_size: int = CAPTION_TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        # (post type, kind) -> (template source, renderer)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, Renderer]]" = OrderedDict()
+        self.hits = 0
+        self.compiles = 0
+
+    async def render(self, post_type: str, kind: str, values: Mapping, default: str) -> str:
+        """Renders the post type's template of the given kind, or ``default`` if it has none."""
+        row = await post_type_registry.get(post_type)
+        template = getattr(row, f"{kind}_template", None) if row else None
+        renderer = self.renderer(post_type, kind, template or default)
+        return renderer(values)
+
+    def renderer(self, post_type: str, kind: str, template: str) -> Renderer:
+        key = (post_type, kind)
+        entry = self._entries.get(key)
+        if entry and entry[0] == template:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        try:
+            renderer = compile_template(template)
+        except TemplateError as e:
+            # Saved templates are checked first; this only guards against hand-edited rows
+            logger.error(f"{kind} template of '{post_type}' uses unknown field '{e}', using it as plain text.")
+            renderer = lambda values, template=template: template
+        self.compiles += 1
+        self._entries[key] = (template, renderer)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return renderer
+
+    def invalidate(self, post_type: str) -> None:
+        """Drops the compiled templates of a post type, e.g. after they were edited."""
+        for kind in (CAPTION, FILE_CAPTION):
+            self._entries.pop((post_type, kind), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "compiles": self.compiles}
+
+
+caption_templates = CaptionTemplates()
+
+
+def check_template(template: str) -> Optional[str]:
+    """The first unknown field a template uses, or None if every placeholder is valid."""
+    try:
+        compile_template(template)
+    except TemplateError as e:
+        return str(e)
+    return None
@@ -1,15 +1,29 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+from functools import lru_cache
 from typing import List
 
+# Markups are immutable once built, so the static keyboards are built once and shared
+
 # --- Main Menu Keyboard ---
+@lru_cache(maxsize=None)
 def main_menu_keyboard() -> ReplyKeyboardMarkup:
     """Returns the main menu keyboard for admins."""
     keyboard = [
         ["➕ ساخت پست جدید", "🎬 دیزاین پست فیلم"],
+        ["📦 دیزاین گروهی فیلم"],
         ["⚙️ مدیریت انواع پست", "📊 آمار و گزارش"],
     ]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
 
+@lru_cache(maxsize=None)
+def batch_collect_keyboard() -> ReplyKeyboardMarkup:
+    """Returns the keyboard shown while posters and files of a batch are being collected."""
+    keyboard = [
+        ["✅ پایان ارسال"],
+        ["❌ لغو"],
+    ]
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+
 # --- Dynamic Post Types Keyboard ---
 def post_types_keyboard(post_types: List[str]) -> InlineKeyboardMarkup:
     """
@@ -21,6 +35,7 @@ def post_types_keyboard(post_types: List[str]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 # --- Confirmation Keyboard ---
+@lru_cache(maxsize=None)
 def confirm_keyboard() -> InlineKeyboardMarkup:
     """Returns a confirmation keyboard (Yes/No)."""
     keyboard = [
@@ -29,7 +44,18 @@ def confirm_keyboard() -> InlineKeyboardMarkup:
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
+def post_confirm_keyboard() -> InlineKeyboardMarkup:
+    """Returns the confirmation keyboard of a new post, with an option to schedule it."""
+    keyboard = [
+        [InlineKeyboardButton("✅ ارسال شود", callback_data="confirm_send"),
+         InlineKeyboardButton("❌ خیر", callback_data="cancel_action")],
+        [InlineKeyboardButton("⏰ زمان‌بندی ارسال", callback_data="schedule_post")]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
 # --- Admin Panel Keyboard ---
+@lru_cache(maxsize=None)
 def admin_panel_keyboard() -> InlineKeyboardMarkup:
     """
     Returns the keyboard for the admin panel with various management options.
@@ -38,13 +64,27 @@ def admin_panel_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton("👁️ مشاهده انواع پست", callback_data="view_post_types")],
         [InlineKeyboardButton("➕ افزودن نوع پست", callback_data="add_post_type")],
         [InlineKeyboardButton("🗑️ حذف نوع پست", callback_data="delete_post_type")],
+        [InlineKeyboardButton("📡 کانال‌های نوع پست", callback_data="set_post_type_channels")],
+        [InlineKeyboardButton("📝 قالب کپشن نوع پست", callback_data="set_post_type_templates")],
         [InlineKeyboardButton("🔙 بازگشت به منوی اصلی", callback_data="back_to_main_menu")]
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=None)
 def back_to_admin_panel_keyboard() -> InlineKeyboardMarkup:
     """Returns a keyboard with a button to go back to the admin menu."""
     keyboard = [
         [InlineKeyboardButton("🔙 بازگشت به پنل ادمین", callback_data="back_to_admin_menu")]
     ]
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+# --- Search Pagination Keyboard ---
+def search_pagination_keyboard(page: int, pages: int) -> InlineKeyboardMarkup:
+    """Previous/next buttons of a page of search results."""
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton("◀️ قبلی", callback_data=f"search_page_{page - 1}"))
+    row.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data="search_page_noop"))
+    if page + 1 < pages:
+        row.append(InlineKeyboardButton("بعدی ▶️", callback_data=f"search_page_{page + 1}"))
+    return InlineKeyboardMarkup([row])
@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+import gzip
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from src.config import (
+    LOG_ARCHIVE_BATCH,
+    LOG_ARCHIVE_DIR,
+    LOG_ARCHIVE_INTERVAL_HOURS,
+    LOG_RESTORE_HOLD_DAYS,
+    LOG_RETENTION_DAYS,
+)
+from src.database.async_db import async_db
+from src.database.database import STATS_ZONE, stat_keys
+
+logger = logging.getLogger(__name__)
+
+# Pause between two batches, so handlers get the database in between
+BATCH_PAUSE = 0.2
+
+
+def write_archive(path: str, rows: List[dict]) -> None:
+    """Writes rows as gzip JSON lines; the file appears under its name only once complete."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".part"
+    with gzip.open(partial, "wt", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps(row, ensure_ascii=False) + "\n")
+    with open(partial, "rb") as archive:
+        os.fsync(archive.fileno())
+    os.replace(partial, path)
+
+
+def read_archive(path: str) -> List[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+
+def archive_stats(rows: List[dict]) -> Dict[str, Dict[str, int]]:
+    """The rollup counters of archived rows, as stored with the archive: {dimension: {key: count}}."""
+    counts: Counter = Counter()
+    for row in rows:
+        sent_at = None
+        if row["sent_at"]:
+            sent_at = datetime.fromisoformat(row["sent_at"]).replace(tzinfo=timezone.utc).astimezone(STATS_ZONE)
+        counts.update(stat_keys(row["post_type"] or '?', row["sent_by"], sent_at))
+    stats: Dict[str, Dict[str, int]] = {}
+    for (dimension, key), count in counts.items():
+        stats.setdefault(dimension, {})[key] = count
+    return stats
+
+
+class PostLogArchiver:
+    """
+    Moves post logs older than the retention period into gzip JSONL files.
+
+    A pass archives the oldest logs in small batches: each batch is written to
+    its own file first, then deleted from ``post_logs`` in the same transaction
+    that records the file in ``log_archives``, so a crash never loses a log (at
+    worst a batch is written twice). Archives keep the rollup counters of their
+    rows, so the statistics stay complete. ``restore`` puts archived ranges back.
+    """
+
+    def __init__(self, retention_days: int = 0, archive_dir: str = LOG_ARCHIVE_DIR, batch_size: int = LOG_ARCHIVE_BATCH,
+                 interval: float = 6 * 3600, hold_days: int = 7, batch_pause: float = BATCH_PAUSE):
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.interval = interval
+        self.hold_days = hold_days
+        self.batch_pause = batch_pause
+        # Held while logs move between post_logs and the archives; statistics rebuilds take it too
+        self.lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Post log retention started: logs older than {self.retention_days} days are archived to {self.archive_dir}.")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.archive_pass()
+            except Exception as e:
+                logger.error(f"Error archiving post logs: {e}")
+            await asyncio.sleep(self.interval)
+
+    # --- Archiving ---
+    async def archive_pass(self, now: Optional[datetime] = None) -> int:
+        """Archives every log older than the retention period; returns the number of logs moved."""
+        if not self.enabled:
+            return 0
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.retention_days)
+        hold_since = now - timedelta(days=self.hold_days)
+        await async_db.release_log_archives(hold_since)
+        held = await async_db.get_held_log_ranges(hold_since)
+
+        moved = 0
+        while True:
+            async with self.lock:
+                count = await self._archive_batch(cutoff, held)
+            moved += count
+            if count < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        if moved:
+            logger.info(f"Archived {moved} post logs sent before {cutoff:%Y-%m-%d %H:%M} UTC.")
+        return moved
+
+    async def _archive_batch(self, cutoff: datetime, held: List) -> int:
+        rows = await async_db.get_archivable_post_logs(cutoff, self.batch_size, held)
+        if not rows:
+            return 0
+        name = f"post_logs_{rows[0]['id']:010d}_{rows[-1]['id']:010d}.jsonl.gz"
+        path = os.path.join(self.archive_dir, name)
+        await asyncio.to_thread(write_archive, path, rows)
+        stats = await asyncio.to_thread(archive_stats, rows)
+        if not await async_db.archive_post_logs(name, rows, stats):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            raise RuntimeError(f"Could not record archive {name}")
+        return len(rows)
+
+    # --- Restoring ---
+    async def restore(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """
+        Puts back every archive holding logs sent between ``since`` and ``until``
+        (naive UTC); returns the number of logs restored. Whole archive files are
+        restored, so a few logs just outside the range may come back too.
+        """
+        restored = 0
+        for archive in await async_db.get_log_archives(since, until):
+            path = os.path.join(self.archive_dir, archive.path)
+            async with self.lock:
+                rows = await asyncio.to_thread(read_archive, path)
+                if not await async_db.restore_post_logs(archive.id, rows):
+                    raise RuntimeError(f"Could not restore archive {archive.path}")
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            restored += len(rows)
+        if restored:
+            logger.info(f"Restored {restored} archived post logs.")
+        return restored
+
+
+post_log_archiver = PostLogArchiver(
+    retention_days=LOG_RETENTION_DAYS,
+    interval=LOG_ARCHIVE_INTERVAL_HOURS * 3600,
+    hold_days=LOG_RESTORE_HOLD_DAYS,
+)
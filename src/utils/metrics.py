@@ -0,0 +1,385 @@
+import asyncio
+import contextlib
+import logging
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from telegram import Update
+from telegram.ext import Application, ApplicationHandlerStop, BaseHandler, ConversationHandler, TypeHandler
+
+from src.config import METRICS_LISTEN, METRICS_PORT
+from src.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds a client gets to send its request line and headers
+REQUEST_TIMEOUT = 5
+# Seconds a readiness check gets before it counts as failed
+READINESS_TIMEOUT = 2
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# --- Metric Types ---
+class Metric:
+    """A named metric with one series per combination of label values."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """(name, label names, label values, value) of every sample, for the exposition."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, self.labels, key, value
+
+
+class Gauge(Metric):
+    """A value that goes up and down; ``collect`` computes every series at scrape time instead."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self.collect = collect
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self):
+        values = self.collect() if self.collect else self._values
+        for key, value in values.items():
+            yield self.name, self.labels, key, value
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets, plus their count and sum (Prometheus histogram)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (the last one is +Inf, not cumulative)..., sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        names = self.labels + ('le',)
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", names, key + (_format_value(bound),), cumulative
+            yield f"{self.name}_count", self.labels, key, cumulative
+            yield f"{self.name}_sum", self.labels, key, series[-1]
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, collect))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, label_names, label_values, value in metric.samples():
+                    lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+            except Exception as e:
+                logger.error(f"Error collecting metric {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# --- Instruments ---
+UPDATES = registry.counter("bot_updates_total", "Updates received, by update type.", ("type",))
+HANDLER_SECONDS = registry.histogram("bot_handler_seconds", "Time spent in handler callbacks, by callback.", ("handler",))
+HANDLER_ERRORS = registry.counter("bot_handler_errors_total", "Handler callbacks that raised, by callback.", ("handler",))
+ERRORS = registry.counter("bot_errors_total", "Errors that reached the error handler, by exception type.", ("error",))
+OPERATION_SECONDS = registry.histogram("bot_operation_seconds", "Time spent in instrumented operations outside handlers.", ("operation",))
+API_SECONDS = registry.histogram("telegram_api_request_seconds", "Bot API round trips by method, without the time spent in the send queue.", ("method",))
+API_ERRORS = registry.counter("telegram_api_errors_total", "Bot API calls that failed, by method and error.", ("method", "error"))
+UPDATE_WAIT_SECONDS = registry.histogram("bot_update_wait_seconds", "Time updates waited for their user's earlier updates and a free worker before processing.")
+QUEUE_WAIT_SECONDS = registry.histogram("telegram_send_queue_wait_seconds", "Time Bot API calls waited in the send queue, by lane.", ("lane",))
+FLOOD_WAITS = registry.counter("telegram_flood_waits_total", "RetryAfter (flood control) answers, by method.", ("method",))
+# Computed at scrape time from the application, see instrument_application()
+CONVERSATIONS_OPEN = registry.gauge("bot_conversations_open", "Conversations currently in progress, by conversation.", ("conversation",))
+SEND_QUEUE_DEPTH = registry.gauge("telegram_send_queue_depth", "Bot API calls waiting in the send queue, by lane.", ("lane",))
+UPDATES_IN_FLIGHT = registry.gauge("bot_updates_in_flight", "Updates being processed (running) or waiting for their user's earlier updates or a free worker (waiting).", ("state",))
+
+
+def timed(operation: str):
+    """Decorator recording the duration of a coroutine function in ``bot_operation_seconds``."""
+    def decorate(func):
+        @wraps(func)
+        async def wrapped(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - start, operation=operation)
+        return wrapped
+    return decorate
+
+
+# --- Application Instrumentation ---
+def _timed_callback(callback: Callable, name: str) -> Callable:
+    span_name = f"handler {name}"
+
+    @wraps(callback)
+    async def timed_callback(update, context):
+        start = time.perf_counter()
+        try:
+            with span(span_name):
+                return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, handler=name)
+    timed_callback.__metrics_wrapped__ = True
+    return timed_callback
+
+
+def _walk_handlers(handlers: Iterable[BaseHandler], conversations: List[ConversationHandler]) -> Iterator[BaseHandler]:
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            conversations.append(handler)
+            yield from _walk_handlers(handler.entry_points, conversations)
+            for state_handlers in handler.states.values():
+                yield from _walk_handlers(state_handlers, conversations)
+            yield from _walk_handlers(handler.fallbacks, conversations)
+        else:
+            yield handler
+
+
+async def _count_update(update: Update, context) -> None:
+    for update_type in Update.ALL_TYPES:
+        if getattr(update, update_type, None) is not None:
+            UPDATES.inc(type=update_type)
+            return
+    UPDATES.inc(type='other')
+
+
+def instrument_application(application: Application) -> int:
+    """
+    Times every handler callback registered so far (including the ones inside
+    conversations) and opens a tracing span around it, counts incoming updates and publishes the number of open
+    conversations, the send queue depth and the updates in flight. Call it once all handlers are
+    added; returns the number of callbacks wrapped.
+    """
+    conversations: List[ConversationHandler] = []
+    wrapped = 0
+    for group in application.handlers.values():
+        for handler in _walk_handlers(group, conversations):
+            if not getattr(handler.callback, '__metrics_wrapped__', False):
+                callback = handler.callback
+                # e.g. "post_handler.text_received": callbacks of different modules share names like "cancel"
+                name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+                handler.callback = _timed_callback(callback, name)
+                wrapped += 1
+    # Counts every update before any other group handles it
+    application.add_handler(TypeHandler(Update, _count_update), group=-1)
+
+    def open_conversations() -> Dict[LabelValues, float]:
+        # PTB keeps the open conversations (key -> state) in a private dict; there is no public accessor
+        return {(handler.name or repr(handler),): len(handler._conversations) for handler in conversations}
+    CONVERSATIONS_OPEN.collect = open_conversations
+
+    rate_limiter = application.bot.rate_limiter
+    if hasattr(rate_limiter, 'stats'):
+        SEND_QUEUE_DEPTH.collect = lambda: {(lane,): stats['depth'] for lane, stats in rate_limiter.stats()['lanes'].items()}
+    update_processor = application.update_processor
+    if hasattr(update_processor, 'stats'):
+        UPDATES_IN_FLIGHT.collect = lambda: {(state,): update_processor.stats()[state] for state in ('running', 'waiting')}
+    return wrapped
+
+
+# --- HTTP Endpoint ---
+class MetricsServer:
+    """
+    Serves the metrics in the Prometheus text format on ``/metrics``, plus a
+    liveness (``/healthz``) and a readiness (``/readyz``) probe.
+
+    A deliberately tiny HTTP/1.1 responder on asyncio streams (one request per
+    connection), so it runs on the bot's event loop without another dependency.
+    A scrape only reads in-memory counters; the readiness checks run with a
+    timeout, so a stuck database makes the bot unready instead of hanging the probe.
+    """
+
+    def __init__(self, host: str = METRICS_LISTEN, port: int = METRICS_PORT, metrics: MetricsRegistry = registry):
+        self.host = host
+        self.port = port
+        self.metrics = metrics
+        self._readiness_checks: Dict[str, Callable[[], Awaitable[bool]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.port)
+
+    def add_readiness_check(self, name: str, check: Callable[[], Awaitable[bool]]) -> None:
+        self._readiness_checks[name] = check
+
+    async def readiness(self) -> List[str]:
+        """The names of the readiness checks that fail; empty when the bot is ready."""
+        failed = []
+        for name, check in self._readiness_checks.items():
+            try:
+                if not await asyncio.wait_for(check(), READINESS_TIMEOUT):
+                    failed.append(name)
+            except asyncio.TimeoutError:
+                logger.warning(f"Readiness check {name} timed out.")
+                failed.append(name)
+            except Exception as e:
+                logger.warning(f"Readiness check {name} failed: {e}")
+                failed.append(name)
+        return failed
+
+    async def start(self) -> None:
+        if self.enabled and self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            logger.info(f"Metrics served on http://{self.host}:{self.port}/metrics (probes: /healthz, /readyz).")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _respond(self, path: str) -> Tuple[int, str, str]:
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4; charset=utf-8', self.metrics.render()
+        if path == '/healthz':
+            # Answering at all means the event loop is running
+            return 200, 'text/plain; charset=utf-8', 'ok\n'
+        if path == '/readyz':
+            failed = await self.readiness()
+            if failed:
+                return 503, 'text/plain; charset=utf-8', f"not ready: {', '.join(failed)}\n"
+            return 200, 'text/plain; charset=utf-8', 'ready\n'
+        return 404, 'text/plain; charset=utf-8', 'not found\n'
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            while (await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] not in ('GET', 'HEAD'):
+                status, content_type, body = 405, 'text/plain; charset=utf-8', 'method not allowed\n'
+            else:
+                status, content_type, body = await self._respond(parts[1].split('?', 1)[0])
+            payload = body.encode('utf-8')
+            reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed', 503: 'Service Unavailable'}[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode('latin-1')
+            )
+            if parts and parts[0] != 'HEAD':
+                writer.write(payload)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error serving a metrics request: {e}")
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+
+metrics_server = MetricsServer()
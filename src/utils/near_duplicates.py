@@ -0,0 +1,230 @@
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+from src.config import DUPLICATE_LOOKBACK_DAYS, DUPLICATE_MAX_DISTANCE
+from src.database.async_db import async_db
+from src.text_normalize import normalize_persian
+
+logger = logging.getLogger(__name__)
+
+# --- Fingerprints ---
+FINGERPRINT_BITS = 64
+# Characters per shingle: robust to small edits even in short posts
+SHINGLE_SIZE = 4
+# Words starting with these are left out of the fingerprint
+IGNORED_PREFIXES = ("@", "http://", "https://", "t.me/")
+# Post logs read per database call while loading
+LOAD_BATCH = 20000
+# Posts added to the index between two yields to the event loop while loading
+LOAD_YIELD_EVERY = 2000
+# Lookup tables, each keyed by a window of this many fingerprint bits
+LOOKUP_TABLES = 8
+LOOKUP_KEY_BITS = 16
+
+# BIT_TABLES[b] maps a byte to its bit b, so a column of hash bytes is counted in C
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash of the normalized text's character shingles: texts that
+    differ in a few words have fingerprints that differ in a few bits.
+    """
+    # Mentions and links are mostly the channel footer every post shares; they would pull all fingerprints together
+    words = " ".join(word for word in normalize_persian(text).split() if not word.startswith(IGNORED_PREFIXES))
+    shingles = {words[i:i + SHINGLE_SIZE] for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    # A stable 64-bit hash per shingle (CRC-based ones are linear, so their bits correlate)
+    packed = b"".join(blake2b(shingle.encode(), digest_size=8).digest() for shingle in shingles)
+
+    # Bit i of the fingerprint is set when most shingle hashes have it set
+    fingerprint = 0
+    for position in range(8):
+        column = packed[position::8]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) * 2 > len(shingles):
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def fingerprint_texts(texts: Dict[int, str]) -> Dict[int, int]:
+    """Fingerprints of {log id: text}; the logs of a post sent to several channels share one computation."""
+    by_text: Dict[str, int] = {}
+    fingerprints = {}
+    for log_id, text in texts.items():
+        if text not in by_text:
+            by_text[text] = simhash(text)
+        fingerprints[log_id] = by_text[text]
+    return fingerprints
+
+
+def to_db(fingerprint: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def from_db(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+
+@dataclass(frozen=True)
+class DuplicateMatch:
+    log_id: int
+    sent_at: float  # Unix timestamp
+    distance: int  # Differing fingerprint bits
+
+    @property
+    def similarity(self) -> float:
+        return 1 - self.distance / FINGERPRINT_BITS
+
+
+class NearDuplicateIndex:
+    """
+    In-memory SimHash index of the recently published posts.
+
+    Fingerprints within ``max_distance`` bits of a query are found with
+    multi-probe lookup tables: each of ``tables`` tables buckets the
+    fingerprints by a window of ``key_bits`` bits (the windows are spread
+    evenly over the 64), and a lookup probes the query's bucket plus the ones
+    differing from it in one key bit. A post close to the query differs from
+    it in at most one bit of some window almost surely (99.6% of the time for
+    8 differing bits with the defaults), so a lookup is about a hundred dict
+    probes and a popcount per candidate, instead of a scan. Fingerprints are
+    stored with the post logs; the index is loaded from them in the background
+    at startup (computing the ones logged before this existed). Posts older
+    than the lookback are evicted as new ones are added, oldest first from a
+    heap of (sent_at, fingerprint), so the index only ever holds the window.
+    """
+
+    def __init__(self, max_distance: int = 8, lookback_days: int = 90, tables: int = LOOKUP_TABLES, key_bits: int = LOOKUP_KEY_BITS):
+        self.max_distance = max_distance
+        self.lookback = lookback_days * 86400
+        windows = [
+            [(FINGERPRINT_BITS * table // tables + bit) % FINGERPRINT_BITS for bit in range(key_bits)]
+            for table in range(tables)
+        ]
+        self._masks = [sum(1 << bit for bit in window) for window in windows]
+        # The keys to probe for a key are key ^ flip for each flip of its table
+        self._flips = [[0] + [1 << bit for bit in window] for window in windows]
+        # fingerprint -> (newest log id, sent_at timestamp)
+        self._posts: Dict[int, Tuple[int, float]] = {}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._masks]
+        # (sent_at, fingerprint) of every add; entries superseded by a newer post are skipped on eviction
+        self._by_time: List[Tuple[float, int]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    @property
+    def loading(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add(self, fingerprint: int, log_id: int, sent_at: float) -> None:
+        known = self._posts.get(fingerprint)
+        if known and known[1] >= sent_at:
+            return
+        self._posts[fingerprint] = (log_id, sent_at)
+        heapq.heappush(self._by_time, (sent_at, fingerprint))
+        if known is None:
+            for mask, buckets in zip(self._masks, self._buckets):
+                buckets.setdefault(fingerprint & mask, []).append(fingerprint)
+        self.evict(time.time())
+
+    def evict(self, now: float) -> int:
+        """Drops the posts sent before the lookback window; returns how many were dropped."""
+        since = now - self.lookback
+        evicted = 0
+        while self._by_time and self._by_time[0][0] < since:
+            sent_at, fingerprint = heapq.heappop(self._by_time)
+            known = self._posts.get(fingerprint)
+            if known is None or known[1] != sent_at:
+                # The fingerprint was posted again later; its newer entry is still in the heap
+                continue
+            del self._posts[fingerprint]
+            for mask, buckets in zip(self._masks, self._buckets):
+                key = fingerprint & mask
+                bucket = buckets[key]
+                bucket.remove(fingerprint)
+                if not bucket:
+                    del buckets[key]
+            evicted += 1
+        return evicted
+
+    def find(self, fingerprint: int, now: Optional[float] = None) -> Optional[DuplicateMatch]:
+        """The closest recent post within max_distance bits (the newest one on ties)."""
+        max_distance = self.max_distance
+        close: List[int] = []
+        for mask, flips, buckets in zip(self._masks, self._flips, self._buckets):
+            key = fingerprint & mask
+            for flip in flips:
+                bucket = buckets.get(key ^ flip)
+                if bucket:
+                    close += [candidate for candidate in bucket if (candidate ^ fingerprint).bit_count() <= max_distance]
+
+        # A post found by several probes is simply compared again; matches are rare
+        since = (now or time.time()) - self.lookback
+        best: Optional[DuplicateMatch] = None
+        for candidate in close:
+            log_id, sent_at = self._posts[candidate]
+            if sent_at < since:
+                continue
+            distance = (candidate ^ fingerprint).bit_count()
+            if best is None or (distance, -sent_at) < (best.distance, -best.sent_at):
+                best = DuplicateMatch(log_id, sent_at, distance)
+        return best
+
+    def check(self, text: str) -> Optional[DuplicateMatch]:
+        return self.find(simhash(text))
+
+    # --- Loading ---
+    async def load(self) -> int:
+        """Indexes the posts of the lookback window, fingerprinting and storing the ones missing one."""
+        since = datetime.utcnow() - timedelta(seconds=self.lookback)
+        after_id = 0
+        loaded = 0
+        while True:
+            rows = await async_db.get_post_fingerprints(since, after_id, LOAD_BATCH)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            missing = {log_id: text for log_id, stored, text, _ in rows if stored is None}
+            computed = await asyncio.to_thread(fingerprint_texts, missing)
+            if computed:
+                await async_db.set_post_fingerprints([(log_id, to_db(value)) for log_id, value in computed.items()])
+            for position, (log_id, stored, _, sent_at) in enumerate(rows, 1):
+                fingerprint = computed[log_id] if stored is None else from_db(stored)
+                self.add(fingerprint, log_id, sent_at.replace(tzinfo=timezone.utc).timestamp() if sent_at else 0.0)
+                if position % LOAD_YIELD_EVERY == 0:
+                    # Updates arriving meanwhile are handled between chunks, not after the whole batch
+                    await asyncio.sleep(0)
+            loaded += len(rows)
+        logger.info(f"Near-duplicate index loaded with {len(self)} posts from {loaded} logs.")
+        return loaded
+
+    async def _run_load(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Error loading the near-duplicate index: {e}")
+
+    def start(self) -> None:
+        """Loads the index in the background; lookups meanwhile only see what is loaded so far."""
+        if not self.loading:
+            self._task = asyncio.create_task(self._run_load())
+
+    async def stop(self) -> None:
+        if self.loading:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+near_duplicates = NearDuplicateIndex(max_distance=DUPLICATE_MAX_DISTANCE, lookback_days=DUPLICATE_LOOKBACK_DAYS)
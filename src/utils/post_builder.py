@@ -1,15 +1,109 @@
+import asyncio
 import logging
-from telegram import Bot
-from telegram.error import TelegramError
-from typing import Optional
+import os
+import time
+from telegram import Bot, Message
+from telegram.error import BadRequest, RetryAfter, TelegramError
+from typing import Dict, List, Optional, Tuple
+from src.config import CHANNEL_IDS, MOVIE_POST_TYPE
+from src.database.async_db import async_db
+from src.utils.banner_cache import banner_cache
+from src.utils.banner_store import banner_store
+from src.utils.metrics import timed
+from src.utils.near_duplicates import near_duplicates, simhash, to_db
+from src.tracing import span
+from src.utils.post_type_registry import post_type_registry
 
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-async def send_post_to_channel(bot: Bot, channel_id: str, photo_path: Optional[str], caption: str) -> bool:
+# BadRequest messages meaning Telegram won't serve a file_id (expired, from another bot, malformed);
+# PTB raises a plain BadRequest for all of them
+REJECTED_FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference expired",
+    "wrong padding",
+    "type of file mismatch",
+)
+
+def is_rejected_file_id(error: BadRequest) -> bool:
+    """True when Telegram refused the file_id itself, so an upload of the file would work."""
+    message = error.message.lower()
+    return any(fragment in message for fragment in REJECTED_FILE_ID_ERRORS)
+
+async def send_banner_photo(bot: Bot, chat_id, photo_path: str, post_type: Optional[str], caption: str, photo_id: Optional[str] = None, **kwargs) -> Message:
+    """
+    Sends a banner photo, reusing a Telegram file_id when possible.
+
+    ``photo_id`` is the file_id the same post already got for this banner;
+    without it the post type's cached file_id is used. The file is only uploaded
+    when there is neither (or Telegram rejects it); the resulting file_id is then
+    cached for later sends.
+    """
+    if photo_id:
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=photo_id, caption=caption, **kwargs)
+        except BadRequest as e:
+            if not is_rejected_file_id(e):
+                raise
+            logger.warning(f"Banner file_id was rejected ({e}), uploading again.")
+    elif post_type:
+        with span("banner_cache lookup"):
+            cached = await banner_cache.get(post_type, photo_path)
+        if cached:
+            try:
+                message = await bot.send_photo(chat_id=chat_id, photo=cached.file_id, caption=caption, **kwargs)
+                banner_cache.record_reuse(post_type)
+                return message
+            except BadRequest as e:
+                # Only a rejected file id warrants a re-upload; other errors (e.g. chat not found) don't
+                if not is_rejected_file_id(e):
+                    raise
+                logger.warning(f"Cached banner file_id of '{post_type}' was rejected ({e}), uploading again.")
+                await banner_cache.invalidate(post_type, rejected=True)
+
+    with span("banner upload", path=photo_path), open(photo_path, 'rb') as photo_file:
+        message = await bot.send_photo(chat_id=chat_id, photo=photo_file, caption=caption, **kwargs)
+
+    if post_type and message.photo:
+        largest = message.photo[-1]
+        await banner_cache.store(post_type, largest.file_id, largest.file_unique_id, os.path.getsize(photo_path), photo_path)
+    return message
+
+@timed("send_post_to_channel")
+async def _send_post(bot: Bot, channel_id: str, photo_path: Optional[str], caption: str, post_type: Optional[str], photo_id: Optional[str]) -> Optional[Message]:
+    """Sends a post to a channel; returns the message, or None (logged) if it wasn't sent."""
+    if not channel_id:
+        logger.error("Channel ID is not configured.")
+        return None
+        
+    with span("send_post_to_channel", channel=channel_id, banner=bool(photo_path)):
+        try:
+            if photo_path:
+                message = await send_banner_photo(bot, channel_id, photo_path, post_type, caption, photo_id, parse_mode='HTML')
+            else:
+                message = await bot.send_message(
+                    chat_id=channel_id,
+                    text=caption,
+                    parse_mode='HTML'
+                )
+            logger.info(f"Post successfully sent to channel {channel_id}.")
+            return message
+        except FileNotFoundError:
+            logger.error(f"Error sending post: Photo file not found at {photo_path}")
+            return None
+        except RetryAfter as e:
+            # The send queue already waited and retried; the flood limit outlasted all retries
+            logger.error(f"Flood limit exceeded sending post to channel {channel_id}, retry after {e.retry_after}s.")
+            return None
+        except TelegramError as e:
+            logger.error(f"Telegram Error sending post to channel {channel_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while sending post to channel {channel_id}: {e}")
+            return None
+
+async def send_post_to_channel(bot: Bot, channel_id: str, photo_path: Optional[str], caption: str, post_type: Optional[str] = None, photo_id: Optional[str] = None) -> bool:
     """
     Sends a post (photo with caption or just text) to the specified channel.
 
@@ -18,37 +112,169 @@ async def send_post_to_channel(bot: Bot, channel_id: str, photo_path: Optional[s
         channel_id (str): The ID of the target channel.
         photo_path (Optional[str]): The file path of the photo to send. None for text-only posts.
         caption (str): The text caption for the post.
+        post_type (Optional[str]): The post type the banner belongs to, used to reuse its cached file_id.
+        photo_id (Optional[str]): The banner's file_id from an earlier send of the same post, sent instead of uploading.
 
     Returns:
         bool: True if the message was sent successfully, False otherwise.
     """
-    if not channel_id:
-        logger.error("Channel ID is not configured.")
-        return False
-        
+    return await _send_post(bot, channel_id, photo_path, caption, post_type, photo_id) is not None
+
+async def get_banner_path(post_type: str) -> Optional[str]:
+    """Returns the banner file of a post type, or None if it has no banner."""
+    row = await post_type_registry.get(post_type)
+    return banner_store.path_for(post_type, row.banner_file if row else None)
+
+async def get_target_channels(post_type: Optional[str]) -> List[str]:
+    """Returns the channels of a post type, or the default channels if it has none."""
+    row = await post_type_registry.get(post_type) if post_type else None
+    if row and row.channel_list:
+        return row.channel_list
+    return list(CHANNEL_IDS)
+
+def format_delivery_report(results: Dict[str, bool]) -> str:
+    """Renders the per-channel outcome of publish_post for the admin."""
+    return "\n".join(f"{'✅' if ok else '❌'} {channel_id}" for channel_id, ok in results.items())
+
+@timed("publish_post")
+async def publish_post(bot: Bot, channel_ids: List[str], photo_path: Optional[str], caption: str, post_type: Optional[str] = None) -> Dict[str, bool]:
+    """
+    Sends the same post to several channels concurrently.
+
+    If the banner has no cached file_id yet, it is uploaded to one channel first;
+    the remaining channels are then served from the cached file_id (or, for a
+    post without a post type, the file_id of that first send), so the file is
+    uploaded once instead of once per channel.
+
+    Returns:
+        Dict[str, bool]: Whether the post was delivered, per channel.
+    """
+    targets = list(dict.fromkeys(channel_ids))
+    if not targets:
+        logger.error("No target channels configured for the post.")
+        return {}
+
+    results: Dict[str, bool] = {}
+    photo_id = None
+    if photo_path and post_type:
+        while targets and not await banner_cache.get(post_type, photo_path):
+            channel_id = targets.pop(0)
+            results[channel_id] = await send_post_to_channel(bot, channel_id, photo_path, caption, post_type)
+    elif photo_path:
+        # No post type to cache the file_id under: the first upload's file_id serves the other channels
+        while targets and photo_id is None:
+            channel_id = targets.pop(0)
+            message = await _send_post(bot, channel_id, photo_path, caption, None, None)
+            results[channel_id] = message is not None
+            if message and message.photo:
+                photo_id = message.photo[-1].file_id
+
+    sent = await asyncio.gather(
+        *(send_post_to_channel(bot, channel_id, photo_path, caption, post_type, photo_id) for channel_id in targets)
+    )
+    results.update(zip(targets, sent))
+    return results
+
+async def deliver_post(bot: Bot, post_type: str, text: str, banner_path: Optional[str], sent_by: int) -> Dict[str, bool]:
+    """Publishes a post to its post type's channels and logs every successful delivery."""
+    channel_ids = await get_target_channels(post_type)
+    results = await publish_post(bot, channel_ids, banner_path, text, post_type)
+    delivered = [channel_id for channel_id, ok in results.items() if ok]
+    if delivered:
+        fingerprint = simhash(text)
+        log_id = await async_db.add_post_logs(post_type, text, sent_by, banner_path, delivered, simhash=to_db(fingerprint))
+        if log_id is not None:
+            near_duplicates.add(fingerprint, log_id, time.time())
+    return results
+
+# --- Movies ---
+async def send_movie_to_channel(bot: Bot, channel_id: str, photo_id: str, caption: str, file_id: str, file_type: str, file_caption: str, **kwargs) -> dict:
+    """
+    Sends a film's poster, then its file, to a channel. Both are sent by their
+    Telegram file_id, so Telegram copies them server-side and nothing is uploaded.
+    If the file fails after the poster went out, the poster is deleted again.
+
+    Returns:
+        dict: The message ids sent, and the error if the channel didn't get both posts.
+    """
+    outcome = {"message_ids": []}
+    with span("send_movie_to_channel", channel=channel_id):
+        try:
+            message = await bot.send_photo(chat_id=channel_id, photo=photo_id, caption=caption, **kwargs)
+            outcome["message_ids"].append(message.message_id)
+            # The file goes out only after the poster, so the channel shows them in order
+            if file_type == 'document':
+                message = await bot.send_document(chat_id=channel_id, document=file_id, caption=file_caption, **kwargs)
+            else:
+                message = await bot.send_video(chat_id=channel_id, video=file_id, caption=file_caption, **kwargs)
+            outcome["message_ids"].append(message.message_id)
+            logger.info(f"Movie posts successfully sent to channel {channel_id}.")
+        except RetryAfter as e:
+            logger.error(f"Flood limit exceeded sending movie to channel {channel_id}, retry after {e.retry_after}s.")
+            outcome["error"] = f"retry after {e.retry_after}s"
+        except TelegramError as e:
+            logger.error(f"Telegram Error sending movie to channel {channel_id}: {e}")
+            outcome["error"] = str(e)
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while sending movie to channel {channel_id}: {e}")
+            outcome["error"] = str(e)
+        if "error" in outcome and outcome["message_ids"]:
+            await delete_orphan_poster(bot, channel_id, outcome)
+    return outcome
+
+async def delete_orphan_poster(bot: Bot, channel_id: str, outcome: dict) -> None:
+    """Deletes a poster whose file could not be sent, so the channel isn't left with a film it can't download."""
     try:
-        if photo_path:
-            with open(photo_path, 'rb') as photo_file:
-                await bot.send_photo(
-                    chat_id=channel_id,
-                    photo=photo_file,
-                    caption=caption,
-                    parse_mode='HTML'
-                )
-        else:
-            await bot.send_message(
-                chat_id=channel_id,
-                text=caption,
-                parse_mode='HTML'
-            )
-        logger.info(f"Post successfully sent to channel {channel_id}.")
-        return True
-    except FileNotFoundError:
-        logger.error(f"Error sending post: Photo file not found at {photo_path}")
-        return False
+        await bot.delete_message(chat_id=channel_id, message_id=outcome["message_ids"][0])
+        outcome["message_ids"] = []
+        logger.info(f"Deleted the poster left without its file in channel {channel_id}.")
     except TelegramError as e:
-        logger.error(f"Telegram Error sending post to channel {channel_id}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while sending post to channel {channel_id}: {e}")
-        return False
+        logger.error(f"Could not delete the poster left without its file in channel {channel_id}: {e}")
+
+@timed("publish_movie")
+async def publish_movie(bot: Bot, channel_ids: List[str], photo_id: str, caption: str, file_id: str, file_type: str, file_caption: str, **kwargs) -> Dict[str, dict]:
+    """Sends a film's two posts to several channels concurrently; in each channel the poster comes first."""
+    targets = list(dict.fromkeys(channel_ids))
+    if not targets:
+        logger.error("No target channels configured for the movie.")
+        return {}
+    sent = await asyncio.gather(
+        *(send_movie_to_channel(bot, channel_id, photo_id, caption, file_id, file_type, file_caption, **kwargs) for channel_id in targets)
+    )
+    return dict(zip(targets, sent))
+
+def movie_delivery_status(results: Dict[str, dict]) -> str:
+    """sent when every channel got both posts, partial when some did, failed otherwise."""
+    delivered = sum(1 for outcome in results.values() if "error" not in outcome)
+    if results and delivered == len(results):
+        return 'sent'
+    return 'partial' if delivered else 'failed'
+
+async def deliver_movie(bot: Bot, info: dict, photo_id: str, caption: str, file_id: str, file_type: str, file_caption: str, sent_by: int, **kwargs) -> Tuple[Optional[int], Dict[str, bool]]:
+    """
+    Publishes a designed film to the channels of MOVIE_POST_TYPE and tracks it
+    in a delivery record: created before the first send, finished with the
+    message ids (or error) of every channel and the post log of the delivery.
+
+    Returns:
+        Tuple[Optional[int], Dict[str, bool]]: The delivery record id, and whether each channel got both posts.
+    """
+    if not await post_type_registry.get(MOVIE_POST_TYPE):
+        # Created on first use, so films are logged and searchable like other posts and their channels can be set
+        await post_type_registry.add(MOVIE_POST_TYPE)
+    channel_ids = await get_target_channels(MOVIE_POST_TYPE)
+
+    delivery_id = await async_db.add_movie_delivery(info.get('name') or '', info.get('year') or None, photo_id, file_id, file_type, sent_by)
+    results = await publish_movie(bot, channel_ids, photo_id, caption, file_id, file_type, file_caption, **kwargs)
+    delivered = [channel_id for channel_id, outcome in results.items() if "error" not in outcome]
+
+    log_id = None
+    if delivered:
+        fingerprint = simhash(caption)
+        meta = " ".join(filter(None, (info.get('name'), info.get('year'), info.get('genre'), info.get('language'), *info.get('actors', []))))
+        log_id = await async_db.add_post_logs(MOVIE_POST_TYPE, caption, sent_by, None, delivered, meta=meta, simhash=to_db(fingerprint))
+        if log_id is not None:
+            near_duplicates.add(fingerprint, log_id, time.time())
+    if delivery_id is not None:
+        await async_db.finish_movie_delivery(delivery_id, movie_delivery_status(results), results, log_id)
+    return delivery_id, {channel_id: "error" not in outcome for channel_id, outcome in results.items()}
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from telegram import InlineKeyboardMarkup
+
+from src.config import MOVIE_POST_TYPE
+from src.database.async_db import async_db
+from src.utils.keyboards import post_types_keyboard
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PostTypeInfo:
+    name: str
+    channel_list: List[str] = field(default_factory=list)
+    banner_file: Optional[str] = None
+    caption_template: Optional[str] = None
+    file_caption_template: Optional[str] = None
+
+
+class PostTypeRegistry:
+    """
+    Process-wide copy of the post types and the keyboard built from them.
+
+    Loaded once (at startup, or on first use) and reloaded only when a post type
+    is added, deleted or gets new channels or templates through this registry, so the menus
+    are served from memory without touching the database.
+    """
+
+    def __init__(self):
+        self._types: Dict[str, PostTypeInfo] = {}
+        self._keyboard: Optional[InlineKeyboardMarkup] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self.loads = 0
+
+    async def load(self) -> None:
+        """(Re)loads every post type with a single query and rebuilds the keyboard."""
+        async with self._lock:
+            rows = await async_db.get_post_types()
+            self._types = {row.name: PostTypeInfo(row.name, row.channel_list, row.banner_file, row.caption_template, row.file_caption_template) for row in rows}
+            self._keyboard = post_types_keyboard(self._post_names())
+            self._loaded = True
+            self.loads += 1
+        logger.info(f"Post type registry loaded with {len(self._types)} types.")
+
+    async def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            await self.load()
+
+    # --- Reads (from memory) ---
+    async def all(self) -> List[PostTypeInfo]:
+        await self._ensure_loaded()
+        return list(self._types.values())
+
+    async def names(self) -> List[str]:
+        await self._ensure_loaded()
+        return list(self._types)
+
+    def _post_names(self) -> List[str]:
+        # Films are posted through the movie designer, not as a regular post
+        return [name for name in self._types if name != MOVIE_POST_TYPE]
+
+    async def post_names(self) -> List[str]:
+        """The post types offered when creating a regular post."""
+        await self._ensure_loaded()
+        return self._post_names()
+
+    async def get(self, name: str) -> Optional[PostTypeInfo]:
+        await self._ensure_loaded()
+        return self._types.get(name)
+
+    async def keyboard(self) -> InlineKeyboardMarkup:
+        """The post type selection keyboard; markups are immutable, so one instance is shared."""
+        await self._ensure_loaded()
+        return self._keyboard
+
+    # --- Writes (invalidate the registry) ---
+    async def add(self, name: str, banner_file: Optional[str] = None) -> bool:
+        added = await async_db.add_post_type(name, banner_file)
+        if added:
+            await self.load()
+        return added
+
+    async def delete(self, name: str) -> bool:
+        deleted = await async_db.delete_post_type(name)
+        if deleted:
+            await self.load()
+        return deleted
+
+    async def set_channels(self, name: str, channels: Optional[List[str]]) -> bool:
+        updated = await async_db.set_post_type_channels(name, channels)
+        if updated:
+            await self.load()
+        return updated
+
+    async def set_templates(self, name: str, caption_template: Optional[str], file_caption_template: Optional[str]) -> bool:
+        updated = await async_db.set_post_type_templates(name, caption_template, file_caption_template)
+        if updated:
+            await self.load()
+        return updated
+
+
+post_type_registry = PostTypeRegistry()
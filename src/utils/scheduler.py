@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from telegram import Bot
+
+from src.config import SCHEDULE_MISSED_GRACE_MINUTES, SCHEDULE_MISSED_POLICY
+from src.database.async_db import async_db
+from src.utils.post_builder import deliver_post, format_delivery_report
+from src.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+def to_timestamp(run_at: datetime) -> float:
+    """Converts a naive UTC datetime (as stored in the database) to a Unix timestamp."""
+    return run_at.replace(tzinfo=timezone.utc).timestamp()
+
+class PostScheduler:
+    """
+    Publishes scheduled posts at their due time.
+
+    Pending jobs are kept in a heap of (due timestamp, id). A single task sleeps
+    until the earliest one is due and is woken early only when a new job becomes
+    the head of the heap, so the database is never polled. The heap is rebuilt
+    from the ``scheduled_posts`` table on start, which makes jobs survive restarts.
+    A job is claimed ('sending') before it is published; one still claimed on
+    start was cut off mid-send, so it is marked 'interrupted' and its admin told
+    instead of publishing it twice.
+    """
+
+    def __init__(self, missed_policy: str = "run", missed_grace: float = 600):
+        self.missed_policy = missed_policy
+        self.missed_grace = missed_grace
+        self._heap: List[Tuple[float, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._bot: Optional[Bot] = None
+        self.wakeups = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    async def start(self, bot: Bot) -> None:
+        """Reloads pending jobs from the database and starts the timer task."""
+        self._bot = bot
+        interrupted = await async_db.interrupt_scheduled_posts()
+        rows = await async_db.get_pending_schedule()
+        self._heap = [(to_timestamp(run_at), scheduled_id) for scheduled_id, run_at in rows]
+        heapq.heapify(self._heap)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(interrupted))
+        logger.info(f"Scheduler started with {len(self._heap)} pending posts.")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def schedule(self, post_type: str, text: str, banner_path: Optional[str], run_at: datetime, created_by: int, chat_id: Optional[int] = None) -> Optional[int]:
+        """Stores a post for ``run_at`` (timezone-aware) and arms the timer; returns the job id."""
+        run_at_utc = run_at.astimezone(timezone.utc).replace(tzinfo=None)
+        scheduled_id = await async_db.add_scheduled_post(post_type, text, banner_path, run_at_utc, created_by, chat_id)
+        if scheduled_id is not None:
+            self.add_job(scheduled_id, to_timestamp(run_at_utc))
+        return scheduled_id
+
+    def add_job(self, scheduled_id: int, due: float) -> None:
+        heapq.heappush(self._heap, (due, scheduled_id))
+        if self._heap[0][1] == scheduled_id:
+            # The new job is due before the one the timer is sleeping for
+            self._wakeup.set()
+
+    async def _run(self, interrupted: List[Tuple[int, Optional[int]]] = ()) -> None:
+        for scheduled_id, chat_id in interrupted:
+            logger.warning(f"Scheduled post {scheduled_id} was being sent when the bot stopped; it is not resent.")
+            await self._notify(chat_id, f"⚠️ ارسال پست زمان‌بندی‌شده #{scheduled_id} با توقف ربات نیمه‌کاره ماند و دوباره ارسال نمی‌شود؛ کانال‌ها را بررسی کنید.")
+        while True:
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                self.wakeups += 1
+                continue
+
+            due, scheduled_id = heapq.heappop(self._heap)
+            try:
+                with tracer.trace("scheduled_post", scheduled_id=scheduled_id):
+                    await self._run_job(scheduled_id, due)
+            except Exception as e:
+                logger.error(f"Error running scheduled post {scheduled_id}: {e}")
+                await async_db.set_scheduled_post_status(scheduled_id, 'failed')
+
+    async def _run_job(self, scheduled_id: int, due: float) -> None:
+        found = await async_db.get_scheduled_post(scheduled_id)
+        if not found:
+            return
+        scheduled, post_type = found
+        if scheduled.status != 'pending':
+            return
+
+        late = time.time() - due
+        if late > self.missed_grace and self.missed_policy == "skip":
+            await async_db.set_scheduled_post_status(scheduled_id, 'missed')
+            logger.warning(f"Scheduled post {scheduled_id} missed its time by {late:.0f}s and was skipped.")
+            await self._notify(scheduled.chat_id, f"⚠️ زمان پست زمان‌بندی‌شده #{scheduled_id} گذشته بود و ارسال نشد.")
+            return
+
+        # Claimed before sending: neither a second runner nor a restart publishes it again
+        if not await async_db.set_scheduled_post_status(scheduled_id, 'sending', expected='pending'):
+            return
+        results = await deliver_post(self._bot, post_type, scheduled.text, scheduled.media_path, scheduled.created_by)
+        status = 'sent' if results and all(results.values()) else 'failed'
+        await async_db.set_scheduled_post_status(scheduled_id, status)
+        logger.info(f"Scheduled post {scheduled_id} ({post_type}) published {late:.0f}s after its time: {results}")
+        icon = '✅' if status == 'sent' else '❌'
+        await self._notify(scheduled.chat_id, f"{icon} پست زمان‌بندی‌شده #{scheduled_id} ارسال شد.\n\n{format_delivery_report(results)}")
+
+    async def _notify(self, chat_id: Optional[int], text: str) -> None:
+        if not chat_id:
+            return
+        try:
+            await self._bot.send_message(chat_id=chat_id, text=text)
+        except Exception as e:
+            logger.error(f"Failed to notify admin chat {chat_id}: {e}")
+
+post_scheduler = PostScheduler(
+    missed_policy=SCHEDULE_MISSED_POLICY,
+    missed_grace=SCHEDULE_MISSED_GRACE_MINUTES * 60,
+)
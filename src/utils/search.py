@@ -0,0 +1,64 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from src.database.async_db import async_db
+from src.text_normalize import search_terms
+
+logger = logging.getLogger(__name__)
+
+# Results per page of /search
+PAGE_SIZE = 5
+# Newest matches ranked per query; more matches are counted as "more than"
+SEARCH_WINDOW = 1000
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    log_id: int
+    snippet: str  # Normalized text; the matched words are wrapped in \x02 ... \x03
+    post_type: Optional[str]
+    sent_by: int
+    sent_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    query: str
+    page: int
+    total: int
+    hits: List[SearchHit] = field(default_factory=list)
+
+    @property
+    def capped(self) -> bool:
+        """More posts match than were ranked."""
+        return self.total > SEARCH_WINDOW
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-min(self.total, SEARCH_WINDOW) // PAGE_SIZE))
+
+
+class PostSearchIndex:
+    """
+    Full-text search over the post history (the ``post_search`` FTS5 table).
+
+    New posts are indexed by add_post_logs in the same transaction as their
+    logs; posts logged before the index existed are indexed in the background
+    by the ``search_backfill`` data migration, which resumes from its stored
+    cursor after a restart.
+    Text and queries go through the same Persian normalization, so spelling
+    variants (Arabic yeh/kaf, ZWNJ, Persian digits) find each other. Only the
+    newest SEARCH_WINDOW matches are ranked, which bounds the cost of a query
+    for words that appear in most posts.
+    """
+
+    async def search(self, query: str, page: int = 0) -> SearchPage:
+        """One page of the posts matching every word of ``query``, best match among the newest first."""
+        terms = search_terms(query)
+        total, rows = await async_db.search_posts(terms, PAGE_SIZE, page * PAGE_SIZE, SEARCH_WINDOW)
+        return SearchPage(query=query, page=page, total=total, hits=[SearchHit(*row) for row in rows])
+
+
+post_search = PostSearchIndex()
@@ -0,0 +1,294 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from src.utils.metrics import API_ERRORS, API_SECONDS, FLOOD_WAITS, QUEUE_WAIT_SECONDS
+from src.tracing import KIND_CLIENT, is_tracing, span
+
+logger = logging.getLogger(__name__)
+
+# --- Priority Lanes ---
+# Lower value wins. Admin chats and callback answers go first, channel traffic waits.
+INTERACTIVE, BULK = 0, 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Cap on how far into a lane the dispatcher looks for a request whose chat has tokens
+MAX_SCAN = 64
+# Above this many per-chat buckets, idle (full) ones are dropped
+MAX_IDLE_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        # Nothing accrues while the bucket is paused
+        start = max(self.updated, self.paused_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if one is available now)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, until: float) -> None:
+        """Holds the bucket until ``until`` (a flood wait); it then resumes with one request at the normal rate."""
+        self._refill(time.monotonic())
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = min(self.tokens, 1.0)
+
+    def is_full(self, now: float) -> bool:
+        """True when the bucket has refilled completely, i.e. its chat has been idle."""
+        if now < self.paused_until:
+            return False
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class _Ticket:
+    lane: int
+    chat_key: Optional[str]
+    is_channel: bool
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class LaneStats:
+    sent: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.sent += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class SendQueue(BaseRateLimiter[int]):
+    """
+    Central outbound queue for every Bot API request of the application.
+
+    Requests wait for a token from the global bucket plus the bucket of their chat
+    (private chats and channels/groups have separate limits) and are dispatched
+    lane by lane, so replies to admins never queue behind bulk channel posts.
+    A ``RetryAfter`` pauses the bucket of its chat for the requested time (all
+    sending, for a request without a chat) and the request is retried instead
+    of failing; other chats and lanes keep being served meanwhile.
+
+    ``rate_limit_args`` may be passed to any bot method to force a lane.
+    """
+
+    def __init__(
+        self,
+        global_per_second: float = 30,
+        chat_per_second: float = 1,
+        chat_burst: int = 3,
+        channel_per_minute: float = 20,
+        max_retries: int = 3,
+    ):
+        self._global_bucket = TokenBucket(global_per_second, global_per_second)
+        self._chat_rate = (chat_per_second, chat_burst)
+        self._channel_rate = (channel_per_minute / 60, channel_per_minute)
+        self._max_retries = max_retries
+
+        self._lanes: Dict[int, Deque[_Ticket]] = {INTERACTIVE: deque(), BULK: deque()}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lane_stats: Dict[int, LaneStats] = {INTERACTIVE: LaneStats(), BULK: LaneStats()}
+        self._wakeup = asyncio.Event()
+        self._paused_until = 0.0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.flood_waits = 0
+
+    async def initialize(self) -> None:
+        # The Application and its Updater both initialize the bot; start a single dispatcher
+        if self._dispatcher and not self._dispatcher.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+            self._dispatcher = None
+        for lane in self._lanes.values():
+            while lane:
+                ticket = lane.popleft()
+                if not ticket.future.done():
+                    ticket.future.cancel()
+
+    # --- Request Handling ---
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        lane, chat_key, is_channel = self._classify(data, rate_limit_args)
+        if lane not in self._lanes:
+            lane = BULK
+        if is_tracing():
+            with span(f"telegram {endpoint}", kind=KIND_CLIENT, lane=LANE_NAMES.get(lane, str(lane)), chat=chat_key or ''):
+                return await self._send(callback, args, kwargs, endpoint, lane, chat_key, is_channel)
+        return await self._send(callback, args, kwargs, endpoint, lane, chat_key, is_channel)
+
+    async def _send(self, callback, args, kwargs, endpoint: str, lane: int, chat_key: Optional[str], is_channel: bool):
+        for attempt in range(self._max_retries + 1):
+            with span("send_queue wait"):
+                await self._acquire(lane, chat_key, is_channel, retry=attempt > 0)
+            start = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                self.flood_waits += 1
+                FLOOD_WAITS.inc(method=endpoint)
+                if attempt == self._max_retries:
+                    logger.error(f"Flood limit on {endpoint} persisted after {self._max_retries} retries.")
+                    raise
+                logger.warning(f"Flood limit hit on {endpoint} for chat {chat_key}, pausing {exc.retry_after}s.")
+                until = time.monotonic() + exc.retry_after
+                if chat_key is not None:
+                    # Only this chat is over its limit; the other chats and lanes keep going
+                    self._bucket(chat_key, is_channel).pause(until)
+                else:
+                    self._paused_until = max(self._paused_until, until)
+                self._wakeup.set()
+            except Exception as exc:
+                API_ERRORS.inc(method=endpoint, error=type(exc).__name__)
+                raise
+            finally:
+                API_SECONDS.observe(time.perf_counter() - start, method=endpoint)
+        raise RuntimeError("unreachable")
+
+    @staticmethod
+    def _classify(data: Dict[str, Any], rate_limit_args: Optional[int]) -> Tuple[int, Optional[str], bool]:
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            # answerCallbackQuery, getFile, ... are not per-chat messages
+            return (rate_limit_args if rate_limit_args is not None else INTERACTIVE), None, False
+
+        with contextlib.suppress(ValueError, TypeError):
+            chat_id = int(chat_id)
+        # Usernames (@channel) and negative ids are channels/groups, positive ids are private chats
+        is_channel = isinstance(chat_id, str) or chat_id < 0
+        lane = BULK if is_channel else INTERACTIVE
+        if rate_limit_args is not None:
+            lane = rate_limit_args
+        return lane, str(chat_id), is_channel
+
+    async def _acquire(self, lane: int, chat_key: Optional[str], is_channel: bool, retry: bool) -> None:
+        future = asyncio.get_running_loop().create_future()
+        ticket = _Ticket(lane, chat_key, is_channel, future)
+        if retry:
+            # A retried request keeps its place at the head of its lane
+            self._lanes[lane].appendleft(ticket)
+        else:
+            self._lanes[lane].append(ticket)
+        self._wakeup.set()
+        await future
+
+    # --- Dispatcher ---
+    def _bucket(self, chat_key: Optional[str], is_channel: bool) -> Optional[TokenBucket]:
+        if chat_key is None:
+            return None
+        bucket = self._buckets.get(chat_key)
+        if bucket is None:
+            rate, capacity = self._channel_rate if is_channel else self._chat_rate
+            bucket = self._buckets[chat_key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _next_ticket(self, now: float) -> Tuple[Optional[_Ticket], Optional[float]]:
+        """Finds the next request allowed to go, or how long to wait for one."""
+        soonest: Optional[float] = None
+        for lane_id in sorted(self._lanes):
+            lane = self._lanes[lane_id]
+            index = 0
+            while index < min(len(lane), MAX_SCAN):
+                ticket = lane[index]
+                if ticket.future.done():
+                    # The caller gave up (e.g. was cancelled)
+                    del lane[index]
+                    continue
+                bucket = self._bucket(ticket.chat_key, ticket.is_channel)
+                wait = bucket.wait_time(now) if bucket else 0.0
+                if ticket.chat_key is not None:
+                    wait = max(wait, self._global_bucket.wait_time(now))
+                if wait == 0.0:
+                    del lane[index]
+                    if bucket:
+                        bucket.consume()
+                        self._global_bucket.consume()
+                    return ticket, None
+                soonest = wait if soonest is None else min(soonest, wait)
+                index += 1
+        return None, soonest
+
+    def _prune_buckets(self, now: float) -> None:
+        """Drops the buckets of idle chats; a new bucket starts full, so nothing is lost."""
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if not bucket.is_full(now)}
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._wakeup.clear()
+            ticket, wait = self._next_ticket(now)
+            if ticket:
+                self._lane_stats[ticket.lane].record(now - ticket.enqueued_at)
+                QUEUE_WAIT_SECONDS.observe(now - ticket.enqueued_at, lane=LANE_NAMES.get(ticket.lane, str(ticket.lane)))
+                ticket.future.set_result(None)
+                continue
+
+            if len(self._buckets) > MAX_IDLE_BUCKETS:
+                self._prune_buckets(now)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+
+    # --- Statistics ---
+    def stats(self) -> dict:
+        """Queue depth and wait times per lane, the number of flood waits and the chats paused by one."""
+        lanes = {}
+        for lane_id, lane_stats in self._lane_stats.items():
+            lanes[LANE_NAMES.get(lane_id, str(lane_id))] = {
+                "depth": len(self._lanes[lane_id]),
+                "sent": lane_stats.sent,
+                "avg_wait": lane_stats.total_wait / lane_stats.sent if lane_stats.sent else 0.0,
+                "max_wait": lane_stats.max_wait,
+            }
+        now = time.monotonic()
+        paused_chats = sum(1 for bucket in self._buckets.values() if bucket.paused_until > now)
+        return {"lanes": lanes, "flood_waits": self.flood_waits, "paused": self._paused_until > now, "paused_chats": paused_chats}
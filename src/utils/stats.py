@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from src.database.async_db import async_db
+from src.database.database import STATS_ZONE
+from src.utils.log_archive import post_log_archiver
+
+logger = logging.getLogger(__name__)
+
+# Post log ids aggregated per database call while rebuilding
+REBUILD_BATCH = 50000
+# Days shown in the report
+REPORT_DAYS = 7
+# Rows listed per section of the report
+REPORT_TOP = 10
+
+
+class PostStatsRollup:
+    """
+    Statistics report served from the ``post_stats`` rollups.
+
+    add_post_logs bumps the counters of every new log, so a report reads a
+    bounded number of rows no matter how large ``post_logs`` is. The rollups are
+    rebuilt from history in the background when missing (first start after an
+    upgrade) or on request, in id-range batches that never hold the database
+    for long.
+    """
+
+    def __init__(self, batch_size: int = REBUILD_BATCH):
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def rebuild(self) -> int:
+        """Recounts every post log, live or archived, into the rollups; returns the number of logs counted."""
+        # No log may move to an archive while the live ones are being counted
+        async with post_log_archiver.lock:
+            watermark = await async_db.get_max_post_log_id()
+            counts: Counter = Counter()
+            start = 0
+            while start < watermark:
+                end = min(start + self.batch_size, watermark)
+                counts.update(await async_db.aggregate_post_logs(start, end))
+                start = end
+            if not await async_db.replace_post_stats(counts, watermark):
+                raise RuntimeError("Could not store the rebuilt statistics")
+        total = (await async_db.get_post_stats([])).get('total', {}).get('all', 0)
+        logger.info(f"Post statistics rebuilt from {total} logs.")
+        return total
+
+    def start_rebuild(self) -> bool:
+        """Starts a background rebuild; False if one is already running."""
+        if self.rebuilding:
+            return False
+        self._task = asyncio.create_task(self._run_rebuild())
+        return True
+
+    async def _run_rebuild(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Error rebuilding post statistics: {e}")
+
+    async def ensure(self) -> None:
+        """Rebuilds in the background when there are logs but no rollups yet."""
+        if await async_db.needs_stats_rebuild():
+            logger.info("Post statistics are missing, rebuilding them in the background.")
+            self.start_rebuild()
+
+    async def stop(self) -> None:
+        if self.rebuilding:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def report(self, now: Optional[datetime] = None) -> str:
+        """Renders the statistics report for the admins."""
+        today = (now or datetime.now(STATS_ZONE)).astimezone(STATS_ZONE).date()
+        days = [(today - timedelta(days=offset)).isoformat() for offset in range(REPORT_DAYS)]
+        stats = await async_db.get_post_stats(days)
+
+        by_day = stats.get('day', {})
+        lines = [
+            "📊 آمار و گزارش",
+            "",
+            f"کل ارسال‌ها: {stats.get('total', {}).get('all', 0)}",
+            f"امروز: {by_day.get(days[0], 0)} | {REPORT_DAYS} روز اخیر: {sum(by_day.values())}",
+        ]
+        lines += self._section("📂 بر اساس نوع پست:", stats.get('type', {}))
+        lines += self._section("👤 بر اساس ادمین:", stats.get('admin', {}))
+        lines += ["", f"📅 {REPORT_DAYS} روز اخیر:"] + [f"- {day}: {by_day.get(day, 0)}" for day in days]
+        busiest = sorted(stats.get('hour', {}).items(), key=lambda item: item[1], reverse=True)[:3]
+        if busiest:
+            lines += ["", "🕐 پرترافیک‌ترین ساعت‌ها:"] + [f"- {hour}:00 ({count})" for hour, count in busiest]
+        if self.rebuilding:
+            lines += ["", "⏳ آمار در حال بازسازی است و ممکن است ناقص باشد."]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _section(title: str, counts: Dict[str, int]) -> List[str]:
+        if not counts:
+            return []
+        top = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:REPORT_TOP]
+        return ["", title] + [f"- {key}: {count}" for key, count in top]
+
+
+post_stats = PostStatsRollup()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from src.utils.metrics import UPDATE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Updates PTB hands over at once; beyond it they stay in the application's update queue
+MAX_PENDING_UPDATES = 10000
+
+
+class ShardedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates of different users concurrently, and those of one user
+    strictly in the order they arrived.
+
+    Every update is routed by its user (or chat) id to one of ``shards``
+    queues: a FIFO lock, held while one of its updates is processed and
+    waited on by the next ones in arrival order. So a user's updates never
+    overlap and ConversationHandler always sees them one after another, while
+    a user with a slow step (a large file, a post waiting for the channel's
+    send budget) only holds up the few users sharing its shard, not everyone.
+    At most ``workers`` updates run at a time; an update only takes a worker
+    once it is first in its shard, so queued updates don't hold one.
+    """
+
+    def __init__(self, workers: int, shards: int):
+        super().__init__(max_concurrent_updates=MAX_PENDING_UPDATES)
+        self.workers = workers
+        self.shards = shards
+        self._shard_locks = [asyncio.Lock() for _ in range(shards)]
+        self._workers = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.processed = 0
+
+    def shard_of(self, update: object) -> int:
+        """Updates of the same user (or chat, for updates without a user) always map to the same shard."""
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id % self.shards
+            if update.effective_chat:
+                return update.effective_chat.id % self.shards
+            return update.update_id % self.shards
+        return 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        queued = time.perf_counter()
+        self.waiting += 1
+        started = False
+        try:
+            # asyncio locks and semaphores are granted first come, first served, so arrival order is kept
+            async with self._shard_locks[self.shard_of(update)], self._workers:
+                self.waiting -= 1
+                self.running += 1
+                started = True
+                UPDATE_WAIT_SECONDS.observe(time.perf_counter() - queued)
+                await coroutine
+        finally:
+            if started:
+                self.running -= 1
+                self.processed += 1
+            else:
+                # Cancelled while queued (the application is stopping)
+                self.waiting -= 1
+                if asyncio.iscoroutine(coroutine):
+                    coroutine.close()
+
+    async def initialize(self) -> None:
+        logger.info(f"Processing updates with {self.workers} workers over {self.shards} per-user shards.")
+
+    async def shutdown(self) -> None:
+        """Nothing to release: updates run in the tasks PTB created for them."""
+
+    def stats(self) -> Dict[str, int]:
+        busy_shards = sum(1 for lock in self._shard_locks if lock.locked())
+        return {"waiting": self.waiting, "running": self.running, "processed": self.processed, "busy_shards": busy_shards}
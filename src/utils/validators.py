@@ -1,16 +1,79 @@
+import re
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+from typing import List, Optional
+from zoneinfo import ZoneInfo
 from telegram import Update
 from telegram.ext import ContextTypes
 import logging
 
-# Import the list of admin IDs from the main config
-from src.config import ADMIN_IDS
+from src.config import SCHEDULE_TIMEZONE
+from src.text_normalize import PERSIAN_DIGITS
+from src.utils.admin_roster import admin_roster
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
 def is_admin(user_id: int) -> bool:
-    """Checks if a user is one of the configured admins."""
-    return user_id in ADMIN_IDS
+    """Checks if a user is in the admin roster (a dict lookup, no query)."""
+    return admin_roster.is_admin(user_id)
+
+def is_owner(user_id: int) -> bool:
+    """Checks if a user may manage the admin roster."""
+    return admin_roster.is_owner(user_id)
+
+def parse_channel_ids(text: str) -> Optional[List[str]]:
+    """
+    Parses a comma/space separated list of channels (@username or numeric id).
+    Returns None if any entry is invalid.
+    """
+    channels = [part.strip() for part in text.replace(',', ' ').split() if part.strip()]
+    for channel in channels:
+        if channel.startswith('@'):
+            if len(channel) < 2:
+                return None
+        else:
+            try:
+                int(channel)
+            except ValueError:
+                return None
+    return channels
+
+RELATIVE_TIME_PATTERN = re.compile(r'^\+(\d+)\s*([mhd]?)$')
+RELATIVE_TIME_UNITS = {'': 'minutes', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+def parse_schedule_time(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Parses a publish time typed by an admin into a timezone-aware datetime.
+
+    Accepts an absolute time "YYYY-MM-DD HH:MM" in SCHEDULE_TIMEZONE, or a relative
+    offset like "+30" / "+30m", "+2h", "+1d". Returns None for invalid or past times.
+    """
+    text = text.strip().translate(PERSIAN_DIGITS)
+    now = now or datetime.now(timezone.utc)
+
+    relative = RELATIVE_TIME_PATTERN.match(text)
+    if relative:
+        amount, unit = relative.groups()
+        try:
+            return now + timedelta(**{RELATIVE_TIME_UNITS[unit]: int(amount)})
+        except (OverflowError, ValueError):
+            # e.g. "+99999999d", past the largest datetime
+            return None
+
+    try:
+        run_at = datetime.strptime(text, "%Y-%m-%d %H:%M").replace(tzinfo=ZoneInfo(SCHEDULE_TIMEZONE))
+    except ValueError:
+        return None
+    return run_at if run_at > now else None
+
+async def _deny_access(update: Update) -> None:
+    user = update.effective_user
+    logger.warning(f"Unauthorized access denied for user {user.id if user else 'Unknown'}.")
+    if update.message:
+        await update.message.reply_text("⛔️ متاسفم، شما اجازه دسترسی به این دستور را ندارید.")
+    elif update.callback_query:
+        await update.callback_query.answer("⛔️ شما اجازه دسترسی ندارید.", show_alert=True)
 
 def admin_only(func):
     """
@@ -20,12 +83,25 @@ def admin_only(func):
     @wraps(func)
     async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
         user = update.effective_user
-        if not user or not is_admin(user.id):
-            logger.warning(f"Unauthorized access denied for user {user.id if user else 'Unknown'}.")
-            if update.message:
-                await update.message.reply_text("⛔️ متاسفم، شما اجازه دسترسی به این دستور را ندارید.")
-            elif update.callback_query:
-                await update.callback_query.answer("⛔️ شما اجازه دسترسی ندارید.", show_alert=True)
-            return None
+        with span("admin_only") as check:
+            allowed = bool(user) and is_admin(user.id)
+            check.set_attribute("allowed", allowed)
+            if not allowed:
+                await _deny_access(update)
+                return None
+        return await func(update, context, *args, **kwargs)
+    return wrapped
+
+def owner_only(func):
+    """Like admin_only, but for handlers that only owners may use (e.g. managing admins)."""
+    @wraps(func)
+    async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        user = update.effective_user
+        with span("owner_only") as check:
+            allowed = bool(user) and is_owner(user.id)
+            check.set_attribute("allowed", allowed)
+            if not allowed:
+                await _deny_access(update)
+                return None
         return await func(update, context, *args, **kwargs)
-    return wrapped
\ No newline at end of file
+    return wrapped
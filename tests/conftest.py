@@ -0,0 +1,11 @@
+"""
+Test setup: a dummy token and a throw-away database, set before anything from
+``src`` is imported (the configuration is read on first use).
+"""
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="bot-tests-")
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test-token")
+os.environ["DATABASE_PATH"] = os.path.join(TEST_DIR, "test.db")
@@ -0,0 +1,20 @@
+import asyncio
+
+from src.database.init_db import init_db
+from src.utils.admin_roster import ADMIN, OWNER, AdminRoster
+
+
+def test_configured_owners_cannot_be_demoted():
+    init_db()
+
+    async def run():
+        roster = AdminRoster(configured_owners=[555])
+        await roster.load()
+        demoted = await roster.add(555, ADMIN, added_by=1)
+        added = await roster.add(556, ADMIN, added_by=555)
+        return roster, demoted, added
+
+    roster, demoted, added = asyncio.run(run())
+    assert not demoted
+    assert roster.role(555) == OWNER
+    assert added and roster.role(556) == ADMIN
@@ -0,0 +1,32 @@
+from src.handlers.movie_design_handler import pair_batch_items, render_batch_preview
+
+
+def poster(message_id, name):
+    return {'message_id': message_id, 'info': {'name': name}}
+
+
+def file(message_id, file_name):
+    return {'message_id': message_id, 'file_name': file_name}
+
+
+def test_a_short_name_does_not_take_a_longer_films_file():
+    posters = [poster(1, "Up"), poster(2, "Up in the Air")]
+    files = [file(3, "Up.in.the.Air.2009.720p.mkv"), file(4, "Up.2009.1080p.BluRay.mkv")]
+    pairs, lonely_posters, lonely_files = pair_batch_items(posters, files)
+    names = {p['info']['name']: f['file_name'] for p, f in pairs}
+    assert names == {"Up": "Up.2009.1080p.BluRay.mkv", "Up in the Air": "Up.in.the.Air.2009.720p.mkv"}
+    assert not lonely_posters and not lonely_files
+
+
+def test_unmatched_items_pair_in_sending_order():
+    posters = [poster(1, "Alpha"), poster(2, "Beta")]
+    files = [file(3, "movie_a.mp4"), file(4, "movie_b.mp4")]
+    pairs, _, _ = pair_batch_items(posters, files)
+    assert [(p['info']['name'], f['file_name']) for p, f in pairs] == [("Alpha", "movie_a.mp4"), ("Beta", "movie_b.mp4")]
+
+
+def test_preview_warns_once_about_captionless_photos():
+    posters = [{'message_id': 1, 'info': {'name': "Up", 'year': "2009", 'quality': "720p"}}]
+    files = [file(2, "Up.mkv")]
+    preview = "\n".join(render_batch_preview(list(zip(posters, files)), [], [], skipped_photos=3))
+    assert preview.count("بدون کپشن") == 1 and "3" in preview
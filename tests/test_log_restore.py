@@ -0,0 +1,80 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from src.database.database import DBManager
+from src.database.init_db import init_db
+from src.database.models import LogArchive, PostLog
+from src.utils.log_archive import PostLogArchiver
+
+
+def test_restore_keeps_logs_whose_ids_were_reused(tmp_path):
+    """Archiving the newest logs frees their ids; restoring must not drop the logs whose ids were taken since."""
+    init_db()
+    db = DBManager()
+    db.add_post_type("restore-test")
+    for index in range(3):
+        db.add_post_logs("restore-test", f"old {index}", 1, None, ["@channel"])
+    old_ids = [log_id for (log_id,) in db.db.query(PostLog.id).order_by(PostLog.id)]
+
+    archiver = PostLogArchiver(retention_days=1, archive_dir=str(tmp_path))
+    assert asyncio.run(archiver.archive_pass(now=datetime.utcnow() + timedelta(days=2))) == 3
+
+    # SQLite hands the first freed id to the next log
+    new_id = db.add_post_logs("restore-test", "new", 1, None, ["@channel"])
+    assert new_id in old_ids
+
+    assert asyncio.run(archiver.restore()) == 3
+    db.db.expire_all()
+    texts = sorted(text for (text,) in db.db.query(PostLog.text))
+    assert texts == ["new", "old 0", "old 1", "old 2"]
+    assert db.search_posts(["old"], 10)[0] == 3
+    archive = db.db.query(LogArchive).one()
+    assert archive.restored_at is not None
+    # The logs that got new ids are held from archiving like the rest of the archive
+    assert archive.last_id >= max(log_id for (log_id,) in db.db.query(PostLog.id))
+    db.close()
+
+
+def test_failed_restore_keeps_the_archive_file(tmp_path, monkeypatch):
+    init_db()
+    db = DBManager()
+    db.add_post_type("restore-test-2")
+    db.add_post_logs("restore-test-2", "kept", 1, None, ["@channel"])
+    archiver = PostLogArchiver(retention_days=1, archive_dir=str(tmp_path))
+    asyncio.run(archiver.archive_pass(now=datetime.utcnow() + timedelta(days=2)))
+    files = os.listdir(tmp_path)
+    assert files
+
+    monkeypatch.setattr(DBManager, "_index_log_rows", lambda self, rows: 1 / 0)
+    try:
+        asyncio.run(archiver.restore())
+    except RuntimeError:
+        pass
+    assert os.listdir(tmp_path) == files
+    db.db.expire_all()
+    assert db.db.query(PostLog).filter(PostLog.text == "kept").count() == 0
+    assert db.db.query(LogArchive).filter(LogArchive.restored_at.is_(None)).count() == 1
+
+    # Leave no pending archive behind for the other tests
+    monkeypatch.undo()
+    assert asyncio.run(archiver.restore()) == 1
+    db.close()
+
+
+def test_restored_film_is_found_by_its_meta(tmp_path):
+    """Film details are indexed next to the caption; a restored film must be found by them again."""
+    init_db()
+    db = DBManager()
+    db.add_post_type("restore-test-3")
+    db.add_post_logs("restore-test-3", "poster caption", 1, None, ["@one", "@two"], meta="Castaway 2000 Hanks")
+    assert db.search_posts(["hanks"], 10)[0] == 1
+
+    archiver = PostLogArchiver(retention_days=1, archive_dir=str(tmp_path))
+    asyncio.run(archiver.archive_pass(now=datetime.utcnow() + timedelta(days=2)))
+    assert db.search_posts(["hanks"], 10)[0] == 0
+
+    asyncio.run(archiver.restore())
+    db.db.expire_all()
+    assert db.search_posts(["hanks"], 10)[0] == 1
+    db.close()
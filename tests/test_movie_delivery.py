@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.error import BadRequest
+
+from src.config import MOVIE_POST_TYPE
+from src.database.init_db import init_db
+from src.utils.post_builder import is_rejected_file_id, publish_post, send_movie_to_channel
+from src.utils.post_type_registry import post_type_registry
+
+
+class FailingFileBot:
+    """Sends posters, fails every film file."""
+
+    def __init__(self):
+        self.deleted = []
+
+    async def send_photo(self, chat_id, photo, caption, **kwargs):
+        return SimpleNamespace(message_id=7)
+
+    async def send_video(self, chat_id, video, caption, **kwargs):
+        raise BadRequest("Wrong file identifier/http url specified")
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+        return True
+
+
+def test_poster_is_deleted_when_its_file_fails():
+    bot = FailingFileBot()
+    outcome = asyncio.run(send_movie_to_channel(bot, "@films", "poster", "caption", "file", "video", "file caption"))
+    assert "error" in outcome
+    assert outcome["message_ids"] == []
+    assert bot.deleted == [("@films", 7)]
+
+
+def test_movie_post_type_is_not_offered_for_regular_posts():
+    init_db()
+
+    async def run():
+        await post_type_registry.add("keyboard-test")
+        await post_type_registry.add(MOVIE_POST_TYPE)
+        buttons = [button.callback_data for row in (await post_type_registry.keyboard()).inline_keyboard for button in row]
+        return buttons, await post_type_registry.post_names()
+
+    buttons, names = asyncio.run(run())
+    assert MOVIE_POST_TYPE not in names and "keyboard-test" in names
+    assert not any(MOVIE_POST_TYPE in (data or "") for data in buttons)
+
+
+class RecordingBot:
+    """Accepts every photo; uploads get a new file_id."""
+
+    def __init__(self):
+        self.photos = []
+
+    async def send_photo(self, chat_id, photo, caption, **kwargs):
+        uploaded = not isinstance(photo, str)
+        self.photos.append((chat_id, "upload" if uploaded else photo))
+        return SimpleNamespace(message_id=len(self.photos), photo=[SimpleNamespace(file_id="banner-id", file_unique_id="u")])
+
+
+def test_banner_without_post_type_is_uploaded_once(tmp_path):
+    banner = tmp_path / "banner.jpg"
+    banner.write_bytes(b"jpeg")
+    bot = RecordingBot()
+    results = asyncio.run(publish_post(bot, ["@one", "@two", "@three"], str(banner), "caption"))
+    assert results == {"@one": True, "@two": True, "@three": True}
+    assert sorted(photo for _, photo in bot.photos) == ["banner-id", "banner-id", "upload"]
+
+
+def test_only_rejected_file_ids_count_as_rejected():
+    assert is_rejected_file_id(BadRequest("Wrong file identifier/http url specified"))
+    assert not is_rejected_file_id(BadRequest("Chat not found"))
+    assert not is_rejected_file_id(BadRequest("Message caption is too long (file caption)"))
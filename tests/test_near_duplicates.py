@@ -0,0 +1,22 @@
+import time
+
+from src.utils.near_duplicates import NearDuplicateIndex
+
+
+def test_posts_older_than_the_lookback_are_evicted():
+    index = NearDuplicateIndex(max_distance=3, lookback_days=1)
+    now = time.time()
+    index.add(0b1011, 1, now - 2 * 86400)
+    index.add(0xFFFF0000, 2, now - 3 * 86400)
+    # Reposted since: the fingerprint stays with its newer post
+    index.add(0xF0F0, 3, now - 2 * 86400)
+    index.add(0xF0F0, 4, now - 60)
+    index.add(0b1111, 5, now)
+
+    assert len(index) == 2
+    assert all(fingerprint in (0xF0F0, 0b1111) for buckets in index._buckets for bucket in buckets.values() for fingerprint in bucket)
+    assert index.find(0b1011).log_id == 5
+    assert index.find(0xF0F1).log_id == 4
+
+    assert index.evict(now + 2 * 86400) == 2
+    assert len(index) == 0 and not any(index._buckets)
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, timezone
+
+from src.database.database import DBManager
+from src.database.init_db import init_db
+from src.utils.validators import parse_schedule_time
+
+
+def test_parse_schedule_time_rejects_out_of_range_offsets():
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert parse_schedule_time("+99999999d", now) is None
+    assert parse_schedule_time("+999999999999999999999", now) is None
+    assert parse_schedule_time("+۲h", now) == now + timedelta(hours=2)
+
+
+def test_claimed_posts_are_interrupted_on_start_not_resent():
+    init_db()
+    db = DBManager()
+    db.add_post_type("schedule-test")
+    run_at = datetime.utcnow()
+    claimed = db.add_scheduled_post("schedule-test", "claimed", None, run_at, 1, chat_id=42)
+    pending = db.add_scheduled_post("schedule-test", "pending", None, run_at, 1)
+
+    assert db.set_scheduled_post_status(claimed, 'sending', expected='pending')
+    # Only one runner gets the claim
+    assert not db.set_scheduled_post_status(claimed, 'sending', expected='pending')
+
+    assert db.interrupt_scheduled_posts() == [(claimed, 42)]
+    assert [scheduled_id for scheduled_id, _ in db.get_pending_schedule()] == [pending]
+    assert db.get_scheduled_post(claimed)[0].status == 'interrupted'
+    db.close()
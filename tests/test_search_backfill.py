@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from src.database.database import DBManager
+from src.database.init_db import init_db
+from src.database.migrations import run_pending
+from src.database.models import PostLog, SchemaMigration
+
+
+def test_backfill_indexes_history_once_the_index_has_new_posts():
+    """A post indexed on arrival must not stop the backfill, and posts split across batches are indexed once."""
+    init_db()
+    db = DBManager()
+    db.add_post_type("backfill-test")
+    type_id = db.get_post_type("backfill-test").id
+    sent_at = datetime.utcnow() - timedelta(days=30)
+    # Posts logged before the index existed, each delivered to two channels
+    db.db.add_all([
+        PostLog(post_type_id=type_id, text=f"legacy {index}", channel_id=channel, sent_by=1, sent_at=sent_at + timedelta(minutes=index))
+        for index in range(3) for channel in ("@one", "@two")
+    ])
+    db.db.query(SchemaMigration).filter(SchemaMigration.version == 3).delete()
+    db.db.commit()
+    db.add_post_logs("backfill-test", "fresh", 1, None, ["@one"])
+    assert db.search_posts(["legacy"], 10)[0] == 0
+
+    # Three logs per batch: every other post starts in one batch and ends in the next
+    assert run_pending(batch_size=3)
+    db.db.expire_all()
+    assert db.search_posts(["legacy"], 10)[0] == 3
+    assert db.search_posts(["fresh"], 10)[0] == 1
+    assert db.db.get(SchemaMigration, 3).status == 'done'
+    db.close()
@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import RetryAfter
+
+from src.utils.send_queue import BULK, SendQueue, TokenBucket
+
+
+def test_idle_buckets_are_pruned_once_refilled():
+    queue = SendQueue(chat_per_second=1, chat_burst=3)
+    now = time.monotonic()
+    for chat in range(100):
+        bucket = queue._buckets[str(chat)] = TokenBucket(1, 3)
+        bucket.consume()
+    queue._buckets["busy"] = TokenBucket(0.001, 3)
+    queue._buckets["busy"].consume()
+
+    # Buckets refill lazily, on their next use; pruning has to refill them first
+    queue._prune_buckets(now + 10)
+    assert list(queue._buckets) == ["busy"]
+
+
+def test_initialize_starts_a_single_dispatcher():
+    async def run():
+        queue = SendQueue()
+        await queue.initialize()
+        dispatcher = queue._dispatcher
+        await queue.initialize()
+        assert queue._dispatcher is dispatcher
+        await queue.shutdown()
+        assert dispatcher.cancelled()
+
+    asyncio.run(run())
+
+
+def request(queue, chat_id, calls, name=None, rate_limit_args=None, callback=None):
+    """Sends a fake Bot API request through the queue, recording when its callback ran."""
+    async def send():
+        calls.append((name or chat_id, time.monotonic()))
+        return True
+
+    return queue.process_request(callback or send, (), {}, "sendMessage", {"chat_id": chat_id}, rate_limit_args)
+
+
+def test_chat_and_global_buckets_space_out_sends():
+    async def run():
+        queue = SendQueue(global_per_second=20, chat_per_second=20, chat_burst=1)
+        await queue.initialize()
+        calls = []
+        start = time.monotonic()
+        # One chat: a burst of one, then a send every 1/20 s
+        await asyncio.gather(*(request(queue, 42, calls) for _ in range(4)))
+        chat_elapsed = time.monotonic() - start
+        # Many chats: the global bucket holds 20, the five after it wait 1/20 s each
+        start = time.monotonic()
+        await asyncio.gather(*(request(queue, 1000 + chat, calls) for chat in range(25)))
+        global_elapsed = time.monotonic() - start
+        await queue.shutdown()
+        return chat_elapsed, global_elapsed
+
+    chat_elapsed, global_elapsed = asyncio.run(run())
+    assert chat_elapsed >= 0.13
+    assert global_elapsed >= 0.2
+
+
+def test_interactive_requests_go_before_queued_bulk():
+    async def run():
+        queue = SendQueue()
+        calls = []
+        bulk = [asyncio.ensure_future(request(queue, f"@channel{index}", calls)) for index in range(5)]
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request(queue, 42, calls))
+        await asyncio.sleep(0)
+        # Everything is queued before the dispatcher starts
+        await queue.initialize()
+        await asyncio.gather(interactive, *bulk)
+        stats = queue.stats()
+        await queue.shutdown()
+        return [name for name, _ in calls], stats
+
+    order, stats = asyncio.run(run())
+    assert order[0] == 42
+    assert stats["lanes"]["interactive"]["sent"] == 1
+    assert stats["lanes"]["bulk"]["sent"] == 5
+    assert stats["lanes"]["bulk"]["depth"] == 0
+    assert stats["lanes"]["bulk"]["max_wait"] >= stats["lanes"]["bulk"]["avg_wait"] > 0
+
+
+def test_retry_after_is_retried_then_raised():
+    async def run():
+        queue = SendQueue(max_retries=2)
+        await queue.initialize()
+        attempts = []
+
+        async def flooded():
+            attempts.append(time.monotonic())
+            raise RetryAfter(0)
+
+        with pytest.raises(RetryAfter):
+            await request(queue, 42, [], callback=flooded)
+        retried = len(attempts)
+
+        async def flooded_once():
+            attempts.append(time.monotonic())
+            if len(attempts) == retried + 1:
+                raise RetryAfter(0)
+            return "sent"
+
+        result = await request(queue, 43, [], callback=flooded_once)
+        stats = queue.stats()
+        await queue.shutdown()
+        return retried, result, stats
+
+    retried, result, stats = asyncio.run(run())
+    assert retried == 3
+    assert result == "sent"
+    assert stats["flood_waits"] == 4
+
+
+def test_flood_wait_of_a_channel_does_not_hold_other_chats():
+    async def run():
+        queue = SendQueue()
+        await queue.initialize()
+        calls = []
+        flooded = []
+
+        async def busy_channel():
+            flooded.append(time.monotonic())
+            if len(flooded) == 1:
+                raise RetryAfter(1)
+            return True
+
+        start = time.monotonic()
+        channel = asyncio.ensure_future(request(queue, "@busy", calls, callback=busy_channel))
+        while not flooded:
+            await asyncio.sleep(0.01)
+        await request(queue, 42, calls)
+        await request(queue, "@other", calls, rate_limit_args=BULK)
+        others_done = time.monotonic() - start
+        paused = queue.stats()["paused_chats"]
+        await channel
+        channel_done = time.monotonic() - start
+        await queue.shutdown()
+        return others_done, channel_done, paused
+
+    others_done, channel_done, paused = asyncio.run(run())
+    assert others_done < 0.5
+    assert channel_done >= 1
+    assert paused == 1